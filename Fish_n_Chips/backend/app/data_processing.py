@@ -1,95 +1,204 @@
-import mne
 import numpy as np
 import pandas as pd
 import io
+from typing import Iterator, List
 from fastapi import HTTPException
 
-REQUIRED_CHANNELS = [
-    'Fp1', 'Fp2', 'F7', 'F3', 'Fz', 'F4', 'F8', 'T3',
-    'C3', 'Cz', 'C4', 'T4', 'T5', 'P3', 'Pz', 'P4'
-]
+from .edf_reader import EDFReader
+from .montage import REQUIRED_CHANNELS, resolve_channel_indices
+from .resampling import StreamingResampler, resample, resampled_length
 
 TARGET_SFREQ = 256
 
+# pyarrow's multithreaded CSV reader is much faster on large exports
+try:
+    import pyarrow  # noqa: F401
+    CSV_ENGINE = "pyarrow"
+except ImportError:
+    CSV_ENGINE = "c"
+
+def _pick_indices(available_channels: List[str]) -> List[int]:
+    """
+    Indices of REQUIRED_CHANNELS within a recording's labels, in training order.
+    """
+    try:
+        return list(resolve_channel_indices(tuple(available_channels)))
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+def _parse_edf_mne(file_content: bytes) -> np.ndarray:
+    """
+    Fallback EDF parser through MNE, for files the native reader rejects
+    (e.g. BDF or mixed sampling rates across the required channels).
+    """
+    # MNE reads from a file path, so we need to write to a temp file.
+    import mne
+    import tempfile
+    import os
+
+    with tempfile.NamedTemporaryFile(suffix=".edf", delete=False) as tmp:
+        tmp.write(file_content)
+        tmp_path = tmp.name
+
+    try:
+        raw = mne.io.read_raw_edf(tmp_path, preload=True, verbose=False)
+    finally:
+        os.remove(tmp_path)
+
+    picked_channels = [raw.ch_names[i] for i in _pick_indices(raw.ch_names)]
+    raw.pick_channels(picked_channels)
+
+    # Reorder channels to match training order
+    raw.reorder_channels(picked_channels) # pick_channels might preserve order, but let's be safe if we mapped them
+
+    # data is [channels, samples], we need [samples, channels]
+    return resample(raw.get_data().T, raw.info['sfreq'], TARGET_SFREQ)
+
+def _open_edf(file_content: bytes):
+    """
+    (reader, indices, sfreq) for the native reader, or None when the file
+    needs the MNE fallback.
+    """
+    try:
+        reader = EDFReader(file_content)
+    except ValueError:
+        return None
+
+    # Pick channels
+    # Labels are resolved once per header layout (e.g. "EEG Fp1-REF", T7 for T3)
+    indices = _pick_indices(reader.labels)
+
+    sfreqs = set(reader.sampling_rate(i) for i in indices)
+    if len(sfreqs) != 1:
+        return None
+    return reader, indices, sfreqs.pop()
+
+def _edf_chunks(reader: EDFReader, indices: List[int], sfreq: float) -> Iterator[np.ndarray]:
+    """The picked signals at TARGET_SFREQ, a few records at a time."""
+    if sfreq == TARGET_SFREQ:
+        yield from reader.iter_chunks(indices)
+        return
+
+    # Resample chunk by chunk so the full-rate float array is never built
+    resampler = StreamingResampler(sfreq, TARGET_SFREQ)
+    for chunk in reader.iter_chunks(indices):
+        yield resampler.process(chunk)
+    tail = resampler.flush()
+    if tail.shape[0]:
+        yield tail
+
 def parse_edf(file_content: bytes) -> np.ndarray:
     """
     Parses an EDF file content and returns a 2D numpy array [samples, channels].
+
+    The header and data records are decoded in memory by EDFReader; only the
+    REQUIRED_CHANNELS are converted to physical units.
     """
     try:
-        # MNE reads from a file path, so we need to write to a temp file or use a BytesIO wrapper if supported.
-        # MNE's read_raw_edf strictly requires a filename.
-        # We will write to a temp file.
-        import tempfile
-        import os
-
-        with tempfile.NamedTemporaryFile(suffix=".edf", delete=False) as tmp:
-            tmp.write(file_content)
-            tmp_path = tmp.name
-
-        try:
-            raw = mne.io.read_raw_edf(tmp_path, preload=True, verbose=False)
-        finally:
-            os.remove(tmp_path)
-
-        # Pick channels
-        # MNE channel names might be case sensitive or have extra labels (e.g. "EEG Fp1-REF")
-        # We need a robust matching strategy.
-        available_channels = raw.ch_names
-        picked_channels = []
-
-        for req_ch in REQUIRED_CHANNELS:
-            # Try exact match
-            if req_ch in available_channels:
-                picked_channels.append(req_ch)
-                continue
-
-            # Try case-insensitive or substring match
-            # This is a heuristic; might need refinement based on actual data
-            match = None
-            for av_ch in available_channels:
-                if req_ch.lower() in av_ch.lower():
-                    match = av_ch
-                    break
-
-            if match:
-                picked_channels.append(match)
-            else:
-                raise HTTPException(status_code=400, detail=f"Missing required channel: {req_ch}")
-
-        raw.pick_channels(picked_channels)
-
-        # Reorder channels to match training order
-        raw.reorder_channels(picked_channels) # pick_channels might preserve order, but let's be safe if we mapped them
-
-        # Resample if necessary
-        if raw.info['sfreq'] != TARGET_SFREQ:
-            raw.resample(TARGET_SFREQ)
-
-        # Get data
-        data, times = raw.get_data(return_times=True)
-        # data is [channels, samples], we need [samples, channels]
-        return data.T
+        opened = _open_edf(file_content)
+        if opened is None:
+            return _parse_edf_mne(file_content)
+        reader, indices, sfreq = opened
+
+        # Decode only the picked signals, already in training order
+        if sfreq == TARGET_SFREQ:
+            return reader.read_signals(indices)
+
+        # Resampled chunks go straight into the output array
+        n_samples = reader.n_records * reader.samples_per_record[indices[0]]
+        data = np.empty((resampled_length(n_samples, sfreq, TARGET_SFREQ), len(indices)))
+        position = 0
+        for chunk in _edf_chunks(reader, indices, sfreq):
+            data[position:position + chunk.shape[0]] = chunk
+            position += chunk.shape[0]
+        return data
+
+    except HTTPException as he:
+        raise he
+    except Exception as e:
+        raise HTTPException(status_code=400, detail=f"Error processing EDF file: {str(e)}")
 
+def iter_edf_chunks(file_content: bytes) -> Iterator[np.ndarray]:
+    """
+    Generator over an EDF upload as [chunk_samples, 16] arrays at
+    TARGET_SFREQ (used by /predict_file_stream), so neither the full-rate
+    nor the resampled recording is held at once. Files that need the MNE
+    fallback are yielded as one chunk.
+    """
+    try:
+        opened = _open_edf(file_content)
+        if opened is None:
+            yield _parse_edf_mne(file_content)
+            return
+        yield from _edf_chunks(*opened)
+
+    except HTTPException as he:
+        raise he
     except Exception as e:
         raise HTTPException(status_code=400, detail=f"Error processing EDF file: {str(e)}")
 
-def parse_csv(file_content: str) -> np.ndarray:
+def _csv_columns(file_content: bytes) -> List[str]:
+    """
+    Column projection for a CSV upload, decided from the header row only.
+
+    Mirrors the original rule: a 16-column file is taken as-is, otherwise
+    the REQUIRED_CHANNELS are selected by name.
     """
-    Parses a CSV string and returns a 2D numpy array.
+    columns = list(pd.read_csv(io.BytesIO(file_content), nrows=0).columns)
+
+    # Basic validation: check if we have 16 columns
+    if len(columns) == 16:
+        return columns
+
+    # Try to select by name if headers exist
+    if all(ch in columns for ch in REQUIRED_CHANNELS):
+        return REQUIRED_CHANNELS
+
+    raise HTTPException(status_code=400, detail=f"CSV must have 16 channels. Found {len(columns)}")
+
+def parse_csv(file_content: bytes) -> np.ndarray:
+    """
+    Parses CSV bytes and returns a 2D float64 numpy array.
     Assumes columns are channels and rows are timepoints.
+
+    Only the selected channel columns are parsed, with a fixed float64 dtype
+    (no inference), using the pyarrow engine when it is installed.
+    """
+    try:
+        columns = _csv_columns(file_content)
+        df = pd.read_csv(
+            io.BytesIO(file_content),
+            usecols=columns,
+            dtype={col: np.float64 for col in columns},
+            engine=CSV_ENGINE
+        )
+
+        return df[columns].to_numpy(dtype=np.float64)
+    except HTTPException as he:
+        raise he
+    except Exception as e:
+        raise HTTPException(status_code=400, detail=f"Error processing CSV file: {str(e)}")
+
+def iter_csv_chunks(file_content: bytes, chunk_rows: int = 256 * 60):
+    """
+    Generator over a CSV upload in row chunks.
+
+    Yields float64 arrays [<= chunk_rows, 16] so very long exports never have
+    to be parsed into one frame (used by /predict_file_stream).
     """
     try:
-        df = pd.read_csv(io.StringIO(file_content))
-
-        # Basic validation: check if we have 16 columns
-        # In a real app, we'd check headers too
-        if df.shape[1] != 16:
-             # Try to select by name if headers exist
-            if all(ch in df.columns for ch in REQUIRED_CHANNELS):
-                df = df[REQUIRED_CHANNELS]
-            else:
-                raise HTTPException(status_code=400, detail=f"CSV must have 16 channels. Found {df.shape[1]}")
-
-        return df.values
+        columns = _csv_columns(file_content)
+        reader = pd.read_csv(
+            io.BytesIO(file_content),
+            usecols=columns,
+            dtype={col: np.float64 for col in columns},
+            engine="c",  # pyarrow does not support chunked reads
+            chunksize=chunk_rows
+        )
+        with reader:
+            for chunk in reader:
+                yield chunk[columns].to_numpy(dtype=np.float64)
+    except HTTPException as he:
+        raise he
     except Exception as e:
         raise HTTPException(status_code=400, detail=f"Error processing CSV file: {str(e)}")
@@ -0,0 +1,147 @@
+"""
+Minimal in-memory EDF/EDF+ reader.
+
+Parses the header and data records straight from the uploaded bytes, so
+parsing an upload needs neither a temp file nor MNE. Records are decoded
+lazily through np.frombuffer views and only for the signals that are asked
+for.
+"""
+import numpy as np
+from typing import List, Iterator
+
+# Fixed-width header fields, in file order
+_MAIN_HEADER_BYTES = 256
+
+_SIGNAL_FIELDS = [
+    ("label", 16),
+    ("transducer", 80),
+    ("physical_dimension", 8),
+    ("physical_min", 8),
+    ("physical_max", 8),
+    ("digital_min", 8),
+    ("digital_max", 8),
+    ("prefiltering", 80),
+    ("samples_per_record", 8),
+    ("reserved", 32),
+]
+
+# Scale physical units to volts, like MNE does
+_UNIT_SCALE = {
+    "v": 1.0,
+    "mv": 1e-3,
+    "uv": 1e-6,
+    "µv": 1e-6,
+    "nv": 1e-9,
+}
+
+def _field(view: memoryview, start: int, size: int) -> str:
+    return bytes(view[start:start + size]).decode("latin-1").strip()
+
+class EDFReader:
+    """
+    Reader over the raw bytes of an EDF/EDF+ file.
+
+    Args:
+        content: The complete file content.
+    """
+
+    def __init__(self, content: bytes):
+        view = memoryview(content)
+        if len(view) < _MAIN_HEADER_BYTES:
+            raise ValueError("File too short to be EDF")
+
+        self.version = _field(view, 0, 8)
+        if self.version not in ("0", ""):
+            # BDF and other variants use 24-bit samples, not handled here
+            raise ValueError(f"Unsupported EDF version field: {self.version!r}")
+
+        self.header_bytes = int(_field(view, 184, 8))
+        self.reserved = _field(view, 192, 44)
+        n_records = int(_field(view, 236, 8))
+        self.record_duration = float(_field(view, 244, 8))
+        n_signals = int(_field(view, 252, 4))
+
+        if self.header_bytes != _MAIN_HEADER_BYTES * (n_signals + 1):
+            raise ValueError("Inconsistent EDF header size")
+
+        # Per-signal fields are stored field by field for all signals
+        fields = {}
+        offset = _MAIN_HEADER_BYTES
+        for name, size in _SIGNAL_FIELDS:
+            fields[name] = [_field(view, offset + i * size, size) for i in range(n_signals)]
+            offset += n_signals * size
+
+        self.labels: List[str] = fields["label"]
+        self.physical_dimensions: List[str] = fields["physical_dimension"]
+        self.samples_per_record = np.array([int(v) for v in fields["samples_per_record"]], dtype=np.int64)
+
+        physical_min = np.array([float(v) for v in fields["physical_min"]])
+        physical_max = np.array([float(v) for v in fields["physical_max"]])
+        digital_min = np.array([float(v) for v in fields["digital_min"]])
+        digital_max = np.array([float(v) for v in fields["digital_max"]])
+
+        # physical = digital * gain + offset, then scaled to volts
+        with np.errstate(divide="ignore", invalid="ignore"):
+            gain = (physical_max - physical_min) / (digital_max - digital_min)
+        gain = np.where(np.isfinite(gain), gain, 1.0)
+        unit_scale = np.array([
+            _UNIT_SCALE.get(dim.lower().replace("μ", "µ"), 1.0) for dim in self.physical_dimensions
+        ])
+        self.gain = gain * unit_scale
+        self.offset = (physical_min - digital_min * gain) * unit_scale
+
+        # Sample offsets (in int16 units) of each signal inside a data record
+        self.record_samples = int(self.samples_per_record.sum())
+        self.signal_offsets = np.concatenate([[0], np.cumsum(self.samples_per_record)[:-1]])
+
+        # Trust the data length over the header; -1 means "unknown" in EDF
+        available_records = (len(view) - self.header_bytes) // (2 * self.record_samples) if self.record_samples else 0
+        self.n_records = available_records if n_records < 0 else min(n_records, available_records)
+
+        # int16 view over the data records, no copy
+        self._records = np.frombuffer(
+            content, dtype="<i2", count=self.n_records * self.record_samples, offset=self.header_bytes
+        ).reshape(self.n_records, self.record_samples)
+
+    def sampling_rate(self, index: int) -> float:
+        return self.samples_per_record[index] / self.record_duration
+
+    def _check_uniform(self, indices: List[int]) -> int:
+        counts = set(int(self.samples_per_record[i]) for i in indices)
+        if len(counts) != 1:
+            raise ValueError("Selected EDF signals have different sampling rates")
+        return counts.pop()
+
+    def iter_chunks(self, indices: List[int], chunk_records: int = 64) -> Iterator[np.ndarray]:
+        """
+        Decode the selected signals a few records at a time.
+
+        Yields float64 arrays [chunk_samples, len(indices)] in volts.
+        """
+        per_record = self._check_uniform(indices)
+        gain = self.gain[indices]
+        offset = self.offset[indices]
+
+        for first in range(0, self.n_records, chunk_records):
+            records = self._records[first:first + chunk_records]
+            chunk = np.empty((records.shape[0] * per_record, len(indices)), dtype=np.float64)
+            for col, idx in enumerate(indices):
+                start = self.signal_offsets[idx]
+                chunk[:, col] = records[:, start:start + per_record].ravel()
+            chunk *= gain
+            chunk += offset
+            yield chunk
+
+    def read_signals(self, indices: List[int], chunk_records: int = 64) -> np.ndarray:
+        """
+        Decode the selected signals into one [n_samples, len(indices)] array in volts.
+        """
+        per_record = self._check_uniform(indices)
+        data = np.empty((self.n_records * per_record, len(indices)), dtype=np.float64)
+
+        position = 0
+        for chunk in self.iter_chunks(indices, chunk_records):
+            data[position:position + chunk.shape[0]] = chunk
+            position += chunk.shape[0]
+
+        return data
@@ -1,7 +1,8 @@
 import numpy as np
 import pandas as pd
 from scipy.signal import welch
-from typing import List, Dict, Union
+from functools import lru_cache
+from typing import Dict, Iterable, List, Union
 
 # Frequency bands
 BANDS = {
@@ -47,10 +48,138 @@ def compute_bandpower(data: np.ndarray, fs: int, method: str = 'welch') -> Dict[
 
     return bandpowers
 
+def _band_masks(freqs: np.ndarray) -> Dict[str, np.ndarray]:
+    """
+    Boolean frequency masks for each band, keyed like BANDS.
+    """
+    return {band: np.logical_and(freqs >= low, freqs <= high) for band, (low, high) in BANDS.items()}
+
+@lru_cache(maxsize=32)
+def _welch_layout(n_samples: int, fs: int):
+    """
+    Cached frequency grid and band masks for a given segment length and sampling rate.
+
+    Welch clips nperseg to the segment length, so the grid depends on both.
+    """
+    nperseg = min(fs * 2, n_samples)
+    freqs = np.fft.rfftfreq(nperseg, 1.0 / fs)
+    return nperseg, freqs[1] - freqs[0], _band_masks(freqs)
+
+def _moments(channels: np.ndarray):
+    """
+    Per-channel mean, std, skew and kurtosis of a [n_channels, n_samples] block.
+
+    Skew and kurtosis use the same bias-corrected estimators as pandas
+    Series.skew()/Series.kurtosis(), including returning 0 for flat channels.
+    """
+    n = channels.shape[-1]
+    mean = channels.mean(axis=-1)
+    std = channels.std(axis=-1)
+
+    adjusted = channels - mean[..., None]
+    adjusted2 = adjusted ** 2
+    m2 = adjusted2.sum(axis=-1)
+    m3 = (adjusted2 * adjusted).sum(axis=-1)
+    m4 = (adjusted2 ** 2).sum(axis=-1)
+
+    max_abs = np.abs(channels).max(axis=-1, initial=0.0)
+    skew, kurt = _shape_moments(n, m2, m3, m4, max_abs)
+
+    return mean, std, skew, kurt
+
+def _shape_moments(n: int, m2: np.ndarray, m3: np.ndarray, m4: np.ndarray, max_abs: np.ndarray):
+    """
+    Bias-corrected skew and kurtosis from central moment sums
+    m2 = sum((x - mean) ** 2), m3, m4 over n samples.
+    """
+    # Treat moments within floating point error of zero as zero (flat channels)
+    eps = np.finfo(np.float64).eps
+    m2 = np.where(np.abs(m2) < ((eps * max_abs) ** 2) * n, 0.0, m2)
+    m3 = np.where(np.abs(m3) < ((eps * max_abs) ** 3) * n, 0.0, m3)
+    m4 = np.where(np.abs(m4) < ((eps * max_abs) ** 4) * n, 0.0, m4)
+
+    # Vectorized np.power can differ from scalar pow in the last bit, so the
+    # handful of per-channel m2 ** 1.5 terms go through the scalar path.
+    m2_15 = np.array([v ** 1.5 for v in m2.ravel().tolist()]).reshape(m2.shape)
+
+    with np.errstate(invalid='ignore', divide='ignore'):
+        if n < 3:
+            skew = np.full(m2.shape, np.nan)
+        else:
+            skew = (n * (n - 1) ** 0.5 / (n - 2)) * (m3 / m2_15)
+            skew = np.where(m2 == 0, 0.0, skew)
+
+        if n < 4:
+            kurt = np.full(m2.shape, np.nan)
+        else:
+            adj = 3 * (n - 1) ** 2 / ((n - 2) * (n - 3))
+            numerator = n * (n + 1) * (n - 1) * m4
+            denominator = (n - 2) * (n - 3) * m2 ** 2
+            kurt = np.where(denominator == 0, 0.0, numerator / denominator - adj)
+
+    return skew, kurt
+
+def _bandpower_features(psd: np.ndarray, freq_res: float, masks: Dict[str, np.ndarray]) -> np.ndarray:
+    """
+    Integrate a [n_channels, n_freqs] PSD into [n_channels, 2 * n_bands] features.
+
+    Columns follow sorted(compute_bandpower(...).keys()), i.e. alpha_abs, alpha_rel, beta_abs, ...
+    """
+    # Boolean indexing along the last axis can return a strided view; summing a
+    # contiguous copy keeps numpy's pairwise summation identical to the 1D case.
+    abs_power = {
+        band: np.ascontiguousarray(psd[..., mask]).sum(axis=-1) * freq_res
+        for band, mask in masks.items()
+    }
+
+    total_power = 0
+    for band in BANDS.keys():
+        total_power = total_power + abs_power[band]
+
+    columns = []
+    with np.errstate(invalid='ignore', divide='ignore'):
+        for band in sorted(BANDS.keys()):
+            columns.append(abs_power[band])
+            columns.append(np.where(total_power > 0, abs_power[band] / total_power, 0))
+
+    return np.stack(columns, axis=-1)
+
+def _extract_features(channels: np.ndarray, fs: int) -> np.ndarray:
+    """
+    Shared feature computation for a [..., n_channels, n_samples] block.
+
+    Returns [..., n_channels * 14] with the per-channel order mean, std, skew,
+    kurtosis followed by the sorted bandpower keys.
+    """
+    n_samples = channels.shape[-1]
+
+    # Time domain stats
+    mean, std, skew, kurt = _moments(channels)
+
+    # Frequency domain features, one PSD for every channel
+    nperseg, freq_res, masks = _welch_layout(n_samples, fs)
+    _, psd = welch(channels, fs, nperseg=nperseg, axis=-1)
+    bandpowers = _bandpower_features(psd, freq_res, masks)
+
+    return _assemble_features(mean, std, skew, kurt, bandpowers)
+
+def _assemble_features(mean, std, skew, kurt, bandpowers: np.ndarray) -> np.ndarray:
+    """
+    Flatten per-channel stats [..., n_channels] and bandpowers
+    [..., n_channels, 10] into the model's feature layout.
+    """
+    features = np.concatenate([np.stack([mean, std, skew, kurt], axis=-1), bandpowers], axis=-1)
+    return features.reshape(features.shape[:-2] + (-1,))
+
 def extract_features_from_segment(segment: np.ndarray, fs: int = 256, channel_names: List[str] = None) -> np.ndarray:
     """
     Extract features from a multi-channel EEG segment.
 
+    All channels are processed at once: the segment is laid out channel-major so
+    every reduction runs over contiguous samples, and a single Welch PSD covers
+    all channels. The output layout matches the original per-channel loop, so
+    models trained on it keep working.
+
     Args:
         segment: 2D array [n_samples, n_channels]
         fs: Sampling rate
@@ -59,42 +188,110 @@ def extract_features_from_segment(segment: np.ndarray, fs: int = 256, channel_na
     Returns:
         1D feature vector.
     """
-    n_samples, n_channels = segment.shape
+    channels = np.ascontiguousarray(np.asarray(segment, dtype=np.float64).T)
+
+    # Global features (ratios, etc.) - Simplified for now
+    # TODO: Add cross-channel features if needed
+
+    return _extract_features(channels, fs)
 
-    features = []
+def extract_features_batch(segments: np.ndarray, fs: int = 256) -> np.ndarray:
+    """
+    Extract features from a stack of equally sized EEG segments.
 
-    # Per-channel features
-    for ch in range(n_channels):
-        ch_data = segment[:, ch]
+    Args:
+        segments: 3D array [n_segments, n_samples, n_channels]
+        fs: Sampling rate
 
-        # Time domain stats
-        features.append(np.mean(ch_data))
-        features.append(np.std(ch_data))
-        features.append(pd.Series(ch_data).skew())
-        features.append(pd.Series(ch_data).kurtosis())
+    Returns:
+        2D feature matrix [n_segments, n_features], row i equal to
+        extract_features_from_segment(segments[i], fs).
+    """
+    channels = np.ascontiguousarray(np.asarray(segments, dtype=np.float64).transpose(0, 2, 1))
+    return _extract_features(channels, fs)
 
-        # Frequency domain features
-        bp = compute_bandpower(ch_data, fs)
-        # Order: delta_abs, theta_abs, ..., delta_rel, ...
-        # We sort by keys to be deterministic
-        for key in sorted(bp.keys()):
-            features.append(bp[key])
+def sliding_windows(data: np.ndarray, window_size_sec: float = 4, step_size_sec: float = 2, fs: int = 256) -> np.ndarray:
+    """
+    Zero-copy sliding windows over a recording.
 
-    # Global features (ratios, etc.) - Simplified for now
-    # TODO: Add cross-channel features if needed
+    Args:
+        data: 2D array [n_samples, n_channels]
+        window_size_sec: Window length in seconds
+        step_size_sec: Hop between window starts in seconds
+        fs: Sampling rate
+
+    Returns:
+        Read-only strided view [n_windows, window_samples, n_channels]; window i
+        starts at sample i * step. Empty along axis 0 if the recording is
+        shorter than one window.
+    """
+    window_size_samples = int(window_size_sec * fs)
+    step_size_samples = int(step_size_sec * fs)
+    if window_size_samples <= 0 or step_size_samples <= 0:
+        raise ValueError("Window and step size must be positive")
+
+    data = np.asarray(data)
+    if data.shape[0] < window_size_samples:
+        return np.empty((0, window_size_samples, data.shape[1]), dtype=data.dtype)
 
-    return np.array(features)
+    # sliding_window_view appends the window axis: [n_starts, n_channels, window]
+    windows = np.lib.stride_tricks.sliding_window_view(data, window_size_samples, axis=0)
+    return windows[::step_size_samples].transpose(0, 2, 1)
 
-def segment_data(df: pd.DataFrame, window_size_sec: int = 4, step_size_sec: int = 2, fs: int = 256):
+def iter_window_batches(data: np.ndarray, window_size_sec: float = 4, step_size_sec: float = 2, fs: int = 256, batch_size: int = 64):
     """
-    Generator that yields segments of data.
+    Generator over sliding windows in batches.
+
+    Yields (start_samples, windows) where windows is a strided view
+    [<= batch_size, window_samples, n_channels], so only one batch is ever
+    materialized by the feature extractor.
+    """
+    windows = sliding_windows(data, window_size_sec, step_size_sec, fs)
+    step_size_samples = int(step_size_sec * fs)
+
+    for first in range(0, windows.shape[0], batch_size):
+        batch = windows[first:first + batch_size]
+        starts = np.arange(first, first + batch.shape[0]) * step_size_samples
+        yield starts, batch
+
+def iter_chunked_window_batches(chunks: Iterable[np.ndarray], window_size_sec: float = 4, step_size_sec: float = 2,
+                                fs: int = 256, batch_size: int = 64):
+    """
+    iter_window_batches over a recording that arrives as [n_samples, n_channels]
+    row chunks (e.g. data_processing.iter_csv_chunks).
+
+    Only the samples of windows that are not complete yet are carried over
+    to the next chunk, so the recording is never held in memory at once.
+    Start samples are absolute, and the windows are the same as
+    iter_window_batches on the concatenated recording.
     """
-    window_size_samples = window_size_sec * fs
-    step_size_samples = step_size_sec * fs
+    window_size_samples = int(window_size_sec * fs)
+    step_size_samples = int(step_size_sec * fs)
+    if window_size_samples <= 0 or step_size_samples <= 0:
+        raise ValueError("Window and step size must be positive")
+
+    buffer = None
+    offset = 0      # absolute sample index of buffer[0]
+    next_start = 0  # absolute start of the next window to emit
+
+    for chunk in chunks:
+        buffer = chunk if buffer is None else np.concatenate([buffer, chunk])
+        skip = min(next_start - offset, buffer.shape[0])
+        buffer, offset = buffer[skip:], offset + skip
 
-    n_rows = len(df)
+        windows = sliding_windows(buffer, window_size_sec, step_size_sec, fs)
+        for first in range(0, windows.shape[0], batch_size):
+            batch = windows[first:first + batch_size]
+            starts = next_start + np.arange(first, first + batch.shape[0]) * step_size_samples
+            yield starts, batch
+        next_start += windows.shape[0] * step_size_samples
 
-    for start in range(0, n_rows - window_size_samples + 1, step_size_samples):
-        end = start + window_size_samples
-        segment = df.iloc[start:end]
+def segment_data(df: Union[pd.DataFrame, np.ndarray], window_size_sec: int = 4, step_size_sec: int = 2, fs: int = 256):
+    """
+    Generator that yields segments of data.
+
+    Segments are strided views [window_samples, n_channels] into the
+    recording rather than DataFrame copies.
+    """
+    for segment in sliding_windows(np.asarray(df), window_size_sec, step_size_sec, fs):
         yield segment
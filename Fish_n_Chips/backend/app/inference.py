@@ -0,0 +1,204 @@
+"""
+EEG inference helpers shared by the API process and the compute pool workers.
+
+Everything here takes the model (and the version to report) explicitly, so
+worker processes can call the same code with their own registry's copy.
+"""
+import numpy as np
+from fastapi import HTTPException
+
+from .schemas import PredictionResponse, BatchPredictionResponse, StreamingPredictionResponse, WindowPrediction
+from .feature_extraction import (
+    extract_features_from_segment, extract_features_batch, iter_window_batches, iter_chunked_window_batches
+)
+from .data_processing import parse_edf, parse_csv, iter_csv_chunks, iter_edf_chunks
+
+def get_risk_level(probability: float) -> str:
+    if probability < 0.3:
+        return "Low"
+    elif probability < 0.7:
+        return "Medium"
+    return "High"
+
+def score_features(model, features: np.ndarray):
+    """
+    Score a [n_rows, n_features] matrix with a single predict_proba call.
+
+    The predicted class is taken from the probabilities (argmax over
+    model.classes_), which is exactly what predict() does for the forest,
+    so the ensemble is only evaluated once.
+
+    Returns:
+        (status_classes, probabilities) where probabilities is P(class 1) per row.
+    """
+    proba = model.predict_proba(features)
+    status_classes = model.classes_[np.argmax(proba, axis=1)]
+    return status_classes, proba[:, 1]
+
+def run_inference(model, eeg_data: np.ndarray, fs: int, model_version: str):
+    if model is None:
+        raise HTTPException(status_code=503, detail="Model not loaded")
+
+    # Check shape
+    if eeg_data.ndim != 2:
+        raise HTTPException(status_code=400, detail="EEG data must be 2D array [samples, channels]")
+
+    if eeg_data.shape[1] != 16:
+        raise HTTPException(status_code=400, detail=f"EEG data must have 16 channels. Got {eeg_data.shape[1]}")
+
+    # Extract features
+    features = extract_features_from_segment(eeg_data, fs=fs)
+
+    # Reshape for prediction (1, n_features)
+    features_reshaped = features.reshape(1, -1)
+
+    # Predict
+    status_classes, probabilities = score_features(model, features_reshaped)
+    probability = float(probabilities[0])
+
+    return PredictionResponse(
+        status_class=int(status_classes[0]),
+        probability=probability,
+        risk_level=get_risk_level(probability),
+        model_version=model_version
+    )
+
+def run_batch_inference(model, segments: np.ndarray, fs: int, model_version: str):
+    if model is None:
+        raise HTTPException(status_code=503, detail="Model not loaded")
+
+    # Check shape
+    if segments.ndim != 3:
+        raise HTTPException(status_code=400, detail="EEG segments must be 3D array [segments, samples, channels]")
+
+    if segments.shape[0] == 0:
+        raise HTTPException(status_code=400, detail="No EEG segments to score")
+
+    if segments.shape[2] != 16:
+        raise HTTPException(status_code=400, detail=f"EEG data must have 16 channels. Got {segments.shape[2]}")
+
+    # Extract features for every segment -> (n_segments, n_features)
+    features = extract_features_batch(segments, fs=fs)
+
+    # One model call for the whole batch
+    status_classes, probabilities = score_features(model, features)
+
+    predictions = [
+        PredictionResponse(
+            status_class=int(status_class),
+            probability=float(probability),
+            risk_level=get_risk_level(float(probability)),
+            model_version=model_version
+        )
+        for status_class, probability in zip(status_classes, probabilities)
+    ]
+
+    return BatchPredictionResponse(
+        n_segments=len(predictions),
+        predictions=predictions,
+        model_version=model_version
+    )
+
+def parse_upload(contents: bytes, filename: str):
+    """
+    Parse an uploaded EEG file into ([samples, channels], fs).
+    """
+    filename = filename.lower()
+
+    if filename.endswith(".edf"):
+        eeg_data = parse_edf(contents)
+        # EDFs usually have their own fs, but parse_edf resamples to 256
+        fs = 256
+    elif filename.endswith(".csv"):
+        # Parsed straight from bytes, only the channel columns
+        eeg_data = parse_csv(contents)
+        fs = 256 # Assumption for CSVs unless specified otherwise
+    else:
+        raise HTTPException(status_code=400, detail="Unsupported file format. Use .csv or .edf")
+
+    return eeg_data, fs
+
+def parse_upload_chunks(contents: bytes, filename: str):
+    """
+    Like parse_upload, but the recording comes back as an iterator of
+    chunks (iter_csv_chunks / iter_edf_chunks) that run_streaming_inference
+    windows as it reads.
+    """
+    filename = filename.lower()
+    if filename.endswith(".csv"):
+        return iter_csv_chunks(contents), 256
+    if filename.endswith(".edf"):
+        # Resampled to 256 Hz chunk by chunk
+        return iter_edf_chunks(contents), 256
+    return parse_upload(contents, filename)
+
+def _check_eeg_shape(eeg_data: np.ndarray):
+    if eeg_data.ndim != 2:
+        raise HTTPException(status_code=400, detail="EEG data must be 2D array [samples, channels]")
+
+    if eeg_data.shape[1] != 16:
+        raise HTTPException(status_code=400, detail=f"EEG data must have 16 channels. Got {eeg_data.shape[1]}")
+
+def _checked_chunks(chunks):
+    for chunk in chunks:
+        _check_eeg_shape(chunk)
+        yield chunk
+
+def run_streaming_inference(model, eeg_data, fs: int, window_size_sec: float, step_size_sec: float, batch_size: int,
+                            model_version: str):
+    """
+    Args:
+        eeg_data: [samples, channels] array, or an iterable of such row
+            chunks (see parse_upload_chunks).
+    """
+    if model is None:
+        raise HTTPException(status_code=503, detail="Model not loaded")
+
+    if isinstance(eeg_data, np.ndarray):
+        _check_eeg_shape(eeg_data)
+
+    if batch_size <= 0:
+        raise HTTPException(status_code=400, detail="batch_size must be positive")
+
+    timeline = []
+    try:
+        # Windows are strided views; only one batch of them is copied at a time
+        if isinstance(eeg_data, np.ndarray):
+            batches = iter_window_batches(eeg_data, window_size_sec, step_size_sec, fs, batch_size)
+        else:
+            batches = iter_chunked_window_batches(_checked_chunks(eeg_data), window_size_sec, step_size_sec, fs, batch_size)
+        for starts, windows in batches:
+            features = extract_features_batch(windows, fs=fs)
+            status_classes, probabilities = score_features(model, features)
+
+            for start, status_class, probability in zip(starts, status_classes, probabilities):
+                probability = float(probability)
+                timeline.append(WindowPrediction(
+                    start_sec=start / fs,
+                    end_sec=start / fs + window_size_sec,
+                    status_class=int(status_class),
+                    probability=probability,
+                    risk_level=get_risk_level(probability)
+                ))
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+    if not timeline:
+        raise HTTPException(status_code=400, detail=f"Recording is shorter than one {window_size_sec}s window")
+
+    # Aggregate verdict: mean window probability
+    probabilities = np.array([w.probability for w in timeline])
+    mean_probability = float(np.mean(probabilities))
+
+    return StreamingPredictionResponse(
+        status_class=int(mean_probability >= 0.5),
+        probability=mean_probability,
+        max_probability=float(np.max(probabilities)),
+        positive_window_fraction=float(np.mean([w.status_class == 1 for w in timeline])),
+        risk_level=get_risk_level(mean_probability),
+        model_version=model_version,
+        n_windows=len(timeline),
+        window_size_sec=window_size_sec,
+        step_size_sec=step_size_sec,
+        timeline=timeline
+    )
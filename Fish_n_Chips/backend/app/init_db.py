@@ -2,13 +2,29 @@
 Initialize the database tables.
 Run this script once to create the database schema.
 """
+from sqlalchemy import inspect, text
 from database import engine, Base
 from models.db_models import SpeechTestResult, SentenceRecording, CognitiveGameSession, GameAttempt, EEGTestResult
 
+def add_missing_columns():
+    """Add columns introduced since a table was created (create_all only creates missing tables)"""
+    inspector = inspect(engine)
+    with engine.begin() as conn:
+        for table in Base.metadata.sorted_tables:
+            if not inspector.has_table(table.name):
+                continue
+            existing = {column["name"] for column in inspector.get_columns(table.name)}
+            for column in table.columns:
+                if column.name not in existing:
+                    column_type = column.type.compile(dialect=engine.dialect)
+                    conn.execute(text(f"ALTER TABLE {table.name} ADD COLUMN {column.name} {column_type}"))
+                    print(f"Added column {table.name}.{column.name}")
+
 def init_db():
     """Create all tables in the database"""
     print("Creating database tables...")
     Base.metadata.create_all(bind=engine)
+    add_missing_columns()
     print("✅ Database tables created successfully!")
     print(f"Database location: cogni_safe.db")
 
@@ -1,8 +1,7 @@
 from fastapi import FastAPI, HTTPException, UploadFile, File, WebSocket
 from fastapi.middleware.cors import CORSMiddleware
-import joblib
 import numpy as np
-import os
+import math
 import asyncio
 import json
 from contextlib import asynccontextmanager
@@ -10,9 +9,20 @@ from dotenv import load_dotenv
 
 load_dotenv()
 
-from .schemas import EEGSampleRequest, PredictionResponse, SaveEEGResultRequest
-from .feature_extraction import extract_features_from_segment
-from .data_processing import parse_edf, parse_csv
+from .schemas import (
+    EEGSampleRequest, PredictionResponse, SaveEEGResultRequest, EEGBatchRequest, BatchPredictionResponse,
+    StreamingPredictionResponse
+)
+from .feature_extraction import sliding_windows
+from .inference import score_features, get_risk_level, run_inference, run_batch_inference
+from .streaming_features import StreamingFeatureExtractor
+from .ws_protocol import DTYPES, encode_frame, decimate_for_display
+from .services.compute_pool import compute_pool, eeg_predict_file_job, eeg_predict_file_stream_job
+from .services.model_registry import model_registry
+from .utils.memory import process_memory
+from .services.speech.whisper_service import load_asr_model
+from .services.speech.analysis_cache import analysis_cache
+from .services.speech.linguistic_analyzer import linguistic_analyzer
 from backend.app.routers import speech_analysis, cognitive_games, unified_analysis
 from backend.app.database import get_db
 from sqlalchemy.orm import Session
@@ -25,30 +35,32 @@ from fastapi import Depends
 # ... (existing code) ...
 
 
-# Global variables for model and scaler
-model = None
+# Global variables for scaler
 scaler = None
 
 @asynccontextmanager
 async def lifespan(app: FastAPI):
-    # Load model on startup
-    global model, scaler
-    model_path = os.path.join("models", "eeg_best_model.joblib")
+    # Load models on startup (MODEL_PRELOAD); anything else loads on first use
+    global scaler
     # scaler_path = os.path.join("models", "eeg_scaler.joblib") # If scaler is separate
 
-    try:
-        # Check if model exists (it might not if notebooks haven't run)
-        if os.path.exists(model_path):
-            model = joblib.load(model_path)
-            print(f"Model loaded from {model_path}")
-        else:
-            print(f"Warning: Model not found at {model_path}. Inference will fail.")
+    before = process_memory()
+    model_registry.preload()
+    after = process_memory()
+    if before and after:
+        print(f"API process: RSS {before['rss_mb']} MB -> {after['rss_mb']} MB after loading models")
 
-    except Exception as e:
-        print(f"Error loading model: {e}")
+    # Local ASR model (ASR_BACKEND=local) stays warm in this process
+    await asyncio.to_thread(load_asr_model)
+    # Trimmed spaCy pipeline for linguistic features, batched across requests
+    await asyncio.to_thread(linguistic_analyzer.load)
+
+    # Worker processes for CPU-bound EEG/speech stages (they preload the models)
+    compute_pool.start()
 
     yield
     # Clean up if needed
+    compute_pool.shutdown()
 
 app = FastAPI(title="CogniSafe EEG Screener", lifespan=lifespan)
 
@@ -65,6 +77,16 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
+def _int_query_param(websocket: WebSocket, name: str, default: int):
+    """Integer query parameter, or (default, error message) if it is not one."""
+    value = websocket.query_params.get(name)
+    if value is None:
+        return default, None
+    try:
+        return int(value), None
+    except ValueError:
+        return default, f"Invalid {name} '{value}', using {default}"
+
 @app.websocket("/ws/simulate")
 async def websocket_endpoint(websocket: WebSocket):
     await websocket.accept()
@@ -77,46 +99,80 @@ async def websocket_endpoint(websocket: WebSocket):
         window_size = 4 * fs # 4 seconds
         n_channels = 16
 
+        # Per-client frame options, e.g. /ws/simulate?format=binary&dtype=int16&decimate=4
+        binary = websocket.query_params.get("format", "json") == "binary"
+        sample_dtype = websocket.query_params.get("dtype", "float32")
+        if sample_dtype not in DTYPES:
+            sample_dtype = "float32"
+        decimate, decimate_error = _int_query_param(websocket, "decimate", 1)
+        decimate = max(1, decimate)
+        # Emit a prediction every hop, e.g. ?hop_ms=250; at least one sample
+        hop_ms, hop_error = _int_query_param(websocket, "hop_ms", 1000)
+        hop_sec = max(hop_ms, math.ceil(1000 / fs)) / 1000
+        # Bad options are reported, then the stream runs with the defaults
+        for error in (decimate_error, hop_error):
+            if error:
+                await websocket.send_text(json.dumps({"error": error}))
+
+        # Per-connection ring buffer; each hop only processes the new samples
+        engine = StreamingFeatureExtractor(n_channels=n_channels, fs=fs, window_sec=window_size / fs, hop_sec=hop_sec)
+        hop_size = engine.hop
+        # Prime the first window so the first prediction is immediate
+        new_samples = window_size
+
         while True:
-            # Generate dummy chunk (replace with real file reading logic if needed)
+            # Generate dummy samples (replace with real device/file reading logic if needed)
             # We generate slightly different noise to vary the probability
             noise_level = np.random.uniform(0.5, 2.0)
-            chunk = np.random.randn(window_size, n_channels) * noise_level
+            block = np.random.randn(new_samples, n_channels) * noise_level
+            emitted = engine.push(block)
+            new_samples = hop_size
 
-            # Run inference on this chunk
+            # Run inference on the current window
             # We need to handle the potential errors gracefully inside the loop
             try:
-                features = extract_features_from_segment(chunk, fs=fs)
-                features_reshaped = features.reshape(1, -1)
-
-                if model:
-                    status_class = int(model.predict(features_reshaped)[0])
-                    probability = float(model.predict_proba(features_reshaped)[0][1])
-
-                    if probability < 0.3:
-                        risk_level = "Low"
-                    elif probability < 0.7:
-                        risk_level = "Medium"
+                if not emitted:
+                    await asyncio.sleep(hop_sec)
+                    continue
+
+                # Only the samples the client has not seen yet (the whole window on the first frame)
+                chunk = block
+                features_reshaped = emitted[-1].reshape(1, -1)
+
+                eeg = model_registry.get("eeg")
+                if eeg:
+                    status_classes, probabilities = score_features(eeg.model, features_reshaped)
+                    status_class = int(status_classes[0])
+                    probability = float(probabilities[0])
+                    risk_level = get_risk_level(probability)
+
+                    timestamp = np.random.randint(0, 10000) # Mock timestamp
+
+                    if binary:
+                        # Small header + raw little-endian samples (see ws_protocol)
+                        await websocket.send_bytes(encode_frame(
+                            timestamp, status_class, probability, risk_level,
+                            chunk, dtype=sample_dtype, decimate=decimate
+                        ))
                     else:
-                        risk_level = "High"
-
-                    response = {
-                        "timestamp": np.random.randint(0, 10000), # Mock timestamp
-                        "status_class": status_class,
-                        "probability": probability,
-                        "risk_level": risk_level,
-                        "raw_chunk": chunk.tolist() # Send raw data for visualization (careful with size)
-                    }
-
-                    await websocket.send_text(json.dumps(response))
+                        response = {
+                            "timestamp": timestamp,
+                            "status_class": status_class,
+                            "probability": probability,
+                            "risk_level": risk_level,
+                            # Send raw data for visualization (careful with size)
+                            "raw_chunk": decimate_for_display(chunk, decimate).tolist()
+                        }
+
+                        await websocket.send_text(json.dumps(response))
                 else:
                     await websocket.send_text(json.dumps({"error": "Model not loaded"}))
 
             except Exception as e:
                 await websocket.send_text(json.dumps({"error": str(e)}))
 
-            # Wait for 1 second before next chunk (simulating real-time)
-            await asyncio.sleep(1)
+            # Wait for one hop before the next samples (simulating real-time)
+            await asyncio.sleep(hop_sec)
 
     except Exception as e:
         print(f"WebSocket error: {e}")
@@ -125,51 +181,78 @@ async def websocket_endpoint(websocket: WebSocket):
 
 
 
-@app.get("/health")
-def health_check():
-    return {"status": "healthy", "model_loaded": model is not None}
-
-def run_inference(eeg_data: np.ndarray, fs: int):
-    if model is None:
+def _eeg_model():
+    eeg = model_registry.get("eeg")
+    if eeg is None:
         raise HTTPException(status_code=503, detail="Model not loaded")
+    return eeg
 
-    # Check shape
-    if eeg_data.ndim != 2:
-        raise HTTPException(status_code=400, detail="EEG data must be 2D array [samples, channels]")
-
-    if eeg_data.shape[1] != 16:
-        raise HTTPException(status_code=400, detail=f"EEG data must have 16 channels. Got {eeg_data.shape[1]}")
-
-    # Extract features
-    features = extract_features_from_segment(eeg_data, fs=fs)
-
-    # Reshape for prediction (1, n_features)
-    features_reshaped = features.reshape(1, -1)
-
-    # Predict
-    status_class = int(model.predict(features_reshaped)[0])
-    probability = float(model.predict_proba(features_reshaped)[0][1])
-
-    # Determine risk level
-    if probability < 0.3:
-        risk_level = "Low"
-    elif probability < 0.7:
-        risk_level = "Medium"
-    else:
-        risk_level = "High"
-
-    return PredictionResponse(
-        status_class=status_class,
-        probability=probability,
-        risk_level=risk_level,
-        model_version="v1.0"
-    )
+@app.get("/health")
+def health_check():
+    models = model_registry.status()
+    memory = {
+        "api": process_memory(),
+        "workers": {str(pid): process_memory(pid) for pid in compute_pool.worker_pids()}
+    }
+    return {
+        "status": "healthy",
+        "model_loaded": models["eeg"]["loaded"],
+        "models": models,
+        "memory": memory,
+        "analysis_cache": analysis_cache.stats()
+    }
+
+@app.post("/models/reload")
+def reload_models(name: str = None):
+    """
+    Swap in updated model artifacts without a restart.
+
+    Worker processes pick the new files up on their next job.
+    """
+    if name and name not in model_registry.names:
+        raise HTTPException(status_code=404, detail=f"Unknown model: {name}")
+    names = [name] if name else model_registry.names
+    for model_name in names:
+        try:
+            model_registry.reload(model_name)
+        except Exception as e:
+            raise HTTPException(status_code=500, detail=f"Error reloading model '{model_name}': {e}")
+    return {"models": {n: model_registry.status()[n] for n in names}}
 
 @app.post("/predict", response_model=PredictionResponse)
 def predict_eeg(request: EEGSampleRequest):
     try:
+        eeg = _eeg_model()
         eeg_data = np.array(request.eeg)
-        return run_inference(eeg_data, request.sampling_rate)
+        return run_inference(eeg.model, eeg_data, request.sampling_rate, eeg.version)
+    except HTTPException as he:
+        raise he
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
+@app.post("/predict_batch", response_model=BatchPredictionResponse)
+def predict_eeg_batch(request: EEGBatchRequest):
+    try:
+        eeg = _eeg_model()
+        fs = request.sampling_rate
+        if request.segments is not None:
+            segments = np.array(request.segments, dtype=np.float64)
+        elif request.recording is not None:
+            recording = np.array(request.recording, dtype=np.float64)
+            if recording.ndim != 2:
+                raise HTTPException(status_code=400, detail="Recording must be 2D array [samples, channels]")
+            segments = sliding_windows(recording, request.window_size_sec, request.step_size_sec, fs)
+            if segments.shape[0] == 0:
+                raise HTTPException(
+                    status_code=400,
+                    detail=f"Recording is shorter than one {request.window_size_sec}s window"
+                )
+        else:
+            raise HTTPException(status_code=400, detail="Provide either 'segments' or 'recording'")
+
+        return run_batch_inference(eeg.model, segments, fs, eeg.version)
+    except HTTPException as he:
+        raise he
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
@@ -177,20 +260,33 @@ def predict_eeg(request: EEGSampleRequest):
 async def predict_file(file: UploadFile = File(...)):
     try:
         contents = await file.read()
-        filename = file.filename.lower()
-
-        if filename.endswith(".edf"):
-            eeg_data = parse_edf(contents)
-            # EDFs usually have their own fs, but parse_edf resamples to 256
-            fs = 256
-        elif filename.endswith(".csv"):
-            # Decode bytes to string for CSV
-            eeg_data = parse_csv(contents.decode('utf-8'))
-            fs = 256 # Assumption for CSVs unless specified otherwise
-        else:
-            raise HTTPException(status_code=400, detail="Unsupported file format. Use .csv or .edf")
 
-        return run_inference(eeg_data, fs)
+        # Parsing, feature extraction and the forest run in a worker process
+        return await compute_pool.run(eeg_predict_file_job, contents, file.filename)
+
+    except HTTPException as he:
+        raise he
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
+@app.post("/predict_file_stream", response_model=StreamingPredictionResponse)
+async def predict_file_stream(
+    file: UploadFile = File(...),
+    window_size_sec: float = 4,
+    step_size_sec: float = 2,
+    batch_size: int = 64
+):
+    """
+    Score a full-length recording window by window.
+
+    Returns the per-window probability timeline plus an aggregated verdict.
+    """
+    try:
+        contents = await file.read()
+
+        return await compute_pool.run(
+            eeg_predict_file_stream_job, contents, file.filename, window_size_sec, step_size_sec, batch_size
+        )
 
     except HTTPException as he:
         raise he
@@ -0,0 +1,77 @@
+"""
+Channel-name resolution for EEG montages.
+
+Acquisition devices label the same electrode in many ways ("Fp1",
+"EEG FP1-REF", "EEG Fp1-LE") and newer 10-10 names replace some of the
+old 10-20 ones (T3 -> T7). resolve_channel_indices maps a recording's
+labels onto REQUIRED_CHANNELS once per distinct header and caches the
+result, so repeat uploads from the same device skip matching entirely.
+"""
+from functools import lru_cache
+from typing import Dict, List, Tuple
+
+REQUIRED_CHANNELS = [
+    'Fp1', 'Fp2', 'F7', 'F3', 'Fz', 'F4', 'F8', 'T3',
+    'C3', 'Cz', 'C4', 'T4', 'T5', 'P3', 'Pz', 'P4'
+]
+
+# Old 10-20 name -> equivalent 10-10 names
+CHANNEL_ALIASES: Dict[str, List[str]] = {
+    'T3': ['T7'],
+    'T4': ['T8'],
+    'T5': ['P7'],
+    'T6': ['P8'],
+}
+
+_PREFIXES = ('eeg ', 'eeg-')
+_SUFFIXES = ('-ref', '-le', '-avg', '-ar')
+
+def normalize_label(label: str) -> str:
+    """
+    Canonical lowercase form of a channel label: "EEG Fp1-REF" -> "fp1".
+
+    Bipolar derivations such as "T3-T5" are left intact so they never
+    match a single electrode.
+    """
+    name = label.strip().lower()
+    for prefix in _PREFIXES:
+        if name.startswith(prefix) and len(name) > len(prefix):
+            name = name[len(prefix):].strip()
+            break
+    for suffix in _SUFFIXES:
+        if name.endswith(suffix):
+            name = name[:-len(suffix)].strip()
+            break
+    return name
+
+@lru_cache(maxsize=128)
+def resolve_channel_indices(labels: Tuple[str, ...], required: Tuple[str, ...] = tuple(REQUIRED_CHANNELS)) -> Tuple[int, ...]:
+    """
+    Indices into `labels` for each required channel, in required order.
+
+    Exact label matches win, then normalized names, then aliases. The result
+    is cached by the label tuple, i.e. by header signature.
+
+    Raises:
+        ValueError: If a required channel has no match.
+    """
+    exact = {label: i for i, label in enumerate(labels)}
+    normalized = {}
+    for i, label in enumerate(labels):
+        normalized.setdefault(normalize_label(label), i)
+
+    indices = []
+    for req_ch in required:
+        if req_ch in exact:
+            indices.append(exact[req_ch])
+            continue
+
+        for candidate in [req_ch] + CHANNEL_ALIASES.get(req_ch, []):
+            idx = normalized.get(candidate.lower())
+            if idx is not None:
+                indices.append(idx)
+                break
+        else:
+            raise ValueError(f"Missing required channel: {req_ch}")
+
+    return tuple(indices)
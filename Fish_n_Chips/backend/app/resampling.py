@@ -0,0 +1,140 @@
+"""
+Rational polyphase resampling for multi-channel EEG.
+
+Anti-alias kernels are designed once per (source_rate, target_rate) pair and
+cached, so the common 500/512 Hz -> 256 Hz conversions never redesign a
+filter. resample() converts a whole recording through scipy's resample_poly;
+StreamingResampler produces the same output chunk by chunk for pipelines that
+never hold the full recording.
+"""
+import numpy as np
+from fractions import Fraction
+from functools import lru_cache
+from scipy.signal import firwin, resample_poly, upfirdn
+
+# Same filter design as scipy.signal.resample_poly's default
+KAISER_BETA = 5.0
+MAX_DENOMINATOR = 1000
+
+@lru_cache(maxsize=16)
+def get_kernel(source_rate: float, target_rate: float):
+    """
+    Cached anti-alias kernel for a rate pair.
+
+    Returns:
+        (up, down, h, padded) where h is the low-pass FIR (not yet scaled by
+        `up`) and padded is the scaled, delay-padded filter resample_poly
+        passes to upfirdn, used by StreamingResampler.
+    """
+    ratio = Fraction(target_rate / source_rate).limit_denominator(MAX_DENOMINATOR)
+    up, down = ratio.numerator, ratio.denominator
+
+    max_rate = max(up, down)
+    half_len = 10 * max_rate
+    h = firwin(2 * half_len + 1, 1.0 / max_rate, window=('kaiser', KAISER_BETA))
+
+    # resample_poly pads the filter so output samples sit at its center
+    n_pre_pad = down - half_len % down
+    padded = np.concatenate([np.zeros(n_pre_pad), h * up])
+
+    return up, down, h, padded
+
+def resampled_length(n_samples: int, source_rate: float, target_rate: float = 256) -> int:
+    """Number of samples resample() returns for n_samples of input."""
+    if source_rate == target_rate:
+        return n_samples
+    up, down, _, _ = get_kernel(source_rate, target_rate)
+    return -(-n_samples * up // down)
+
+def _pre_remove(down: int, h: np.ndarray) -> int:
+    half_len = (len(h) - 1) // 2
+    return (half_len + down - half_len % down) // down
+
+def resample(data: np.ndarray, source_rate: float, target_rate: float = 256) -> np.ndarray:
+    """
+    Resample a [n_samples, n_channels] array along the sample axis.
+    """
+    if source_rate == target_rate:
+        return data
+    up, down, h, _ = get_kernel(source_rate, target_rate)
+    return resample_poly(data, up, down, axis=0, window=h)
+
+class StreamingResampler:
+    """
+    Chunk-wise polyphase resampler.
+
+    Feeding a recording through process() in arbitrary chunks and calling
+    flush() at the end yields the same samples as resample() on the whole
+    array. Each call filters the new chunk plus the filter history (a few
+    dozen input samples) with one upfirdn pass over all channels, so the
+    work and memory per call are linear in the chunk.
+    """
+
+    def __init__(self, source_rate: float, target_rate: float = 256):
+        self.up, self.down, h, self.filter = get_kernel(source_rate, target_rate)
+        self.pre_remove = _pre_remove(self.down, h)
+
+        self.n_in = 0           # input samples received so far
+        self.next_out = 0       # index of the next output sample
+        self._buffer = None     # retained input, first row is sample self._buffer_start
+        self._buffer_start = 0  # always a multiple of `down` (see _emit)
+
+    def _emit(self, stop: int) -> np.ndarray:
+        """Compute outputs [self.next_out, stop) from the buffer."""
+        # upfirdn output j of a segment starting at input s is full-signal
+        # output j + s * up / down, which is whole because s is a multiple of down
+        shift = self._buffer_start * self.up // self.down
+        first = self.next_out + self.pre_remove - shift
+        last = stop + self.pre_remove - shift
+        # Only the inputs those outputs reach; samples past the buffer are zeros
+        n_inputs = min(self._buffer.shape[0], ((last - 1) * self.down) // self.up + 1)
+        filtered = upfirdn(self.filter, self._buffer[:n_inputs], self.up, self.down, axis=0)
+        chunk = filtered[first:last]
+        if chunk.shape[0] < last - first:
+            chunk = np.concatenate([chunk, np.zeros((last - first - chunk.shape[0], chunk.shape[1]))])
+
+        self.next_out = stop
+        return chunk
+
+    def _trim(self):
+        """Drop buffered samples no future output can reach."""
+        newest_position = (self.next_out + self.pre_remove) * self.down
+        oldest_needed = (newest_position - len(self.filter) + 1) // self.up
+        # Keep the segment start on a multiple of `down`
+        oldest_needed -= oldest_needed % self.down
+        drop = oldest_needed - self._buffer_start
+        if drop > 0:
+            self._buffer = self._buffer[drop:]
+            self._buffer_start += drop
+
+    def process(self, chunk: np.ndarray) -> np.ndarray:
+        """
+        Feed [n_samples, n_channels] input, return whatever output is now complete.
+        """
+        chunk = np.asarray(chunk, dtype=np.float64)
+        # Samples before the start of the recording are zeros, as upfirdn assumes
+        self._buffer = chunk if self._buffer is None else np.concatenate([self._buffer, chunk])
+        self.n_in += chunk.shape[0]
+
+        # Output i is complete once its newest input sample has arrived
+        stop = (self.n_in * self.up - 1) // self.down - self.pre_remove + 1
+        if stop <= self.next_out:
+            return np.empty((0, chunk.shape[1]))
+
+        out = self._emit(stop)
+        self._trim()
+        return out
+
+    def flush(self) -> np.ndarray:
+        """
+        Emit the remaining output, treating samples past the end as zeros.
+        """
+        if self._buffer is None:
+            return np.empty((0, 0))
+
+        n_out = -(-self.n_in * self.up // self.down)
+        if n_out <= self.next_out:
+            return np.empty((0, self._buffer.shape[1]))
+
+        return self._emit(n_out)
+
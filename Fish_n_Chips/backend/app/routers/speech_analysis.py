@@ -1,26 +1,30 @@
 from fastapi import APIRouter, UploadFile, File, HTTPException, Form, Depends
 from typing import Optional
+from sqlalchemy import or_
 from sqlalchemy.orm import Session
 import uuid
-import shutil
-import os
-import tempfile
+import asyncio
 from Levenshtein import ratio
 from datetime import datetime
 
 from backend.app.models.schemas import (
     SpeechTestRequest, SpeechTestResponse,
     SpeechAnalysisResponse, PauseLocation, SpeechFeatures,
-    AudiometryRequest, AudiometryResponse, SpeechResultsResponse
+    AudiometryRequest, AudiometryResponse, SpeechResultsResponse,
+    AudiometrySweepRequest, AudiometrySweepResponse, FrequencyStatus
 )
 
+from backend.app.services.speech import whisper_service
 from backend.app.services.speech.whisper_service import transcribe_with_timestamps
-from backend.app.services.speech.vad_service import detect_speech_start
-from backend.app.services.speech.feature_extractor import extract_acoustic_features, extract_linguistic_features
+from backend.app.services.speech.analysis_cache import analysis_cache, analysis_settings
+from backend.app.services.speech.linguistic_analyzer import linguistic_analyzer
+from backend.app.services.speech.session_store import session_store
+from backend.app.services.speech.session_aggregates import SessionAggregate
 from backend.app.services.speech.pause_analyzer import analyze_pauses
-from backend.app.services.speech.audiometry_service import adaptive_threshold_test
+from backend.app.services.speech.audiometry_service import audiometry_engine
 from backend.app.services.speech.speech_scorer import calculate_ml_risk_score
-from backend.app.utils.audio_utils import convert_audio_format
+from backend.app.services.compute_pool import compute_pool, speech_audio_job
+from backend.app.utils.audio_utils import load_audio_from_bytes, SPEECH_SAMPLE_RATE
 from backend.app.database import get_db
 from backend.app.models.db_models import SpeechTestResult, SentenceRecording
 
@@ -29,9 +33,6 @@ router = APIRouter(
     tags=["speech"]
 )
 
-# In-memory session store (replace with DB in production)
-sessions = {}
-
 STIMULUS_SENTENCES = [
     "There sits an old man",
     "The cat is on the mat",
@@ -44,11 +45,7 @@ STIMULUS_SENTENCES = [
 @router.post("/start-test", response_model=SpeechTestResponse)
 async def start_test(request: SpeechTestRequest, db: Session = Depends(get_db)):
     session_id = str(uuid.uuid4())
-    sessions[session_id] = {
-        "user_id": request.user_id,
-        "results": [],
-        "audiometry": {}
-    }
+    await asyncio.to_thread(session_store.create, session_id, request.user_id)
 
     # Create database record
     db_test = SpeechTestResult(
@@ -75,144 +72,227 @@ async def analyze_speech(
     file: UploadFile = File(...),
     db: Session = Depends(get_db)
 ):
-    # 1. Save temp file
-    with tempfile.NamedTemporaryFile(delete=False, suffix=".wav") as tmp:
-        shutil.copyfileobj(file.file, tmp)
-        tmp_path = tmp.name
-
+    # 1. Decode once into a float32 mono buffer at the canonical rate;
+    # every analyzer below works from this array (no temp file, no re-decode)
+    audio_bytes = await file.read()
     try:
-        # 2. Transcribe (Whisper)
-        transcription_result = transcribe_with_timestamps(tmp_path)
-        transcription_text = transcription_result["text"]
-        word_timestamps = transcription_result["words"]
-
-        # 3. Calculate Reaction Time
-        # Option A: Use VAD on server
-        with open(tmp_path, "rb") as f:
-            audio_bytes = f.read()
-
-        # We need raw PCM for VAD, but file is likely WAV/WebM.
-        # For simplicity, let's rely on client-side timestamps or VAD if format allows.
-        # Assuming client sends a rough timestamp, we can refine it or just use it.
-        # Let's use the client provided timestamp for now as VAD on compressed web audio is tricky without conversion.
-        # Ideally: convert to PCM -> VAD.
-
-        # Placeholder for VAD logic if we had PCM
-        # vad_start = detect_speech_start(pcm_bytes, 16000)
-
-        # Reaction time = (Time user started speaking) - (Time audio stimulus ended)
-        # This requires client to send both.
-        # Let's assume the client sends the calculated reaction time or we calculate it here.
-        # Actually, the prompt says "detect_speech_start" is in VAD service.
-        # Let's assume we use the client's speech_start_timestamp for now to be safe,
-        # as converting WebM/WAV to 16k mono PCM for webrtcvad requires ffmpeg/pydub which we have.
-
-        # Simple fallback:
+        audio, sr = load_audio_from_bytes(audio_bytes, target_sr=SPEECH_SAMPLE_RATE)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=f"Could not decode audio: {e}")
+
+    # 2. Retries re-upload the same recording: look its samples up before any heavy stage
+    cache_key = await asyncio.to_thread(analysis_cache.key, audio, sr, analysis_settings(whisper_service.backend))
+    cached = await asyncio.to_thread(analysis_cache.get, cache_key)
+
+    if cached is not None:
+        transcription_result = cached["transcription"]
+        acoustic_features = cached["acoustic_features"]
+        pause_analysis = cached["pause_analysis"]
+        speech_onset_ms = cached["speech_onset_ms"]
+        linguistic_features = cached["linguistic_features"]
+    else:
+        # Fan out: transcription (remote API or the batched local model, in a thread) runs concurrently with
+        # the CPU-bound audio stages (VAD, pyin, RMS, MFCC, pauses) in a worker process
+        transcription_result, (acoustic_features, pause_analysis, speech_onset_ms) = await asyncio.gather(
+            asyncio.to_thread(transcribe_with_timestamps, audio_bytes, filename=file.filename or "audio.wav", samples=audio),
+            compute_pool.run(speech_audio_job, audio, sr)
+        )
+        linguistic_features = None
+    transcription_text = transcription_result["text"]
+    word_timestamps = transcription_result["words"]
+
+    # 3. Calculate Reaction Time
+    # Reaction time = (Time user started speaking) - (Time audio stimulus ended).
+    # Recording starts when the stimulus ends, so it is the VAD speech onset.
+    if speech_onset_ms >= 0:
+        reaction_time_ms = speech_onset_ms
+    else:
+        # Simple fallback: VAD heard no speech
         reaction_time_ms = speech_start_timestamp # Client calculated or passed raw
 
-        # 4. Accuracy (Levenshtein)
-        # Normalize strings
-        ref = stimulus_sentence.lower().strip(".,!?")
-        hyp = transcription_text.lower().strip(".,!?")
-        accuracy = ratio(ref, hyp) * 100
-
-        # 5. Features
-        acoustic_features = extract_acoustic_features(tmp_path)
-        linguistic_features = extract_linguistic_features(transcription_text)
-
-        # 6. Pauses - Use AUDIO-BASED detection (more accurate than Whisper timestamps)
-        from backend.app.services.speech.pause_analyzer import detect_pauses_from_audio
-        pause_analysis = detect_pauses_from_audio(tmp_path, min_silence_duration=0.3)
-
-        # 7. ML-Based Scoring (with improved pause analysis)
-        scores = calculate_ml_risk_score(
-            reaction_time_ms=reaction_time_ms,
-            speech_rate_wpm=acoustic_features.get("speech_rate_wpm", 120),
-            pause_analysis=pause_analysis,  # Now using audio-based pauses!
-            word_accuracy=accuracy
+    # 4. Accuracy (Levenshtein)
+    # Normalize strings
+    ref = stimulus_sentence.lower().strip(".,!?")
+    hyp = transcription_text.lower().strip(".,!?")
+    accuracy = ratio(ref, hyp) * 100
+
+    # 5. Join: linguistic features (spaCy, batched with other requests'
+    # transcriptions) need the transcription and the ML score needs every
+    # stage, so both run once the fan-out is done
+    # One-row forest predict: cheaper in this process than shipping it to a worker
+    scoring = asyncio.to_thread(
+        calculate_ml_risk_score,
+        reaction_time_ms=reaction_time_ms,
+        speech_rate_wpm=acoustic_features.get("speech_rate_wpm", 120),
+        pause_analysis=pause_analysis,
+        word_accuracy=accuracy
+    )
+    if linguistic_features is None:
+        linguistic_features, scores = await asyncio.gather(
+            asyncio.to_thread(linguistic_analyzer.analyze, transcription_text),
+            scoring
         )
+    else:
+        scores = await scoring
+
+    # Cache everything that depends only on the audio (not failed transcriptions)
+    if cached is None and "error" not in transcription_result:
+        await asyncio.to_thread(analysis_cache.set, cache_key, {
+            "transcription": transcription_result,
+            "acoustic_features": acoustic_features,
+            "pause_analysis": pause_analysis,
+            "speech_onset_ms": speech_onset_ms,
+            "linguistic_features": linguistic_features
+        })
+
+    # Fold the sentence into the session's running aggregates
+    # (shared by all workers with the default SESSION_STORE=sqlite)
+    metrics = SessionAggregate.sentence_metrics(
+        scores, accuracy, reaction_time_ms,
+        speech_rate_wpm=acoustic_features.get("speech_rate_wpm", 0),
+        avg_pause_duration=pause_analysis["avg_pause_duration"]
+    )
+    db_test = db.query(SpeechTestResult).filter(SpeechTestResult.session_id == session_id).first()
+    # A session that expired from the store resumes from the aggregates saved with the test;
+    # the store re-creates it atomically, so concurrent sentences are not lost
+    aggregate = await asyncio.to_thread(
+        session_store.add_sentence, session_id, metrics,
+        resume_from=SessionAggregate.from_db(db_test) if db_test is not None else None,
+        user_id=db_test.user_id if db_test is not None else None
+    )
 
-        # Store result in memory
-        if session_id in sessions:
-            sessions[session_id]["results"].append({
-                "sentence": stimulus_sentence,
-                "transcription": transcription_text,
-                "accuracy": accuracy,
-                "scores": scores,
-                "acoustic_features": acoustic_features,
-                "linguistic_features": linguistic_features
-            })
-
-        # Save to database
-        sentence_index = len(sessions.get(session_id, {}).get("results", [])) - 1
-        db_recording = SentenceRecording(
-            session_id=session_id,
-            sentence_index=sentence_index,
-            stimulus_sentence=stimulus_sentence,
-            transcription=transcription_text,
-            word_accuracy=accuracy,
-            reaction_time_ms=reaction_time_ms,
-            speech_rate_wpm=acoustic_features.get("speech_rate_wpm", 0),
-            avg_pause_duration=pause_analysis["avg_pause_duration"],
-            long_pause_count=pause_analysis["long_pause_count"],
+    if aggregate is not None:
+        sentence_index = aggregate.count - 1
+        # Typed columns are current after every sentence
+        _save_aggregate(db, session_id, aggregate)
+    else:
+        sentence_index = db.query(SentenceRecording).filter(SentenceRecording.session_id == session_id).count()
+
+    # Save to database
+    db_recording = SentenceRecording(
+        session_id=session_id,
+        sentence_index=sentence_index,
+        stimulus_sentence=stimulus_sentence,
+        transcription=transcription_text,
+        word_accuracy=accuracy,
+        reaction_time_ms=reaction_time_ms,
+        speech_rate_wpm=acoustic_features.get("speech_rate_wpm", 0),
+        avg_pause_duration=pause_analysis["avg_pause_duration"],
+        long_pause_count=pause_analysis["long_pause_count"],
+        acoustic_features=acoustic_features,
+        linguistic_features=linguistic_features,
+        pause_locations=pause_analysis["pause_locations"],
+        risk_score=scores["overall_risk"],
+        risk_level=scores["risk_level"]
+    )
+    db.add(db_recording)
+    db.commit()
+    print(f"✅ Saved sentence {sentence_index + 1} to database")
+
+    return SpeechAnalysisResponse(
+        reaction_time_ms=reaction_time_ms,
+        transcription=transcription_text,
+        word_accuracy=accuracy,
+        speech_rate_wpm=acoustic_features.get("speech_rate_wpm", 0), # Need to implement wpm calc in extractor properly
+        avg_pause_duration=pause_analysis["avg_pause_duration"],
+        long_pause_count=pause_analysis["long_pause_count"],
+        pause_locations=[
+            PauseLocation(
+                after_word=f"pause_{i+1}",  # Audio-based doesn't have word context
+                duration=p["duration"]
+            ) for i, p in enumerate(pause_analysis.get("pause_locations", []))
+        ],
+        risk_score=scores["overall_risk"],
+        risk_level=scores["risk_level"],
+        features=SpeechFeatures(
             acoustic_features=acoustic_features,
-            linguistic_features=linguistic_features,
-            pause_locations=pause_analysis["pause_locations"],
-            risk_score=scores["overall_risk"],
-            risk_level=scores["risk_level"]
-        )
-        db.add(db_recording)
-        db.commit()
-        print(f"✅ Saved sentence {sentence_index + 1} to database")
-
-        return SpeechAnalysisResponse(
-            reaction_time_ms=reaction_time_ms,
-            transcription=transcription_text,
-            word_accuracy=accuracy,
-            speech_rate_wpm=acoustic_features.get("speech_rate_wpm", 0), # Need to implement wpm calc in extractor properly
-            avg_pause_duration=pause_analysis["avg_pause_duration"],
-            long_pause_count=pause_analysis["long_pause_count"],
-            pause_locations=[
-                PauseLocation(
-                    after_word=f"pause_{i+1}",  # Audio-based doesn't have word context
-                    duration=p["duration"]
-                ) for i, p in enumerate(pause_analysis.get("pause_locations", []))
-            ],
-            risk_score=scores["overall_risk"],
-            risk_level=scores["risk_level"],
-            features=SpeechFeatures(
-                acoustic_features=acoustic_features,
-                linguistic_features=linguistic_features
-            )
+            linguistic_features=linguistic_features
         )
+    )
 
-    finally:
-        os.remove(tmp_path)
+def _save_aggregate(db: Session, session_id: str, aggregate: SessionAggregate):
+    """
+    Write the aggregate to the test's typed columns unless a later sentence
+    (e.g. committed by another worker) already wrote a larger one. The count
+    check is part of the UPDATE, so it cannot race with that write.
+    """
+    db.query(SpeechTestResult).filter(
+        SpeechTestResult.session_id == session_id,
+        or_(SpeechTestResult.sentence_count.is_(None), SpeechTestResult.sentence_count <= aggregate.count)
+    ).update(aggregate.column_values(), synchronize_session=False)
+
+def _save_hearing_threshold(db: Session, session_id: str, hearing_threshold_db: Optional[float]):
+    """Persist the pure-tone average with the speech test (if the session has one)."""
+    if hearing_threshold_db is None:
+        return
+    db_test = db.query(SpeechTestResult).filter(SpeechTestResult.session_id == session_id).first()
+    if db_test and db_test.hearing_threshold_db != round(hearing_threshold_db):
+        db_test.hearing_threshold_db = round(hearing_threshold_db)
+        db.commit()
+        print(f"✅ Saved hearing threshold {db_test.hearing_threshold_db} dB for session {session_id}")
 
 @router.post("/audiometry", response_model=AudiometryResponse)
-async def audiometry_test(request: AudiometryRequest):
-    # Use a simple session ID - in production this should come from the request
-    session_id = f"audio_{request.frequency_hz}"
-    result = adaptive_threshold_test(
+async def audiometry_test(request: AudiometryRequest, session_id: Optional[str] = None, db: Session = Depends(get_db)):
+    # Staircases are per test; without the session ID every client would share one
+    if not session_id:
+        raise HTTPException(status_code=400, detail="session_id is required (from /start-test)")
+    status, audiometry = await asyncio.to_thread(
+        audiometry_engine.respond,
+        session_id,
         request.frequency_hz,
         request.volume_level,
-        request.user_heard,
-        session_id=session_id
+        request.user_heard
+    )
+    if not status["continue_test"]:
+        _save_hearing_threshold(db, session_id, audiometry.hearing_threshold_db())
+
+    return AudiometryResponse(
+        threshold_db=status["threshold_db"],
+        continue_test=status["continue_test"],
+        next_volume=status["next_volume"]
+    )
+
+@router.post("/audiometry/sweep", response_model=AudiometrySweepResponse)
+async def audiometry_sweep(request: AudiometrySweepRequest, db: Session = Depends(get_db)):
+    """
+    Run the staircases for several frequencies at once: post the answers to
+    the last tone of every unfinished frequency, get the next tone for each.
+    """
+    statuses, audiometry = await asyncio.to_thread(
+        audiometry_engine.sweep,
+        request.session_id,
+        [(r.frequency_hz, r.volume_level, r.user_heard) for r in request.responses],
+        frequencies=request.frequencies,
+        start_volume=request.start_volume
+    )
+    hearing_threshold_db = audiometry.hearing_threshold_db()
+    if any(not s["continue_test"] for s in statuses):
+        _save_hearing_threshold(db, request.session_id, hearing_threshold_db)
+
+    return AudiometrySweepResponse(
+        session_id=request.session_id,
+        continue_test=not audiometry.done,
+        frequencies=[FrequencyStatus(**s) for s in statuses],
+        hearing_threshold_db=hearing_threshold_db
     )
-    return AudiometryResponse(**result)
 
 @router.get("/results/{session_id}", response_model=SpeechResultsResponse)
 async def get_results(session_id: str, db: Session = Depends(get_db)):
     print(f"🔍 Looking for session: {session_id}")
-    print(f"📋 Available sessions: {list(sessions.keys())}")
 
-    session = sessions.get(session_id)
-    if not session:
-        print(f"❌ Session {session_id} not found in memory")
+    # Running aggregates from the session store or as last saved with the test,
+    # whichever has seen more sentences (a store can miss ones written elsewhere)
+    aggregate = await asyncio.to_thread(session_store.get_aggregate, session_id)
+    db_test = db.query(SpeechTestResult).filter(SpeechTestResult.session_id == session_id).first()
+    if db_test is not None:
+        saved = SessionAggregate.from_db(db_test)
+        if aggregate is None or saved.count > aggregate.count:
+            aggregate = saved
+    if aggregate is None:
+        print(f"❌ Session {session_id} not found")
         raise HTTPException(status_code=404, detail=f"Session not found: {session_id}")
 
-    results = session["results"]
-    if not results:
+    if aggregate.count == 0:
         return SpeechResultsResponse(
             overall_risk_score=0,
             reaction_time_score=0,
@@ -222,13 +302,9 @@ async def get_results(session_id: str, db: Session = Depends(get_db)):
         )
 
     # Average scores
-    avg_risk = sum(r["scores"]["overall_risk"] for r in results) / len(results)
-    avg_rt_score = sum(r["scores"]["component_scores"]["reaction_time_score"] for r in results) / len(results)
-    avg_acc_score = sum(r["scores"]["component_scores"]["accuracy_score"] for r in results) / len(results)
-
-    # Calculate aggregated metrics
-    avg_reaction_time = sum(r.get("scores", {}).get("reaction_time_ms", 0) for r in results) / len(results) if results else 0
-    avg_accuracy = sum(r.get("accuracy", 0) for r in results) / len(results) if results else 0
+    avg_risk = aggregate.mean("overall_risk")
+    avg_rt_score = aggregate.mean("reaction_time_score")
+    avg_acc_score = aggregate.mean("accuracy_score")
 
     recommendations = []
     if avg_risk > 60:
@@ -246,16 +322,11 @@ async def get_results(session_id: str, db: Session = Depends(get_db)):
     else:
         risk_level = "High"
 
-    # Update database with final aggregated results
-    db_test = db.query(SpeechTestResult).filter(SpeechTestResult.session_id == session_id).first()
+    # Mark the test finished; the aggregate columns are already up to date
     if db_test:
         db_test.completed = True
-        db_test.overall_risk_score = avg_risk
         db_test.risk_level = risk_level
-        db_test.reaction_time_score = avg_rt_score
-        db_test.accuracy_score = avg_acc_score
-        db_test.avg_word_accuracy = avg_accuracy
-        db_test.sentence_results = results  # Store all results as JSON
+        _save_aggregate(db, session_id, aggregate)
         db.commit()
         print(f"✅ Saved final results for session {session_id}")
 
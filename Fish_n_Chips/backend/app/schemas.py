@@ -11,6 +11,42 @@ class PredictionResponse(BaseModel):
     risk_level: str
     model_version: str
 
+class EEGBatchRequest(BaseModel):
+    # Either a list of equally sized segments [n_segments][samples][channels]
+    # or one long recording [samples][channels] that is windowed server-side
+    segments: Optional[List[List[List[float]]]] = None
+    recording: Optional[List[List[float]]] = None
+    sampling_rate: Optional[int] = 256
+    window_size_sec: Optional[float] = 4
+    step_size_sec: Optional[float] = 2
+
+class BatchPredictionResponse(BaseModel):
+    n_segments: int
+    predictions: List[PredictionResponse]
+    model_version: str
+
+
+class WindowPrediction(BaseModel):
+    start_sec: float
+    end_sec: float
+    status_class: int
+    probability: float
+    risk_level: str
+
+class StreamingPredictionResponse(BaseModel):
+    # Aggregated verdict over the whole recording
+    status_class: int
+    probability: float
+    max_probability: float
+    positive_window_fraction: float
+    risk_level: str
+    model_version: str
+    # Per-window probability timeline
+    n_windows: int
+    window_size_sec: float
+    step_size_sec: float
+    timeline: List[WindowPrediction]
+
 
 class SaveEEGResultRequest(BaseModel):
     user_id: str
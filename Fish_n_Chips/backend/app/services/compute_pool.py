@@ -0,0 +1,223 @@
+"""
+Process pool for the CPU-bound EEG and speech stages.
+
+EDF/CSV parsing, Welch PSDs, librosa pitch tracking and the RandomForests
+all hold the GIL, so running them inside the async handlers stalls every
+other request (including the /ws/simulate stream). Handlers instead await
+compute_pool.run(job, ...), which executes the job in a warm worker process
+that keeps its models loaded (see services.model_registry).
+
+Configuration (environment variables):
+    COMPUTE_POOL_WORKERS      number of worker processes (default: CPUs - 1)
+    COMPUTE_POOL_MAX_PENDING  jobs allowed in flight before rejecting with 503
+    COMPUTE_POOL_TIMEOUT_SEC  per-job timeout before answering 504
+"""
+import asyncio
+import multiprocessing
+import os
+import threading
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from typing import Callable, List, Optional
+
+import numpy as np
+from fastapi import HTTPException
+
+def _init_worker(pids):
+    """
+    Record this worker's pid in the first free slot of the shared `pids`
+    array, then preload models once per worker process.
+    """
+    with pids.get_lock():
+        for i, pid in enumerate(pids):
+            if pid == 0:
+                pids[i] = os.getpid()
+                break
+
+    from backend.app.services.model_registry import model_registry
+    from backend.app.utils.memory import process_memory
+
+    before = process_memory()
+
+    # Each worker has its own registry; MODEL_PRELOAD limits what it loads up front.
+    # Forests are mapped from shared bundles, so they add little private memory.
+    model_registry.preload()
+
+    after = process_memory()
+    if before and after:
+        print(f"Worker {os.getpid()}: RSS {before['rss_mb']} MB -> {after['rss_mb']} MB after loading models "
+              f"({after.get('rss_file_mb', 0)} MB file-backed/shared)")
+
+class JobError(Exception):
+    """
+    Picklable stand-in for an HTTPException raised inside a worker.
+
+    Starlette's HTTPException cannot be unpickled in the parent, which would
+    otherwise be reported as a broken pool.
+    """
+
+    def __init__(self, status_code: int, detail: str):
+        super().__init__(status_code, detail)
+        self.status_code = status_code
+        self.detail = detail
+
+def _run_job(job: Callable, *args):
+    try:
+        return job(*args)
+    except HTTPException as he:
+        raise JobError(he.status_code, he.detail)
+
+def _warmup():
+    return os.getpid()
+
+class ComputePool:
+    """
+    Bounded, timed front-end over a ProcessPoolExecutor.
+    """
+
+    def __init__(self, max_workers: int, max_pending: int, timeout: float):
+        self.max_workers = max_workers
+        self.max_pending = max_pending
+        self.timeout = timeout
+        self._executor: Optional[ProcessPoolExecutor] = None
+        self._pids = None
+        self._pending = 0
+        # Jobs finish on the executor's management thread
+        self._pending_lock = threading.Lock()
+
+    def start(self):
+        if self._executor is None:
+            context = multiprocessing.get_context("spawn")
+            self._pids = context.Array("i", self.max_workers)
+            self._executor = ProcessPoolExecutor(
+                max_workers=self.max_workers,
+                mp_context=context,
+                initializer=_init_worker,
+                initargs=(self._pids,)
+            )
+            # Spawn the workers (and load their models) now rather than on the first request
+            for _ in range(self.max_workers):
+                self._executor.submit(_warmup)
+
+    def shutdown(self):
+        if self._executor is not None:
+            self._executor.shutdown(wait=False, cancel_futures=True)
+            self._executor = None
+            self._pids = None
+
+    @property
+    def pending(self) -> int:
+        return self._pending
+
+    def worker_pids(self) -> List[int]:
+        """Pids of the workers that have started (each records itself on startup)."""
+        pids = self._pids
+        if pids is None:
+            return []
+        with pids.get_lock():
+            return sorted(pid for pid in pids if pid)
+
+    def _job_done(self, _future):
+        with self._pending_lock:
+            self._pending -= 1
+
+    async def run(self, job: Callable, *args, timeout: Optional[float] = None):
+        """
+        Run job(*args) in a worker and await its result.
+
+        Raises:
+            HTTPException 503 if too many jobs are already queued or the pool died,
+            HTTPException 504 if the job exceeds its timeout.
+        """
+        if self._pending >= self.max_pending:
+            raise HTTPException(status_code=503, detail="Server busy, please retry")
+
+        self.start()
+        with self._pending_lock:
+            self._pending += 1
+        try:
+            future = self._executor.submit(_run_job, job, *args)
+        except BrokenProcessPool:
+            self._job_done(None)
+            self.shutdown()
+            raise HTTPException(status_code=503, detail="Processing worker crashed, please retry")
+        # The slot is held until the job is really over: a timed-out job that
+        # already started keeps running in its worker and still counts
+        future.add_done_callback(self._job_done)
+
+        try:
+            return await asyncio.wait_for(asyncio.wrap_future(future), timeout or self.timeout)
+        except asyncio.TimeoutError:
+            future.cancel()
+            raise HTTPException(status_code=504, detail="Processing timed out")
+        except JobError as e:
+            raise HTTPException(status_code=e.status_code, detail=e.detail)
+        except BrokenProcessPool:
+            # A worker crashed (e.g. out of memory); start a fresh pool for the next job
+            self.shutdown()
+            raise HTTPException(status_code=503, detail="Processing worker crashed, please retry")
+
+_default_workers = max(1, (os.cpu_count() or 2) - 1)
+
+compute_pool = ComputePool(
+    max_workers=int(os.getenv("COMPUTE_POOL_WORKERS", _default_workers)),
+    max_pending=int(os.getenv("COMPUTE_POOL_MAX_PENDING", _default_workers * 4)),
+    timeout=float(os.getenv("COMPUTE_POOL_TIMEOUT_SEC", 120))
+)
+
+# Jobs. These run inside worker processes and must stay module-level so they pickle.
+
+def eeg_predict_file_job(contents: bytes, filename: str):
+    from backend.app.inference import parse_upload, run_inference
+    from backend.app.services.model_registry import model_registry
+
+    eeg_data, fs = parse_upload(contents, filename)
+    eeg = model_registry.get("eeg")
+    if eeg is None:
+        raise HTTPException(status_code=503, detail="Model not loaded")
+    return run_inference(eeg.model, eeg_data, fs, eeg.version)
+
+def eeg_predict_file_stream_job(contents: bytes, filename: str, window_size_sec: float, step_size_sec: float, batch_size: int):
+    from backend.app.inference import parse_upload_chunks, run_streaming_inference
+    from backend.app.services.model_registry import model_registry
+
+    # CSVs are read and windowed chunk by chunk
+    eeg_data, fs = parse_upload_chunks(contents, filename)
+    eeg = model_registry.get("eeg")
+    if eeg is None:
+        raise HTTPException(status_code=503, detail="Model not loaded")
+    return run_streaming_inference(eeg.model, eeg_data, fs, window_size_sec, step_size_sec, batch_size, eeg.version)
+
+def speech_audio_job(audio: np.ndarray, sr: int):
+    """
+    Audio-only stages for one sentence: VAD, acoustic features and pauses.
+
+    Needs no transcription, so it runs while Whisper is still transcribing.
+    `audio` is the request's single decoded buffer; every analyzer reads it.
+
+    Returns:
+        (acoustic_features, pause_analysis, speech_onset_ms) where
+        speech_onset_ms is -1.0 if the VAD found no speech.
+    """
+    from backend.app.services.speech.feature_extractor import extract_acoustic_features
+    from backend.app.services.speech.pause_analyzer import detect_pauses_from_audio, detect_pauses_from_vad
+    from backend.app.services.speech.spectral_cache import SpectralCache
+    from backend.app.services.speech.vad_service import detect_speech_segments
+    from backend.app.utils.audio_utils import to_pcm16
+
+    # Speech onset and speech/non-speech segments from WebRTC VAD
+    vad = detect_speech_segments(to_pcm16(audio), sample_rate=sr)
+
+    # One framing/STFT of the utterance for RMS and MFCCs
+    spectral = SpectralCache(audio, sr)
+
+    acoustic_features = extract_acoustic_features(audio, sr, spectral=spectral)
+
+    # Pauses = gaps between VAD speech segments; the energy-threshold detector
+    # is only a fallback for audio where the VAD hears no speech at all
+    if vad.has_speech:
+        pause_analysis = detect_pauses_from_vad(vad, min_silence_duration=0.3)
+    else:
+        pause_analysis = detect_pauses_from_audio(audio, sr, min_silence_duration=0.3, spectral=spectral)
+
+    return acoustic_features, pause_analysis, vad.speech_onset_ms
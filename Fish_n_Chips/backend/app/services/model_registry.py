@@ -0,0 +1,198 @@
+"""
+Lazy, versioned model registry.
+
+Models are registered by name and only loaded the first time they are
+requested, so a process that serves one modality never loads the other.
+Each loaded model is identified by the SHA-256 of its artifact, which is
+what responses report as model_version.
+
+Forests are served from memory-mapped .npy bundles keyed by that version
+(see model_serving.CompiledForest.save_bundle). The first process to load a
+version compiles and writes the bundle; every other worker maps the same
+files, so N workers share one physical copy of the node arrays and never
+unpickle the sklearn model.
+
+Rolling out a model is a file replace: get() notices that the artifact
+changed on disk (cheap os.stat per call), loads the new one and swaps it
+in atomically. Requests in flight keep the LoadedModel they already hold,
+so they finish on the old version. POST /models/reload forces the check.
+
+Configuration (environment variables):
+    MODEL_DIR          directory with the .joblib artifacts (default: the
+                       models/ folder next to backend/, whatever the CWD)
+    MODEL_BUNDLE_DIR   where compiled forests are cached as .npy bundles
+                       (default: MODEL_DIR/.bundles)
+    MODEL_PRELOAD      comma-separated names loaded at startup (default: eeg,speech)
+    MODEL_AUTO_RELOAD  "0" disables the on-disk change check in get()
+"""
+import hashlib
+import os
+import threading
+import time
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+import joblib
+
+from backend.app.services.model_serving import CompiledForest, compile_forest, BUNDLE_META
+
+# Fish_n_Chips/models, resolved from this file rather than the working directory
+DEFAULT_MODEL_DIR = str(Path(__file__).resolve().parents[3] / "models")
+MODEL_DIR = os.getenv("MODEL_DIR", DEFAULT_MODEL_DIR)
+MODEL_BUNDLE_DIR = os.getenv("MODEL_BUNDLE_DIR", os.path.join(MODEL_DIR, ".bundles"))
+VERSION_LENGTH = 12
+
+@dataclass(frozen=True)
+class LoadedModel:
+    name: str
+    path: str
+    version: str
+    model: Any
+    loaded_at: float
+
+def file_version(path: str) -> str:
+    """Short SHA-256 of an artifact's bytes."""
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(1 << 20), b""):
+            digest.update(block)
+    return digest.hexdigest()[:VERSION_LENGTH]
+
+def load_forest(path: str, name: str, version: str):
+    """
+    Default loader: map the compiled bundle for this version, building it
+    from the joblib artifact first if no process has yet.
+
+    Models that cannot be compiled are served as the (memory-mapped) sklearn
+    object.
+    """
+    bundle = os.path.join(MODEL_BUNDLE_DIR, f"{name}-{version}")
+    if not os.path.exists(os.path.join(bundle, BUNDLE_META)):
+        model = compile_forest(joblib.load(path, mmap_mode="r"), name=name)
+        if not isinstance(model, CompiledForest):
+            return model
+        try:
+            os.makedirs(MODEL_BUNDLE_DIR, exist_ok=True)
+            model.save_bundle(bundle)
+        except OSError as e:
+            print(f"Could not write model bundle {bundle} ({e}), serving an unshared copy")
+            return model
+
+    forest = CompiledForest.load_bundle(bundle)
+    forest.set_sklearn_loader(lambda: _load_sklearn_forest(path, version))
+    return forest
+
+def _load_sklearn_forest(path: str, version: str):
+    """The artifact a bundle was built from, or None if it has since been replaced."""
+    if file_version(path) != version:
+        return None
+    return joblib.load(path, mmap_mode="r")
+
+class ModelRegistry:
+    def __init__(self, auto_reload: bool = True):
+        self.auto_reload = auto_reload
+        self._paths: Dict[str, str] = {}
+        self._loaders: Dict[str, Callable[[str, str, str], Any]] = {}
+        self._loaded: Dict[str, LoadedModel] = {}
+        # (mtime_ns, size) of the artifact each loaded model came from
+        self._signatures: Dict[str, Tuple[int, int]] = {}
+        self._locks: Dict[str, threading.Lock] = {}
+        self._warned_missing = set()
+
+    def register(self, name: str, path: str, loader: Callable[[str, str, str], Any] = load_forest):
+        """
+        Args:
+            loader: Called as loader(path, name, version) to build the model.
+        """
+        self._paths[name] = path
+        self._loaders[name] = loader
+        self._locks.setdefault(name, threading.Lock())
+
+    @property
+    def names(self) -> List[str]:
+        return list(self._paths)
+
+    def _signature(self, name: str) -> Optional[Tuple[int, int]]:
+        try:
+            st = os.stat(self._paths[name])
+        except OSError:
+            return None
+        return st.st_mtime_ns, st.st_size
+
+    def _load(self, name: str, force: bool) -> Optional[LoadedModel]:
+        with self._locks[name]:
+            current = self._loaded.get(name)
+            signature = self._signature(name)
+            if signature is None:
+                if current is None and name not in self._warned_missing:
+                    print(f"Warning: Model '{name}' not found at {self._paths[name]}. Inference will fail.")
+                    self._warned_missing.add(name)
+                # Keep serving the last good model if the artifact disappeared
+                return current
+            if current is not None and not force and self._signatures.get(name) == signature:
+                return current
+
+            self._warned_missing.discard(name)
+            path = self._paths[name]
+            version = file_version(path)
+            if current is not None and current.version == version:
+                self._signatures[name] = signature
+                return current
+
+            model = self._loaders[name](path, name, version)
+            loaded = LoadedModel(name=name, path=path, version=version, model=model, loaded_at=time.time())
+            # Atomic swap: readers see either the old or the new LoadedModel
+            self._loaded[name] = loaded
+            self._signatures[name] = signature
+            print(f"Model '{name}' loaded from {path} (version {version})")
+            return loaded
+
+    def get(self, name: str) -> Optional[LoadedModel]:
+        """
+        The current model for `name`, loading it on first use.
+
+        Returns None if the artifact does not exist yet.
+        """
+        if name not in self._paths:
+            raise KeyError(f"Unknown model: {name}")
+
+        current = self._loaded.get(name)
+        if current is not None and not self.auto_reload:
+            return current
+        if current is not None and self._signatures.get(name) == self._signature(name):
+            return current
+        return self._load(name, force=False)
+
+    def reload(self, name: str) -> Optional[LoadedModel]:
+        """Re-hash the artifact and swap in the new model if it changed."""
+        if name not in self._paths:
+            raise KeyError(f"Unknown model: {name}")
+        return self._load(name, force=True)
+
+    def preload(self, names: Optional[List[str]] = None):
+        """Load models up front (MODEL_PRELOAD by default), logging failures."""
+        if names is None:
+            names = [n.strip() for n in os.getenv("MODEL_PRELOAD", ",".join(self.names)).split(",") if n.strip()]
+        for name in names:
+            try:
+                self.get(name)
+            except Exception as e:
+                print(f"Error loading model '{name}': {e}")
+
+    def status(self) -> Dict[str, Dict[str, Any]]:
+        """Registered models and the version each currently serves (None if not loaded)."""
+        status = {}
+        for name, path in self._paths.items():
+            loaded = self._loaded.get(name)
+            status[name] = {
+                "path": path,
+                "loaded": loaded is not None,
+                "version": loaded.version if loaded else None,
+                "loaded_at": loaded.loaded_at if loaded else None,
+            }
+        return status
+
+model_registry = ModelRegistry(auto_reload=os.getenv("MODEL_AUTO_RELOAD", "1") != "0")
+model_registry.register("eeg", os.path.join(MODEL_DIR, "eeg_best_model.joblib"))
+model_registry.register("speech", os.path.join(MODEL_DIR, "speech_ml_model.joblib"))
@@ -0,0 +1,294 @@
+"""
+Compiled serving for the RandomForest models.
+
+sklearn's predict_proba validates its input, spins up joblib for the trees
+and allocates per-tree outputs on every call, which costs milliseconds for
+the single-row requests the API makes. compile_forest() flattens a fitted
+forest once into plain node arrays (feature, threshold, children, leaf
+probabilities) and scores rows by walking all trees at once with NumPy:
+
+- batches advance a [n_rows, n_trees] matrix of node ids one level per step;
+- single rows use the same walk on a [n_trees] vector, skipping the 2-D
+  indexing.
+
+Leaves point to themselves, so every walk simply runs for the forest's max
+depth. The compiled forest is checked against sklearn when it is built and
+the original model is served instead if they ever disagree.
+
+The walk costs a few NumPy gathers per row, tree and level, while sklearn's
+compiled traversal has a fixed overhead of ~10 ms per call but a much lower
+per-row cost, so it wins from a few hundred rows. Batches of at least
+SKLEARN_BATCH_ROWS rows are therefore handed to the sklearn model, loaded
+through set_sklearn_loader() on the first such batch (bundle-mapped workers
+that only see small requests never unpickle it).
+
+A compiled forest can also be saved as a bundle directory of .npy files and
+loaded back memory-mapped, so every worker process maps the same physical
+pages instead of holding its own copy (and never unpickles sklearn objects).
+"""
+import json
+import os
+import shutil
+import threading
+import warnings
+import numpy as np
+from typing import Any, Callable, Optional
+
+# Arrays stored in a bundle directory, one .npy each
+BUNDLE_ARRAYS = ("feature", "threshold", "left", "right", "missing_left", "value", "roots",
+                 "classes_", "feature_importances_")
+BUNDLE_META = "meta.json"
+
+# Probabilities must match sklearn to this tolerance (only the summation
+# order of the trees differs)
+PARITY_ATOL = 1e-9
+PARITY_PROBE_ROWS = 256
+
+# Batches this large are scored by sklearn (see module docstring)
+SKLEARN_BATCH_ROWS = 256
+
+class CompiledForest:
+    """
+    Flattened single-output forest classifier.
+
+    Exposes the parts of the sklearn API the app uses: classes_,
+    n_features_in_, feature_importances_, predict_proba() and predict().
+    """
+
+    def __init__(self, model):
+        trees = [estimator.tree_ for estimator in model.estimators_]
+
+        features, thresholds, lefts, rights, missing_left, values, roots = [], [], [], [], [], [], []
+        offset = 0
+        for tree in trees:
+            n = tree.node_count
+            leaf = tree.children_left == -1
+            own_ids = np.arange(n)
+
+            features.append(np.where(leaf, 0, tree.feature))
+            thresholds.append(np.where(leaf, np.inf, tree.threshold))
+            lefts.append(np.where(leaf, own_ids, tree.children_left) + offset)
+            rights.append(np.where(leaf, own_ids, tree.children_right) + offset)
+            mgl = getattr(tree, "missing_go_to_left", None)
+            missing_left.append(np.zeros(n, dtype=bool) if mgl is None else np.asarray(mgl, dtype=bool))
+
+            # Per-node class distribution, normalized like DecisionTreeClassifier.predict_proba
+            value = tree.value[:, 0, :].astype(np.float64)
+            totals = value.sum(axis=1, keepdims=True)
+            totals[totals == 0] = 1.0
+            values.append(value / totals)
+
+            roots.append(offset)
+            offset += n
+
+        self.feature = np.concatenate(features).astype(np.intp)
+        self.threshold = np.concatenate(thresholds).astype(np.float64)
+        self.left = np.concatenate(lefts).astype(np.intp)
+        self.right = np.concatenate(rights).astype(np.intp)
+        self.missing_left = np.concatenate(missing_left)
+        self.value = np.concatenate(values)
+        self.roots = np.asarray(roots, dtype=np.intp)
+        self.max_depth = max(tree.max_depth for tree in trees)
+        self._has_missing = bool(self.missing_left.any())
+
+        self.classes_ = model.classes_
+        self.n_features_in_ = model.n_features_in_
+        self.feature_importances_ = model.feature_importances_
+        self.n_estimators = len(trees)
+        self._init_sklearn()
+
+    def save_bundle(self, directory: str):
+        """
+        Write the arrays to `directory` as .npy files.
+
+        The bundle is written to a temporary directory and renamed into place,
+        so concurrent writers (e.g. several workers) never expose a partial one.
+        """
+        tmp_dir = f"{directory}.tmp-{os.getpid()}"
+        os.makedirs(tmp_dir, exist_ok=True)
+        for name in BUNDLE_ARRAYS:
+            np.save(os.path.join(tmp_dir, f"{name}.npy"), np.asarray(getattr(self, name)), allow_pickle=False)
+        with open(os.path.join(tmp_dir, BUNDLE_META), "w") as f:
+            json.dump({
+                "max_depth": int(self.max_depth),
+                "n_estimators": int(self.n_estimators),
+                "n_features_in_": int(self.n_features_in_),
+            }, f)
+
+        try:
+            os.rename(tmp_dir, directory)
+        except OSError:
+            # Another process published the same bundle first
+            shutil.rmtree(tmp_dir, ignore_errors=True)
+
+    @classmethod
+    def load_bundle(cls, directory: str, mmap_mode: Optional[str] = "r") -> "CompiledForest":
+        """
+        Load a bundle written by save_bundle, memory-mapped read-only by default.
+        """
+        with open(os.path.join(directory, BUNDLE_META)) as f:
+            meta = json.load(f)
+
+        forest = cls.__new__(cls)
+        for name in BUNDLE_ARRAYS:
+            # np.asarray drops the memmap subclass (cheaper indexing) but keeps the mapping
+            array = np.load(os.path.join(directory, f"{name}.npy"), mmap_mode=mmap_mode, allow_pickle=False)
+            setattr(forest, name, np.asarray(array))
+        forest.max_depth = meta["max_depth"]
+        forest.n_estimators = meta["n_estimators"]
+        forest.n_features_in_ = meta["n_features_in_"]
+        forest._has_missing = bool(forest.missing_left.any())
+        forest._init_sklearn()
+        return forest
+
+    def _init_sklearn(self):
+        self._sklearn_loader: Optional[Callable[[], Any]] = None
+        self._sklearn_model = None
+        self._sklearn_lock = threading.Lock()
+
+    def set_sklearn_loader(self, loader: Optional[Callable[[], Any]]):
+        """
+        Args:
+            loader: Returns the fitted sklearn forest this was compiled from
+                (or None if it is unavailable); called once, on the first
+                batch of SKLEARN_BATCH_ROWS rows or more.
+        """
+        with self._sklearn_lock:
+            self._sklearn_loader = loader
+            self._sklearn_model = None
+
+    def _sklearn(self):
+        with self._sklearn_lock:
+            if self._sklearn_loader is not None:
+                try:
+                    self._sklearn_model = self._sklearn_loader()
+                except Exception as e:
+                    print(f"Could not load the sklearn forest for large batches ({e}), using the compiled walk")
+                self._sklearn_loader = None
+            return self._sklearn_model
+
+    def _validate(self, X) -> np.ndarray:
+        # sklearn compares float32 inputs against float64 thresholds
+        X = np.asarray(X, dtype=np.float32)
+        if X.ndim == 1:
+            X = X.reshape(1, -1)
+        if X.ndim != 2 or X.shape[1] != self.n_features_in_:
+            raise ValueError(f"X has {X.shape[-1]} features, but the model expects {self.n_features_in_}")
+        return X
+
+    def _step(self, nodes: np.ndarray, x: np.ndarray) -> np.ndarray:
+        go_left = x <= self.threshold[nodes]
+        if self._has_missing:
+            go_left |= np.isnan(x) & self.missing_left[nodes]
+        return np.where(go_left, self.left[nodes], self.right[nodes])
+
+    def _leaves_row(self, row: np.ndarray) -> np.ndarray:
+        """Leaf id reached in each tree for one row -> [n_trees]."""
+        nodes = self.roots
+        for _ in range(self.max_depth):
+            nodes = self._step(nodes, row[self.feature[nodes]])
+        return nodes
+
+    def _leaves_batch(self, X: np.ndarray) -> np.ndarray:
+        """Leaf ids for every row and tree -> [n_rows, n_trees]."""
+        rows = np.arange(X.shape[0])[:, None]
+        nodes = np.broadcast_to(self.roots, (X.shape[0], self.n_estimators))
+        for _ in range(self.max_depth):
+            nodes = self._step(nodes, X[rows, self.feature[nodes]])
+        return nodes
+
+    def _compiled_proba(self, X: np.ndarray) -> np.ndarray:
+        if X.shape[0] == 1:
+            return (self.value[self._leaves_row(X[0])].sum(axis=0) / self.n_estimators)[None, :]
+        return self.value[self._leaves_batch(X)].sum(axis=1) / self.n_estimators
+
+    def predict_proba(self, X) -> np.ndarray:
+        X = self._validate(X)
+        if X.shape[0] >= SKLEARN_BATCH_ROWS:
+            model = self._sklearn()
+            if model is not None:
+                with warnings.catch_warnings():
+                    # Forests fitted on DataFrames warn about unnamed arrays
+                    warnings.simplefilter("ignore", UserWarning)
+                    return model.predict_proba(X)
+        return self._compiled_proba(X)
+
+    def predict(self, X) -> np.ndarray:
+        return self.classes_[np.argmax(self.predict_proba(X), axis=1)]
+
+def _probe_rows(compiled: CompiledForest, n_rows: int, seed: int = 0) -> np.ndarray:
+    """
+    Inputs that exercise the split points: each feature is drawn around the
+    thresholds the forest actually uses for it, including exact ties.
+    """
+    rng = np.random.default_rng(seed)
+    probe = rng.normal(size=(n_rows, compiled.n_features_in_))
+    internal = np.isfinite(compiled.threshold)
+    for f in range(compiled.n_features_in_):
+        splits = compiled.threshold[internal & (compiled.feature == f)]
+        if splits.size == 0:
+            continue
+        picks = rng.choice(splits, size=n_rows)
+        jitter = rng.choice([-1.0, 0.0, 1.0], size=n_rows) * np.maximum(np.abs(picks), 1.0) * 1e-3
+        probe[:, f] = picks + jitter
+    return probe
+
+def check_parity(model, compiled: CompiledForest, X: Optional[np.ndarray] = None) -> float:
+    """
+    Compare the compiled walk with sklearn on X (or on generated probe
+    rows), through both the batch and single-row paths.
+
+    Returns:
+        The largest absolute probability difference.
+
+    Raises:
+        ValueError: If a predicted class differs.
+    """
+    if X is None:
+        X = _probe_rows(compiled, PARITY_PROBE_ROWS)
+
+    with warnings.catch_warnings():
+        # Forests fitted on DataFrames warn about unnamed arrays, which is what the app passes
+        warnings.simplefilter("ignore", UserWarning)
+        expected = model.predict_proba(X)
+        expected_classes = model.predict(X)
+    X = compiled._validate(X)
+    batch = compiled._compiled_proba(X)
+    single = np.vstack([compiled._compiled_proba(X[i:i + 1]) for i in range(min(len(X), 32))])
+
+    if not np.array_equal(expected_classes, compiled.classes_[np.argmax(batch, axis=1)]):
+        raise ValueError("Compiled forest predicts different classes than sklearn")
+
+    return float(max(np.max(np.abs(batch - expected)), np.max(np.abs(single - expected[:len(single)]))))
+
+def compile_forest(model, name: str = "model"):
+    """
+    Compile a fitted forest classifier for serving.
+
+    Returns the CompiledForest when it reproduces the sklearn probabilities,
+    otherwise the original model (unsupported estimators included), so
+    callers can always use the result like the sklearn model.
+    """
+    if model is None or isinstance(model, CompiledForest):
+        return model
+
+    trees = getattr(model, "estimators_", None)
+    if not trees or not hasattr(model, "classes_") or getattr(model, "n_outputs_", 1) != 1 \
+            or not all(hasattr(t, "tree_") for t in trees):
+        print(f"{name}: not a single-output tree ensemble, serving with sklearn")
+        return model
+
+    try:
+        compiled = CompiledForest(model)
+        max_diff = check_parity(model, compiled)
+    except Exception as e:
+        print(f"{name}: forest compilation failed ({e}), serving with sklearn")
+        return model
+
+    if max_diff > PARITY_ATOL:
+        print(f"{name}: compiled forest differs from sklearn by {max_diff:.2e}, serving with sklearn")
+        return model
+
+    print(f"{name}: compiled {compiled.n_estimators} trees ({len(compiled.feature)} nodes, depth {compiled.max_depth})")
+    compiled.set_sklearn_loader(lambda: model)
+    return compiled
@@ -0,0 +1,105 @@
+"""
+Content-addressed cache for the heavy per-sentence speech stages.
+
+Retried uploads (network hiccups, frontend re-submits on timeout) carry the
+same recording, so analyze_speech looks the decoded PCM up here first and
+skips transcription, VAD, pitch tracking, pauses and spaCy on a hit. The key
+is the SHA-256 of the float32 samples plus the settings that change the
+results (ASR backend/model, pitch engine), so switching engines never serves
+stale features. Re-encodes of the same audio decode to the same samples and
+hit too.
+
+Entries live in an in-memory LRU with TTL; with ANALYSIS_CACHE_DB set they
+are also written to a SQLite file, which survives restarts and is shared by
+every uvicorn worker.
+
+Configuration (environment variables):
+    ANALYSIS_CACHE_SIZE     entries kept in memory (default: 256, 0 disables the cache)
+    ANALYSIS_CACHE_TTL_SEC  entry lifetime in both tiers (default: 86400)
+    ANALYSIS_CACHE_DB       SQLite file for the on-disk tier (default: unset, memory only)
+"""
+import hashlib
+import os
+import threading
+from typing import Any, Dict, Optional
+
+import numpy as np
+
+from backend.app.utils.cache import LRUTTLCache, SQLiteCache
+
+class AnalysisCache:
+    def __init__(self, max_entries: int = 256, ttl: Optional[float] = 86400, db_path: Optional[str] = None):
+        self.enabled = max_entries > 0
+        self.memory = LRUTTLCache(max_entries=max(1, max_entries), ttl=ttl)
+        self.disk: Optional[SQLiteCache] = None
+        if self.enabled and db_path:
+            try:
+                self.disk = SQLiteCache(db_path, ttl=ttl, table="speech_analysis_cache")
+            except Exception as e:
+                print(f"Warning: analysis cache database {db_path} unavailable ({e}), using memory only")
+        self.hits = 0
+        self.misses = 0
+        # get() runs in request threads; += on the counters is not atomic
+        self._stats_lock = threading.Lock()
+
+    @staticmethod
+    def key(audio: np.ndarray, sr: int, settings: str = "") -> str:
+        """SHA-256 of the decoded samples, their rate and the result-affecting settings."""
+        digest = hashlib.sha256(np.ascontiguousarray(audio, dtype=np.float32).data)
+        digest.update(f"|{sr}|{settings}".encode())
+        return digest.hexdigest()
+
+    def get(self, key: str) -> Optional[Dict[str, Any]]:
+        if not self.enabled:
+            return None
+        entry = self.memory.get(key)
+        if entry is None and self.disk is not None:
+            try:
+                entry = self.disk.get(key)
+            except Exception as e:
+                print(f"Analysis cache read failed: {e}")
+                entry = None
+            if entry is not None:
+                self.memory.set(key, entry)
+
+        with self._stats_lock:
+            if entry is None:
+                self.misses += 1
+            else:
+                self.hits += 1
+        return entry
+
+    def set(self, key: str, entry: Dict[str, Any]):
+        if not self.enabled:
+            return
+        self.memory.set(key, entry)
+        if self.disk is not None:
+            try:
+                self.disk.set(key, entry)
+            except Exception as e:
+                print(f"Analysis cache write failed: {e}")
+
+    def stats(self) -> Dict[str, Any]:
+        with self._stats_lock:
+            hits, misses = self.hits, self.misses
+        return {
+            "enabled": self.enabled,
+            "entries_in_memory": len(self.memory),
+            "disk": self.disk.path if self.disk is not None else None,
+            "hits": hits,
+            "misses": misses,
+        }
+
+def analysis_settings(asr_backend) -> str:
+    """Settings that change the cached results, folded into the cache key."""
+    asr = asr_backend.name
+    model_size = getattr(asr_backend, "model_size", None)
+    if model_size:
+        asr += f":{model_size}"
+    return f"asr={asr}|pitch={os.getenv('PITCH_ENGINE', 'pyin')}"
+
+analysis_cache = AnalysisCache(
+    max_entries=int(os.getenv("ANALYSIS_CACHE_SIZE", 256)),
+    ttl=float(os.getenv("ANALYSIS_CACHE_TTL_SEC", 86400)),
+    db_path=os.getenv("ANALYSIS_CACHE_DB") or None
+)
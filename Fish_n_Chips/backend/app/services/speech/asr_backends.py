@@ -0,0 +1,231 @@
+"""
+Speech-to-text backends behind whisper_service.transcribe_with_timestamps.
+
+Every backend returns the same shape:
+
+    {"text": str, "words": [{"word": str, "start": float, "end": float}, ...]}
+
+with word times in seconds from the start of the recording.
+
+Backends:
+    openai  OpenAI Whisper API (needs OPENAI_API_KEY and network access)
+    local   faster-whisper (CTranslate2) on the CPU, int8 by default. The
+            model is loaded once and kept warm; utterances queued by
+            concurrent requests are transcribed together in one batched
+            decode. Works offline once the model files are on disk.
+    dummy   fixed text, for development without either
+
+Configuration (environment variables):
+    ASR_BACKEND         openai | local | dummy (default: openai if
+                        OPENAI_API_KEY is set, otherwise dummy)
+    ASR_MODEL           faster-whisper model name or local directory (default: base.en)
+    ASR_DEVICE          cpu | cuda | auto (default: cpu)
+    ASR_COMPUTE_TYPE    CTranslate2 quantization (default: int8)
+    ASR_CPU_THREADS     threads for the local model (default: 0 = CTranslate2 default)
+    ASR_LANGUAGE        language of the recordings (default: en)
+    ASR_BATCH_SIZE      most utterances decoded together (default: 8)
+    ASR_BATCH_WAIT_MS   how long a batch waits for more utterances (default: 20)
+"""
+import os
+import re
+from typing import Any, Dict, List, Optional
+
+import numpy as np
+
+from backend.app.utils.audio_utils import load_audio_from_bytes, SPEECH_SAMPLE_RATE
+from backend.app.utils.batching import MicroBatcher
+
+ASR_BACKENDS = ("openai", "local", "dummy")
+
+# faster-whisper decodes at most 30 s per batch item; longer audio is transcribed on its own
+MAX_BATCH_ITEM_SEC = 30.0
+
+# First release whose BatchedInferencePipeline takes clip_timestamps in seconds
+# (1.1.x slices the audio with them as sample indices)
+MIN_FASTER_WHISPER = (1, 2, 0)
+
+def _word(word: str, start: float, end: float) -> Dict[str, Any]:
+    return {"word": word, "start": float(start), "end": float(end)}
+
+class ASRBackend:
+    """
+    Interface for a transcription engine.
+
+    transcribe() receives both forms of the recording: the encoded upload
+    (what remote APIs want) and, when the caller has already decoded it,
+    the mono float32 samples at SPEECH_SAMPLE_RATE (what local models want).
+    """
+    name = "base"
+
+    def load(self):
+        """Load the model ahead of the first request (no-op for remote backends)."""
+
+    def transcribe(self, audio_bytes: bytes, filename: str = "audio.wav",
+                   samples: Optional[np.ndarray] = None) -> Dict[str, Any]:
+        raise NotImplementedError
+
+class DummyBackend(ASRBackend):
+    name = "dummy"
+
+    def transcribe(self, audio_bytes, filename="audio.wav", samples=None):
+        return {
+            "text": "Dummy transcription (API Key missing)",
+            "words": [
+                _word("Dummy", 0.0, 0.5),
+                _word("transcription", 0.6, 1.5)
+            ]
+        }
+
+class OpenAIBackend(ASRBackend):
+    name = "openai"
+
+    def __init__(self, api_key: str):
+        from openai import OpenAI
+        self.client = OpenAI(api_key=api_key)
+
+    def transcribe(self, audio_bytes, filename="audio.wav", samples=None):
+        transcript = self.client.audio.transcriptions.create(
+            model="whisper-1",
+            file=(filename, bytes(audio_bytes)),
+            response_format="verbose_json",
+            timestamp_granularities=["word"]
+        )
+        return {
+            "text": transcript.text,
+            "words": [_word(w.word, w.start, w.end) for w in (transcript.words or [])]
+        }
+
+class FasterWhisperBackend(ASRBackend):
+    """
+    Local CPU transcription with faster-whisper.
+
+    Requests block in transcribe() while a MicroBatcher thread collects the
+    queued utterances and decodes them as one batch: each utterance is one
+    clip of a BatchedInferencePipeline call, so the encoder and decoder run
+    over all of them together and no utterance sees another's audio as
+    context.
+    """
+    name = "local"
+
+    def __init__(self, model_size: str = "base.en", device: str = "cpu", compute_type: str = "int8",
+                 cpu_threads: int = 0, language: Optional[str] = "en", batch_size: int = 8,
+                 max_wait_ms: float = 20):
+        self.model_size = model_size
+        self.device = device
+        self.compute_type = compute_type
+        self.cpu_threads = cpu_threads
+        self.language = language or None
+        self.batch_size = batch_size
+        self._model = None
+        self._pipeline = None
+        self._batcher = MicroBatcher(self._transcribe_batch, max_batch=batch_size,
+                                     max_wait_ms=max_wait_ms, name="asr-local")
+
+    def load(self):
+        if self._model is not None:
+            return
+        # Optional dependency, only needed for ASR_BACKEND=local
+        import faster_whisper
+        from faster_whisper import WhisperModel, BatchedInferencePipeline
+
+        version = tuple(int(p) for p in re.findall(r"\d+", faster_whisper.__version__)[:3])
+        if version < MIN_FASTER_WHISPER:
+            raise RuntimeError(
+                f"faster-whisper {faster_whisper.__version__} is too old for ASR_BACKEND=local, "
+                f"need >= {'.'.join(map(str, MIN_FASTER_WHISPER))}"
+            )
+
+        self._model = WhisperModel(self.model_size, device=self.device, compute_type=self.compute_type,
+                                   cpu_threads=self.cpu_threads)
+        self._pipeline = BatchedInferencePipeline(model=self._model)
+        print(f"Local ASR model '{self.model_size}' loaded ({self.device}, {self.compute_type})")
+
+    def transcribe(self, audio_bytes, filename="audio.wav", samples=None):
+        if samples is None:
+            samples, _ = load_audio_from_bytes(audio_bytes, target_sr=SPEECH_SAMPLE_RATE)
+        return self._batcher(samples)
+
+    def _transcribe_one(self, samples: np.ndarray) -> Dict[str, Any]:
+        segments, _ = self._model.transcribe(samples, language=self.language, word_timestamps=True)
+        segments = list(segments)
+        return {
+            "text": "".join(s.text for s in segments).strip(),
+            "words": [_word(w.word.strip(), w.start, w.end) for s in segments for w in (s.words or [])]
+        }
+
+    def _transcribe_batch(self, batch: List[np.ndarray]) -> List[Dict[str, Any]]:
+        self.load()
+
+        results: List[Optional[Dict[str, Any]]] = [None] * len(batch)
+        short = [i for i, s in enumerate(batch) if len(s) / SPEECH_SAMPLE_RATE <= MAX_BATCH_ITEM_SEC]
+        for i in set(range(len(batch))) - set(short):
+            results[i] = self._transcribe_one(batch[i])
+
+        if len(short) == 1:
+            results[short[0]] = self._transcribe_one(batch[short[0]])
+        elif short:
+            # Lay the utterances end to end and give the pipeline one clip per utterance
+            clips, offset = [], 0
+            for i in short:
+                n = len(batch[i])
+                clips.append({"start": offset / SPEECH_SAMPLE_RATE, "end": (offset + n) / SPEECH_SAMPLE_RATE})
+                offset += n
+            audio = np.concatenate([batch[i] for i in short]).astype(np.float32, copy=False)
+
+            segments, _ = self._pipeline.transcribe(
+                audio, language=self.language, clip_timestamps=clips, batch_size=self.batch_size,
+                word_timestamps=True, without_timestamps=True
+            )
+
+            texts: List[List[str]] = [[] for _ in short]
+            words: List[List[Dict[str, Any]]] = [[] for _ in short]
+            starts = np.array([c["start"] for c in clips])
+            for segment in segments:
+                # Segment times are absolute in the concatenated audio
+                k = int(np.searchsorted(starts, segment.start + 1e-6, side="right")) - 1
+                k = min(max(k, 0), len(short) - 1)
+                texts[k].append(segment.text)
+                for w in segment.words or []:
+                    words[k].append(_word(w.word.strip(), w.start - clips[k]["start"], w.end - clips[k]["start"]))
+
+            for k, i in enumerate(short):
+                results[i] = {"text": "".join(texts[k]).strip(), "words": words[k]}
+
+        return results
+
+def create_backend(name: Optional[str] = None) -> ASRBackend:
+    """
+    Build the backend named by `name` (or ASR_BACKEND), falling back to the
+    dummy backend when it cannot be set up.
+    """
+    api_key = os.getenv("OPENAI_API_KEY")
+    if name is None:
+        name = os.getenv("ASR_BACKEND") or ("openai" if api_key else "dummy")
+    name = name.strip().lower()
+
+    if name not in ASR_BACKENDS:
+        print(f"Warning: Unknown ASR_BACKEND '{name}', expected one of {', '.join(ASR_BACKENDS)}. Using dummy data.")
+        return DummyBackend()
+
+    if name == "openai":
+        if not api_key:
+            print("Warning: OPENAI_API_KEY not found. Whisper service will use dummy data.")
+            return DummyBackend()
+        try:
+            return OpenAIBackend(api_key)
+        except ImportError as e:
+            print(f"Warning: openai package unavailable ({e}). Whisper service will use dummy data.")
+            return DummyBackend()
+
+    if name == "local":
+        return FasterWhisperBackend(
+            model_size=os.getenv("ASR_MODEL", "base.en"),
+            device=os.getenv("ASR_DEVICE", "cpu"),
+            compute_type=os.getenv("ASR_COMPUTE_TYPE", "int8"),
+            cpu_threads=int(os.getenv("ASR_CPU_THREADS", 0)),
+            language=os.getenv("ASR_LANGUAGE", "en"),
+            batch_size=int(os.getenv("ASR_BATCH_SIZE", 8)),
+            max_wait_ms=float(os.getenv("ASR_BATCH_WAIT_MS", 20))
+        )
+
+    return DummyBackend()
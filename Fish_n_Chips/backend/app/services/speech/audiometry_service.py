@@ -1,44 +1,253 @@
-# Global state to track test progress (in production, use session storage)
-_test_state = {}
+"""
+Adaptive pure-tone audiometry.
 
-def adaptive_threshold_test(frequency: int, current_volume: float, user_heard: bool, session_id: str = "default") -> dict:
-    """
-    Implements a simple staircase procedure for audiometry.
-    For demo purposes, we'll complete after 2 steps.
-    """
-    # Initialize or get state
-    if session_id not in _test_state:
-        _test_state[session_id] = {"step_count": 0, "volumes": []}
-
-    state = _test_state[session_id]
-    state["step_count"] += 1
-    state["volumes"].append(current_volume)
-
-    print(f"Audiometry - Session: {session_id}, Step: {state['step_count']}, Volume: {current_volume}, Heard: {user_heard}")
-
-    # Complete after 2 steps
-    if state["step_count"] >= 2:
-        threshold_db = int(current_volume * 100)
-        print(f"Audiometry complete! Threshold: {threshold_db} dB")
-        # Clean up state
-        del _test_state[session_id]
+Each frequency runs its own 2-down/1-up staircase: the tone gets quieter
+after two heard presentations in a row and louder after every miss, which
+converges on the level heard about 71% of the time. Steps are 10 dB until
+the second reversal and 5 dB after it. A frequency is done after
+REVERSALS_TO_STOP reversals; its threshold is the mean level at the
+reversals after the first two. A listener who keeps missing the loudest
+tone (or hearing the quietest) finishes at that limit.
+
+State lives in an AudiometryEngine keyed by the speech test session ID.
+It follows SESSION_STORE (see session_store): with the default sqlite store
+the staircases are kept in an audiometry_sessions table of SESSION_DB and
+every answer is applied in one transaction, so all uvicorn workers share
+them; with the memory store they live in this process only. Sessions,
+finished or abandoned, expire AUDIOMETRY_TTL_SEC after their last response;
+that is their only cleanup, so a late request still sees a finished test. Levels are exchanged with the client as volumes in [0, 1], which
+map to 0-100 dB.
+
+Configuration (environment variables):
+    AUDIOMETRY_TTL_SEC       idle lifetime of a test (default: 1800)
+    AUDIOMETRY_MAX_SESSIONS  tests kept by the memory store (default: 10000)
+"""
+import logging
+import os
+import threading
+from dataclasses import asdict, dataclass, field
+from typing import Any, Callable, Dict, Iterable, List, Optional, Tuple
+
+from backend.app.services.speech.session_store import session_store
+from backend.app.utils.cache import LRUTTLCache, SQLiteCache
+
+logger = logging.getLogger(__name__)
+
+MIN_LEVEL_DB = 0.0
+MAX_LEVEL_DB = 100.0
+START_LEVEL_DB = 30.0
+
+INITIAL_STEP_DB = 10.0
+FINAL_STEP_DB = 5.0
+STEP_REDUCE_AFTER = 2   # reversals before switching to the final step
+REVERSALS_TO_STOP = 6
+HEARD_TO_STEP_DOWN = 2  # the "2-down"
+LIMIT_HITS_TO_STOP = 3  # presentations pinned at 0 or 100 dB before giving up
+MAX_TRIALS = 40
+
+# Pure-tone average frequencies; the overall hearing threshold averages these when tested
+PTA_FREQUENCIES = (500, 1000, 2000, 4000)
+DEFAULT_FREQUENCIES = PTA_FREQUENCIES
+
+def volume_to_db(volume: float) -> float:
+    return min(max(volume, 0.0), 1.0) * MAX_LEVEL_DB
+
+def db_to_volume(level_db: float) -> float:
+    return round(level_db / MAX_LEVEL_DB, 2)
+
+@dataclass
+class Staircase:
+    frequency_hz: int
+    level_db: float = START_LEVEL_DB
+    step_db: float = INITIAL_STEP_DB
+    direction: int = 0          # last move: -1 down, +1 up, 0 none yet
+    heard_run: int = 0
+    limit_hits: int = 0
+    trials: int = 0
+    reversal_levels: List[float] = field(default_factory=list)
+    threshold_db: Optional[float] = None
+
+    @property
+    def done(self) -> bool:
+        return self.threshold_db is not None
+
+    def respond(self, level_db: float, heard: bool):
+        """Record the answer to a tone played at level_db and pick the next level."""
+        if self.done:
+            return
+        self.trials += 1
+        self.level_db = level_db
+
+        move = 0
+        if heard:
+            self.heard_run += 1
+            if self.heard_run >= HEARD_TO_STEP_DOWN:
+                move = -1
+                self.heard_run = 0
+        else:
+            self.heard_run = 0
+            move = 1
+
+        if move:
+            if self.direction and move != self.direction:
+                self.reversal_levels.append(level_db)
+                if len(self.reversal_levels) == STEP_REDUCE_AFTER:
+                    self.step_db = FINAL_STEP_DB
+            self.direction = move
+
+            # Asked to go past the loudest/quietest level we can play
+            pinned = (move > 0 and level_db >= MAX_LEVEL_DB) or (move < 0 and level_db <= MIN_LEVEL_DB)
+            self.limit_hits = self.limit_hits + 1 if pinned else 0
+            self.level_db = min(max(level_db + move * self.step_db, MIN_LEVEL_DB), MAX_LEVEL_DB)
+
+        if len(self.reversal_levels) >= REVERSALS_TO_STOP:
+            levels = self.reversal_levels[STEP_REDUCE_AFTER:]
+            self.threshold_db = round(sum(levels) / len(levels), 1)
+        elif self.limit_hits >= LIMIT_HITS_TO_STOP:
+            self.threshold_db = self.level_db
+        elif self.trials >= MAX_TRIALS:
+            levels = self.reversal_levels[STEP_REDUCE_AFTER:] or self.reversal_levels or [self.level_db]
+            self.threshold_db = round(sum(levels) / len(levels), 1)
+
+    def status(self) -> Dict:
         return {
-            "continue_test": False,
-            "next_volume": None,
-            "threshold_db": threshold_db
+            "frequency_hz": self.frequency_hz,
+            "continue_test": not self.done,
+            "next_volume": None if self.done else db_to_volume(self.level_db),
+            "threshold_db": self.threshold_db,
+            "reversals": len(self.reversal_levels),
+            "trials": self.trials,
         }
 
-    # Adjust volume for next step
-    step_size = 0.1
-    if user_heard:
-        next_volume = max(0.0, current_volume - step_size)
-    else:
-        next_volume = min(1.0, current_volume + step_size)
+class AudiometrySession:
+    """One listener's staircases, one per frequency."""
+
+    def __init__(self, frequencies: Iterable[int] = DEFAULT_FREQUENCIES, start_level_db: float = START_LEVEL_DB):
+        self.start_level_db = start_level_db
+        self.staircases: Dict[int, Staircase] = {}
+        for frequency in frequencies:
+            self.staircase(frequency)
+
+    def staircase(self, frequency_hz: int) -> Staircase:
+        if frequency_hz not in self.staircases:
+            self.staircases[frequency_hz] = Staircase(frequency_hz, level_db=self.start_level_db)
+        return self.staircases[frequency_hz]
+
+    @property
+    def done(self) -> bool:
+        return all(s.done for s in self.staircases.values())
+
+    def thresholds(self) -> Dict[int, float]:
+        return {f: s.threshold_db for f, s in self.staircases.items() if s.done}
+
+    def hearing_threshold_db(self) -> Optional[float]:
+        """Pure-tone average over the finished PTA frequencies (all finished ones if none)."""
+        thresholds = self.thresholds()
+        levels = [t for f, t in thresholds.items() if f in PTA_FREQUENCIES] or list(thresholds.values())
+        return round(sum(levels) / len(levels), 1) if levels else None
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "start_level_db": self.start_level_db,
+            "staircases": [asdict(s) for s in self.staircases.values()]
+        }
+
+    @classmethod
+    def from_dict(cls, data: Dict[str, Any]) -> "AudiometrySession":
+        session = cls((), start_level_db=data["start_level_db"])
+        for fields in data["staircases"]:
+            staircase = Staircase(**fields)
+            session.staircases[staircase.frequency_hz] = staircase
+        return session
+
+class AudiometryEngine:
+    """
+    Audiometry sessions by ID, in a SQLite table shared by every process
+    (db_path) or in this process's memory.
+    """
+
+    def __init__(self, max_sessions: int = 10000, ttl: Optional[float] = 1800, db_path: Optional[str] = None):
+        self._db: Optional[SQLiteCache] = None
+        self._sessions: Optional[LRUTTLCache] = None
+        if db_path:
+            self._db = SQLiteCache(db_path, ttl=ttl, table="audiometry_sessions")
+        else:
+            self._sessions = LRUTTLCache(max_entries=max_sessions, ttl=ttl)
+        self._lock = threading.Lock()
+
+    def _update(self, session_id: str, fn: Callable[[Optional[AudiometrySession]], Tuple[AudiometrySession, Any]]):
+        """
+        Run fn on the session (None if unknown), save the session it returns
+        and return its result, as one atomic step.
+        """
+        if self._db is None:
+            with self._lock:
+                session, result = fn(self._sessions.get(session_id))
+                # Re-set on every access to refresh the TTL
+                self._sessions.set(session_id, session)
+                return result
+
+        result = None
+
+        def apply(data):
+            nonlocal result
+            session, result = fn(AudiometrySession.from_dict(data) if data is not None else None)
+            return session.to_dict()
+
+        self._db.update(session_id, apply)
+        return result
+
+    @staticmethod
+    def _open(session: Optional[AudiometrySession], frequencies: Optional[Iterable[int]],
+              start_level_db: float) -> AudiometrySession:
+        if session is None:
+            return AudiometrySession(frequencies or (), start_level_db=start_level_db)
+        for frequency in frequencies or ():
+            session.staircase(frequency)
+        return session
+
+    def respond(self, session_id: str, frequency_hz: int, volume: float, heard: bool) -> Tuple[Dict, AudiometrySession]:
+        """
+        One answer at one frequency.
+
+        Returns:
+            (that frequency's status, the session)
+        """
+        def step(session):
+            session = self._open(session, [frequency_hz], start_level_db=volume_to_db(volume))
+            staircase = session.staircase(frequency_hz)
+            staircase.respond(volume_to_db(volume), heard)
+            logger.debug("Audiometry session %s: %d Hz, trial %d, volume %s, heard %s, %d reversals",
+                         session_id, frequency_hz, staircase.trials, volume, heard, len(staircase.reversal_levels))
+            return session, (staircase.status(), session)
+
+        return self._update(session_id, step)
+
+    def sweep(self, session_id: str, responses: List[Tuple[int, float, bool]],
+              frequencies: Optional[Iterable[int]] = None,
+              start_volume: Optional[float] = None) -> Tuple[List[Dict], AudiometrySession]:
+        """
+        Apply a batch of (frequency_hz, volume, heard) answers, typically one
+        per unfinished frequency, and return every frequency's next tone.
+
+        An empty batch starts the sweep (DEFAULT_FREQUENCIES unless given).
+        """
+        start_level_db = volume_to_db(start_volume) if start_volume is not None else START_LEVEL_DB
+        requested = list(frequencies or []) + [f for f, _, _ in responses]
+
+        def step(session):
+            session = self._open(session, requested, start_level_db)
+            if not session.staircases:
+                for frequency in DEFAULT_FREQUENCIES:
+                    session.staircase(frequency)
+            for frequency_hz, volume, heard in responses:
+                session.staircase(frequency_hz).respond(volume_to_db(volume), heard)
+            return session, ([s.status() for s in session.staircases.values()], session)
 
-    print(f"Next volume: {next_volume}")
+        return self._update(session_id, step)
 
-    return {
-        "continue_test": True,
-        "next_volume": round(next_volume, 2),
-        "threshold_db": int(current_volume * 100)
-    }
+audiometry_engine = AudiometryEngine(
+    max_sessions=int(os.getenv("AUDIOMETRY_MAX_SESSIONS", 10000)),
+    ttl=float(os.getenv("AUDIOMETRY_TTL_SEC", 1800)),
+    db_path=session_store.path if session_store.name == "sqlite" else None
+)
@@ -1,37 +1,78 @@
+import os
 import librosa
 import numpy as np
-import spacy
-from typing import Dict, Any
-
-# Load spaCy model
-try:
-    nlp = spacy.load("en_core_web_sm")
-except OSError:
-    print("Downloading spaCy model...")
-    from spacy.cli import download
-    download("en_core_web_sm")
-    nlp = spacy.load("en_core_web_sm")
-
-def extract_acoustic_features(audio_path: str) -> Dict[str, Any]:
+from typing import Dict, Any, Optional
+
+from backend.app.services.speech.spectral_cache import SpectralCache
+
+# Pitch tracker: "pyin" (probabilistic YIN + Viterbi over C2-C7, most robust)
+# or "yin" (plain YIN over the adult speech range, several times faster)
+PITCH_ENGINE = os.getenv("PITCH_ENGINE", "pyin")
+PITCH_ENGINES = ("pyin", "yin")
+if PITCH_ENGINE not in PITCH_ENGINES:
+    print(f"Warning: unknown PITCH_ENGINE '{PITCH_ENGINE}', using pyin")
+    PITCH_ENGINE = "pyin"
+
+# Adult speaking F0 range used by the fast engine
+SPEECH_F0_MIN = 65.0
+SPEECH_F0_MAX = 400.0
+
+# YIN frames quieter than this (relative to the loudest frame) count as unvoiced
+YIN_VOICING_DB = -35.0
+
+
+def estimate_pitch(y: np.ndarray, sr: int, engine: Optional[str] = None) -> np.ndarray:
+    """
+    Frame-wise F0 in Hz, NaN where unvoiced.
+
+    Args:
+        engine: "pyin" or "yin"; defaults to PITCH_ENGINE.
+    """
+    engine = engine or PITCH_ENGINE
+    if engine == "pyin":
+        f0, voiced_flag, voiced_probs = librosa.pyin(y, sr=sr, fmin=librosa.note_to_hz('C2'), fmax=librosa.note_to_hz('C7'))
+        return f0
+
+    if engine == "yin":
+        # ~64 ms frames hold several periods of the lowest F0; same hop ratio as pyin
+        frame_length = 1 << int(np.ceil(np.log2(sr * 0.064)))
+        hop_length = frame_length // 4
+        f0 = librosa.yin(y, fmin=SPEECH_F0_MIN, fmax=SPEECH_F0_MAX, sr=sr,
+                         frame_length=frame_length, hop_length=hop_length)
+
+        # YIN has no voicing decision of its own; gate on frame energy
+        rms = librosa.feature.rms(y=y, frame_length=frame_length, hop_length=hop_length)[0]
+        voiced = librosa.amplitude_to_db(rms, ref=np.max) > YIN_VOICING_DB
+        return np.where(voiced[:len(f0)], f0, np.nan)
+
+    raise ValueError(f"Unknown pitch engine: {engine} (expected one of {PITCH_ENGINES})")
+
+def extract_acoustic_features(y: np.ndarray, sr: int, pitch_engine: Optional[str] = None,
+                              spectral: Optional[SpectralCache] = None) -> Dict[str, Any]:
     """
     Extract acoustic features using librosa.
+
+    Args:
+        y: Decoded mono audio (see utils.audio_utils.load_audio_from_bytes).
+        sr: Its sample rate.
+        pitch_engine: "pyin" or "yin"; defaults to PITCH_ENGINE.
+        spectral: Frames/STFT of `y` shared with pause detection; built here if omitted.
     """
     try:
-        y, sr = librosa.load(audio_path, sr=None)
+        spectral = spectral or SpectralCache(y, sr)
 
         # Pitch (F0)
-        f0, voiced_flag, voiced_probs = librosa.pyin(y, fmin=librosa.note_to_hz('C2'), fmax=librosa.note_to_hz('C7'))
+        f0 = estimate_pitch(y, sr, pitch_engine)
         f0_clean = f0[~np.isnan(f0)]
 
         pitch_mean = float(np.mean(f0_clean)) if len(f0_clean) > 0 else 0.0
         pitch_std = float(np.std(f0_clean)) if len(f0_clean) > 0 else 0.0
 
-        # Energy (RMS)
-        rms = librosa.feature.rms(y=y)
-        energy_mean = float(np.mean(rms))
+        # Energy (RMS), librosa's default framing
+        energy_mean = float(np.mean(spectral.feature_rms))
 
-        # MFCCs
-        mfccs = librosa.feature.mfcc(y=y, sr=sr, n_mfcc=13)
+        # MFCCs from the cached spectrogram (librosa's default definition)
+        mfccs = spectral.mfcc(n_mfcc=13)
         mfcc_means = np.mean(mfccs, axis=1).tolist()
 
         # Speech Rate (approximate based on duration and non-silent segments)
@@ -47,31 +88,3 @@ def extract_acoustic_features(audio_path: str) -> Dict[str, Any]:
     except Exception as e:
         print(f"Error extracting acoustic features: {e}")
         return {}
-
-def extract_linguistic_features(text: str) -> Dict[str, Any]:
-    """
-    Extract linguistic features using spaCy.
-    """
-    if not text:
-        return {}
-
-    doc = nlp(text)
-
-    word_count = len([token for token in doc if not token.is_punct])
-    unique_words = len(set([token.text.lower() for token in doc if not token.is_punct]))
-
-    total_chars = sum(len(token.text) for token in doc if not token.is_punct)
-    avg_word_length = total_chars / word_count if word_count > 0 else 0
-
-    lexical_diversity = unique_words / word_count if word_count > 0 else 0
-
-    pos_counts = doc.count_by(spacy.attrs.POS)
-    pos_distribution = {doc.vocab[pos].text: count for pos, count in pos_counts.items()}
-
-    return {
-        "word_count": word_count,
-        "unique_words": unique_words,
-        "avg_word_length": avg_word_length,
-        "lexical_diversity": lexical_diversity,
-        "pos_distribution": pos_distribution
-    }
@@ -0,0 +1,104 @@
+"""
+Linguistic features of transcriptions with a trimmed, batched spaCy pipeline.
+
+The features only need tokens, is_punct and coarse POS tags, so the model
+is loaded without the dependency parser, NER and lemmatizer (tok2vec,
+tagger and attribute_ruler are what produce token.pos_). Concurrent requests
+submit their transcription to a MicroBatcher, which runs whatever is queued
+through one nlp.pipe call.
+
+The model is loaded on first use (or by load() at startup), never at
+import, and is never downloaded by the server: if it is not installed the
+analyzer falls back to a blank English tokenizer, which still gives the
+word counts but no POS distribution. Install it with
+    python -m spacy download en_core_web_sm
+
+Configuration (environment variables):
+    SPACY_MODEL                 pipeline to load (default: en_core_web_sm)
+    LINGUISTIC_BATCH_SIZE       most transcriptions per nlp.pipe call (default: 32)
+    LINGUISTIC_BATCH_WAIT_MS    how long a batch waits for more (default: 5)
+"""
+import os
+import threading
+from typing import Any, Dict, List
+
+from backend.app.utils.batching import MicroBatcher
+
+SPACY_MODEL = os.getenv("SPACY_MODEL", "en_core_web_sm")
+
+# Components the features do not use
+DISABLED_COMPONENTS = ["parser", "ner", "lemmatizer"]
+
+class LinguisticAnalyzer:
+    def __init__(self, model_name: str = SPACY_MODEL, batch_size: int = 32, max_wait_ms: float = 5):
+        self.model_name = model_name
+        self.batch_size = batch_size
+        self._nlp = None
+        self._has_pos = False
+        self._lock = threading.Lock()
+        self._batcher = MicroBatcher(self.analyze_many, max_batch=batch_size,
+                                     max_wait_ms=max_wait_ms, name="linguistic-analyzer")
+
+    def load(self):
+        """Load the spaCy pipeline (once)."""
+        if self._nlp is not None:
+            return self._nlp
+        with self._lock:
+            if self._nlp is None:
+                import spacy
+                try:
+                    nlp = spacy.load(self.model_name, disable=DISABLED_COMPONENTS)
+                except OSError:
+                    print(f"Warning: spaCy model '{self.model_name}' not installed "
+                          f"(python -m spacy download {self.model_name}). POS features unavailable.")
+                    nlp = spacy.blank("en")
+                self._has_pos = "tagger" in nlp.pipe_names or "morphologizer" in nlp.pipe_names
+                self._nlp = nlp
+                print(f"spaCy pipeline loaded: {', '.join(nlp.pipe_names) or 'tokenizer only'}")
+        return self._nlp
+
+    def _features(self, doc) -> Dict[str, Any]:
+        words = [token for token in doc if not token.is_punct]
+        word_count = len(words)
+        unique_words = len(set(token.text.lower() for token in words))
+
+        total_chars = sum(len(token.text) for token in words)
+        avg_word_length = total_chars / word_count if word_count > 0 else 0
+
+        lexical_diversity = unique_words / word_count if word_count > 0 else 0
+
+        if self._has_pos:
+            from spacy.attrs import POS
+            pos_counts = doc.count_by(POS)
+            pos_distribution = {doc.vocab[pos].text: count for pos, count in pos_counts.items()}
+        else:
+            pos_distribution = {}
+
+        return {
+            "word_count": word_count,
+            "unique_words": unique_words,
+            "avg_word_length": avg_word_length,
+            "lexical_diversity": lexical_diversity,
+            "pos_distribution": pos_distribution
+        }
+
+    def analyze_many(self, texts: List[str]) -> List[Dict[str, Any]]:
+        """Features for each text, in order; empty texts give {}."""
+        nlp = self.load()
+        results: List[Dict[str, Any]] = [{} for _ in texts]
+        indices = [i for i, text in enumerate(texts) if text]
+        docs = nlp.pipe((texts[i] for i in indices), batch_size=self.batch_size)
+        for i, doc in zip(indices, docs):
+            results[i] = self._features(doc)
+        return results
+
+    def analyze(self, text: str) -> Dict[str, Any]:
+        """Features for one text, batched with whatever other callers have queued."""
+        if not text:
+            return {}
+        return self._batcher(text)
+
+linguistic_analyzer = LinguisticAnalyzer(
+    batch_size=int(os.getenv("LINGUISTIC_BATCH_SIZE", 32)),
+    max_wait_ms=float(os.getenv("LINGUISTIC_BATCH_WAIT_MS", 5))
+)
@@ -2,142 +2,145 @@
 Improved pause detection using audio analysis instead of relying on Whisper timestamps.
 Uses librosa to detect actual silence/pauses in the audio waveform.
 """
+import logging
 import numpy as np
-import librosa
-from typing import Dict, Any, List
+from typing import Dict, Any, List, Optional
 
-def detect_pauses_from_audio(audio_path: str, min_silence_duration: float = 0.3) -> Dict[str, Any]:
+from backend.app.services.speech.spectral_cache import SpectralCache
+from backend.app.services.speech.vad_service import VADResult
+
+logger = logging.getLogger(__name__)
+
+def _empty_pause_stats() -> Dict[str, Any]:
+    return {
+        "avg_pause_duration": 0.0,
+        "max_pause": 0.0,
+        "long_pause_count": 0,
+        "pause_count": 0,
+        "pause_variability": 0.0,
+        "pause_locations": [],
+        "total_pause_time": 0.0
+    }
+
+def segment_pauses(is_silent: np.ndarray, times: np.ndarray, min_silence_duration: float):
+    """
+    Run-length encode a per-frame silence mask into pauses.
+
+    A pause runs from its first silent frame to the first voiced frame after
+    it (or the last frame, if the audio ends in silence) and is kept if it
+    lasts at least min_silence_duration.
+
+    Returns:
+        (starts, ends, durations) arrays in seconds.
+    """
+    if len(is_silent) == 0:
+        empty = np.empty(0)
+        return empty, empty, empty
+
+    # +1 where a silent run starts, -1 one past where it ends
+    edges = np.diff(np.concatenate(([0], is_silent.astype(np.int8), [0])))
+    run_starts = np.flatnonzero(edges == 1)
+    run_ends = np.minimum(np.flatnonzero(edges == -1), len(is_silent) - 1)
+
+    starts = times[run_starts]
+    ends = times[run_ends]
+    durations = ends - starts
+
+    keep = durations >= min_silence_duration
+    return starts[keep], ends[keep], durations[keep]
+
+def _pause_stats(starts: np.ndarray, ends: np.ndarray, durations: np.ndarray) -> Dict[str, Any]:
+    if len(durations) == 0:
+        return _empty_pause_stats()
+
+    pauses = [
+        {'start': start, 'end': end, 'duration': duration}
+        for start, end, duration in zip(starts.tolist(), ends.tolist(), durations.tolist())
+    ]
+
+    stats = {
+        "avg_pause_duration": float(np.mean(durations)),
+        "max_pause": float(np.max(durations)),
+        "long_pause_count": int(np.count_nonzero(durations > 0.8)),
+        "pause_count": len(durations),
+        # Calculate pause variability
+        "pause_variability": float(np.std(durations)) if len(durations) > 1 else 0.0,
+        "pause_locations": pauses,
+        "total_pause_time": float(np.sum(durations))
+    }
+
+    if logger.isEnabledFor(logging.DEBUG):
+        logger.debug(
+            "Pauses: avg %.2fs, max %.2fs, %d long (>0.8s), variability %.2fs, total %.2fs",
+            stats["avg_pause_duration"], stats["max_pause"], stats["long_pause_count"],
+            stats["pause_variability"], stats["total_pause_time"]
+        )
+        for i, pause in enumerate(pauses[:5]):  # Show first 5
+            logger.debug("Pause %d: %.2fs - %.2fs (%.2fs)", i + 1, pause['start'], pause['end'], pause['duration'])
+
+    return stats
+
+def detect_pauses_from_vad(vad: VADResult, min_silence_duration: float = 0.3) -> Dict[str, Any]:
+    """
+    Pauses from the VAD's non-speech segments.
+
+    Only gaps between speech count: silence before the first word is the
+    reaction time and silence after the last word is not a hesitation.
+    """
+    if not vad.has_speech:
+        return _empty_pause_stats()
+
+    speech_start = vad.speech_segments[0][0]
+    speech_end = vad.speech_segments[-1][1]
+    gaps = np.array([
+        (start, end) for start, end in vad.non_speech_segments
+        if start >= speech_start and end <= speech_end
+    ]).reshape(-1, 2)
+
+    durations = gaps[:, 1] - gaps[:, 0]
+    keep = durations >= min_silence_duration
+    logger.debug("VAD pause detection: %d gaps between speech, %d >= %.2fs",
+                 len(gaps), int(np.sum(keep)), min_silence_duration)
+    return _pause_stats(gaps[keep, 0], gaps[keep, 1], durations[keep])
+
+def detect_pauses_from_audio(y: np.ndarray, sr: int, min_silence_duration: float = 0.3,
+                             spectral: Optional[SpectralCache] = None) -> Dict[str, Any]:
     """
     Detect pauses by analyzing the audio waveform directly.
 
     Args:
-        audio_path: Path to audio file
+        y: Decoded mono audio (see utils.audio_utils.load_audio_from_bytes)
+        sr: Its sample rate
         min_silence_duration: Minimum duration (seconds) to consider as a pause
+        spectral: Frames/RMS of `y` shared with the acoustic features (25ms/10ms);
+            built here if omitted
 
     Returns:
         Dictionary with pause statistics
     """
-    print(f"\n{'='*70}")
-    print(f"🎵 AUDIO-BASED PAUSE DETECTION STARTING...")
-    print(f"   Audio file: {audio_path}")
-    print(f"   Min silence duration: {min_silence_duration}s")
-    print(f"{'='*70}")
-
     try:
-        # Load audio
-        print("   Loading audio...")
-        y, sr = librosa.load(audio_path, sr=None)
-        print(f"   ✅ Audio loaded: {len(y)} samples at {sr}Hz ({len(y)/sr:.2f}s)")
-
-        # Calculate RMS energy (volume) over time
-        frame_length = int(sr * 0.025)  # 25ms frames
-        hop_length = int(sr * 0.010)    # 10ms hop
-
-        print("   Calculating energy...")
-        rms = librosa.feature.rms(y=y, frame_length=frame_length, hop_length=hop_length)[0]
-
-        # Convert to dB
-        rms_db = librosa.amplitude_to_db(rms, ref=np.max)
-
-        # ADAPTIVE threshold based on audio content
-        # Find the noise floor (10th percentile of energy)
-        noise_floor = np.percentile(rms_db, 10)
-        # Set threshold 10dB above noise floor
-        silence_threshold = noise_floor + 10
-
-        print(f"   Noise floor: {noise_floor:.1f}dB")
-        print(f"   Adaptive silence threshold: {silence_threshold:.1f}dB")
-        print(f"   Max energy: {np.max(rms_db):.1f}dB")
-
-        # Find silent frames
-        is_silent = rms_db < silence_threshold
-        silent_frame_count = np.sum(is_silent)
-        print(f"   Silent frames: {silent_frame_count}/{len(is_silent)} ({silent_frame_count/len(is_silent)*100:.1f}%)")
-
-        # Convert frame indices to time
-        times = librosa.frames_to_time(np.arange(len(is_silent)), sr=sr, hop_length=hop_length)
-
-        # Find continuous silent regions
-        pauses = []
-        pause_start = None
-
-        for i, (silent, time) in enumerate(zip(is_silent, times)):
-            if silent and pause_start is None:
-                # Start of pause
-                pause_start = time
-            elif not silent and pause_start is not None:
-                # End of pause
-                pause_duration = time - pause_start
-                if pause_duration >= min_silence_duration:
-                    pauses.append({
-                        'start': pause_start,
-                        'end': time,
-                        'duration': pause_duration
-                    })
-                pause_start = None
-
-        # Handle pause at end of audio
-        if pause_start is not None:
-            pause_duration = times[-1] - pause_start
-            if pause_duration >= min_silence_duration:
-                pauses.append({
-                    'start': pause_start,
-                    'end': times[-1],
-                    'duration': pause_duration
-                })
+        # RMS energy (volume) over 25ms frames / 10ms hop, in dB
+        spectral = spectral or SpectralCache(y, sr)
 
-        if not pauses:
-            return {
-                "avg_pause_duration": 0.0,
-                "max_pause": 0.0,
-                "long_pause_count": 0,
-                "pause_count": 0,
-                "pause_locations": [],
-                "total_pause_time": 0.0
-            }
-
-        pause_durations = [p['duration'] for p in pauses]
-        avg_pause = np.mean(pause_durations)
-        max_pause = np.max(pause_durations)
-        long_pause_count = len([p for p in pause_durations if p > 0.8])
-        total_pause_time = sum(pause_durations)
+        # ADAPTIVE threshold based on audio content:
+        # 10dB above the noise floor (10th percentile of energy)
+        is_silent, noise_floor, silence_threshold = spectral.silence_mask(floor_percentile=10, margin_db=10)
 
-        # Calculate pause variability
-        pause_variability = np.std(pause_durations) if len(pause_durations) > 1 else 0.0
+        # Continuous silent regions
+        starts, ends, durations = segment_pauses(is_silent, spectral.times, min_silence_duration)
 
-        print(f"\n🎵 AUDIO-BASED PAUSE DETECTION:")
-        print(f"   Total pauses detected: {len(pauses)}")
-        print(f"   Avg pause: {avg_pause:.2f}s")
-        print(f"   Max pause: {max_pause:.2f}s")
-        print(f"   Long pauses (>0.8s): {long_pause_count}")
-        print(f"   Pause variability: {pause_variability:.2f}s")
-        print(f"   Total pause time: {total_pause_time:.2f}s")
+        logger.debug(
+            "Pause detection: %.2fs audio at %dHz, noise floor %.1fdB, threshold %.1fdB, "
+            "%d/%d silent frames, %d pauses >= %.2fs",
+            len(y) / sr, sr, noise_floor, silence_threshold,
+            int(np.sum(is_silent)), len(is_silent), len(durations), min_silence_duration
+        )
 
-        # Print each pause
-        for i, pause in enumerate(pauses[:5]):  # Show first 5
-            print(f"   Pause {i+1}: {pause['start']:.2f}s - {pause['end']:.2f}s ({pause['duration']:.2f}s)")
-
-        return {
-            "avg_pause_duration": float(avg_pause),
-            "max_pause": float(max_pause),
-            "long_pause_count": int(long_pause_count),
-            "pause_count": len(pauses),
-            "pause_variability": float(pause_variability),
-            "pause_locations": pauses,
-            "total_pause_time": float(total_pause_time)
-        }
+        return _pause_stats(starts, ends, durations)
 
     except Exception as e:
-        print(f"❌ Error in audio-based pause detection: {e}")
-        return {
-            "avg_pause_duration": 0.0,
-            "max_pause": 0.0,
-            "long_pause_count": 0,
-            "pause_count": 0,
-            "pause_variability": 0.0,
-            "pause_locations": [],
-            "total_pause_time": 0.0
-        }
+        logger.warning("Error in audio-based pause detection: %s", e)
+        return _empty_pause_stats()
 
 
 def analyze_pauses(word_timestamps: List[Any]) -> Dict[str, Any]:
@@ -0,0 +1,117 @@
+"""
+Running per-session aggregates of the speech test.
+
+Each analyzed sentence updates a count, mean and Welford sum of squared
+deviations per metric, so finishing a test reads a handful of numbers
+instead of re-walking every sentence result. The same numbers are written to
+typed SpeechTestResult columns after every sentence; a session that has
+dropped out of the session store resumes from them (the squared-deviation
+sum is recovered from the stored standard deviation).
+"""
+import math
+from dataclasses import dataclass, field
+from typing import Any, Dict, Optional
+
+# metric -> (SpeechTestResult mean column, standard deviation column or None)
+METRIC_COLUMNS = {
+    "overall_risk": ("overall_risk_score", "risk_score_std"),
+    "reaction_time_score": ("reaction_time_score", None),
+    "accuracy_score": ("accuracy_score", None),
+    "pause_score": ("pause_score", None),
+    "reaction_time_ms": ("avg_reaction_time_ms", "reaction_time_std_ms"),
+    "speech_rate_wpm": ("avg_speech_rate_wpm", "speech_rate_std_wpm"),
+    "avg_pause_duration": ("avg_pause_duration", "pause_duration_std"),
+    "word_accuracy": ("avg_word_accuracy", "word_accuracy_std"),
+}
+
+@dataclass
+class RunningStat:
+    """Welford's online mean and variance."""
+    count: int = 0
+    mean: float = 0.0
+    m2: float = 0.0
+
+    def add(self, value: float):
+        self.count += 1
+        delta = value - self.mean
+        self.mean += delta / self.count
+        self.m2 += delta * (value - self.mean)
+
+    @property
+    def variance(self) -> float:
+        """Sample variance (0 for fewer than two values)."""
+        return self.m2 / (self.count - 1) if self.count > 1 else 0.0
+
+    @property
+    def std(self) -> float:
+        return math.sqrt(self.variance)
+
+    @classmethod
+    def from_summary(cls, count: int, mean: Optional[float], std: Optional[float]) -> "RunningStat":
+        count = count or 0
+        m2 = (std or 0.0) ** 2 * (count - 1) if count > 1 else 0.0
+        return cls(count=count, mean=mean or 0.0, m2=m2)
+
+@dataclass
+class SessionAggregate:
+    count: int = 0
+    stats: Dict[str, RunningStat] = field(default_factory=lambda: {name: RunningStat() for name in METRIC_COLUMNS})
+
+    @staticmethod
+    def sentence_metrics(scores: Dict[str, Any], word_accuracy: float, reaction_time_ms: float,
+                         speech_rate_wpm: float, avg_pause_duration: float) -> Dict[str, float]:
+        """The per-sentence values the aggregate tracks."""
+        components = scores.get("component_scores", {})
+        return {
+            "overall_risk": scores.get("overall_risk", 0),
+            "reaction_time_score": components.get("reaction_time_score", 0),
+            "accuracy_score": components.get("accuracy_score", 0),
+            "pause_score": components.get("pause_score", 0),
+            "reaction_time_ms": reaction_time_ms,
+            "speech_rate_wpm": speech_rate_wpm,
+            "avg_pause_duration": avg_pause_duration,
+            "word_accuracy": word_accuracy,
+        }
+
+    def add(self, metrics: Dict[str, float]):
+        self.count += 1
+        for name, stat in self.stats.items():
+            stat.add(float(metrics.get(name) or 0.0))
+
+    def mean(self, name: str) -> float:
+        return self.stats[name].mean
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "count": self.count,
+            "stats": {name: [s.count, s.mean, s.m2] for name, s in self.stats.items()}
+        }
+
+    @classmethod
+    def from_dict(cls, data: Dict[str, Any]) -> "SessionAggregate":
+        aggregate = cls(count=data.get("count", 0))
+        for name, (count, mean, m2) in data.get("stats", {}).items():
+            if name in aggregate.stats:
+                aggregate.stats[name] = RunningStat(count=count, mean=mean, m2=m2)
+        return aggregate
+
+    def column_values(self) -> Dict[str, float]:
+        """The aggregate as SpeechTestResult column values."""
+        values = {"sentence_count": self.count}
+        for name, (mean_column, std_column) in METRIC_COLUMNS.items():
+            stat = self.stats[name]
+            values[mean_column] = stat.mean
+            if std_column:
+                values[std_column] = stat.std
+        return values
+
+    @classmethod
+    def from_db(cls, db_test) -> "SessionAggregate":
+        """Resume from a SpeechTestResult row (empty if no sentence was recorded yet)."""
+        count = db_test.sentence_count or 0
+        aggregate = cls(count=count)
+        if count:
+            for name, (mean_column, std_column) in METRIC_COLUMNS.items():
+                std = getattr(db_test, std_column) if std_column else None
+                aggregate.stats[name] = RunningStat.from_summary(count, getattr(db_test, mean_column), std)
+        return aggregate
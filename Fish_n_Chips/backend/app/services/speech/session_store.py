@@ -0,0 +1,193 @@
+"""
+Where speech test sessions keep their running aggregates (see
+session_aggregates) between /start-test, /analyze and /results.
+
+Backends:
+    sqlite  one SQLite file (WAL mode) shared by every worker on the host.
+            Each analyzed sentence updates the session's row in one transaction.
+    memory  in-process LRU with TTL. Each uvicorn worker has its own, so it
+            is only for single-worker development and tests.
+
+Per-sentence details are not kept here; they are saved as sentence
+recordings in the main database. Sessions expire SESSION_TTL_SEC after their
+last write. The aggregates are also written to the session's
+SpeechTestResult row, which /analyze and /results fall back to for sessions
+the store no longer has.
+
+Configuration (environment variables):
+    SESSION_STORE        sqlite | memory (default: sqlite)
+    SESSION_DB           SQLite file for the sqlite backend (default: sessions.db)
+    SESSION_TTL_SEC      idle lifetime of a session (default: 86400)
+    SESSION_MAX_ENTRIES  sessions kept by the memory backend (default: 10000)
+"""
+import json
+import os
+import threading
+import time
+from typing import Dict, Optional
+
+from backend.app.services.speech.session_aggregates import SessionAggregate
+from backend.app.utils.cache import LRUTTLCache, connect_sqlite, dumps
+
+SESSION_STORES = ("sqlite", "memory")
+
+class SessionStore:
+    name = "base"
+
+    def create(self, session_id: str, user_id: str):
+        raise NotImplementedError
+
+    def add_sentence(self, session_id: str, metrics: Dict[str, float],
+                     resume_from: Optional[SessionAggregate] = None,
+                     user_id: Optional[str] = None) -> Optional[SessionAggregate]:
+        """
+        Fold one sentence's metrics (SessionAggregate.sentence_metrics) into
+        the session.
+
+        A session the store no longer has is re-created from `resume_from`
+        (the aggregate saved with the test) in the same atomic step, so
+        sentences of an expired session arriving on several workers at once
+        are still each counted once.
+
+        Returns:
+            The updated aggregate (the sentence's index is count - 1), or
+            None if the session is unknown and there is nothing to resume from.
+        """
+        raise NotImplementedError
+
+    def get_aggregate(self, session_id: str) -> Optional[SessionAggregate]:
+        """The session's aggregate, or None if the session is unknown."""
+        raise NotImplementedError
+
+class MemorySessionStore(SessionStore):
+    name = "memory"
+
+    def __init__(self, max_entries: int = 10000, ttl: Optional[float] = 86400):
+        self._sessions = LRUTTLCache(max_entries=max_entries, ttl=ttl)
+        self._lock = threading.Lock()
+
+    def create(self, session_id, user_id):
+        self._sessions.set(session_id, {"user_id": user_id, "aggregate": SessionAggregate()})
+
+    def add_sentence(self, session_id, metrics, resume_from=None, user_id=None):
+        with self._lock:
+            session = self._sessions.get(session_id)
+            if session is None:
+                if resume_from is None:
+                    return None
+                session = {"user_id": user_id, "aggregate": SessionAggregate.from_dict(resume_from.to_dict())}
+            session["aggregate"].add(metrics)
+            # Re-set to refresh the TTL
+            self._sessions.set(session_id, session)
+            return SessionAggregate.from_dict(session["aggregate"].to_dict())
+
+    def get_aggregate(self, session_id):
+        session = self._sessions.get(session_id)
+        if session is None:
+            return None
+        with self._lock:
+            return SessionAggregate.from_dict(session["aggregate"].to_dict())
+
+class SQLiteSessionStore(SessionStore):
+    name = "sqlite"
+
+    def __init__(self, path: str = "sessions.db", ttl: Optional[float] = 86400, purge_every: int = 100):
+        self.path = path
+        self.ttl = ttl
+        self.purge_every = purge_every
+        self._writes = 0
+        self._local = threading.local()
+        directory = os.path.dirname(os.path.abspath(path))
+        os.makedirs(directory, exist_ok=True)
+        conn = self._connect()
+        conn.execute(
+            "CREATE TABLE IF NOT EXISTS speech_session_stats ("
+            "session_id TEXT PRIMARY KEY, user_id TEXT, created_at REAL NOT NULL, expires_at REAL, "
+            "aggregate TEXT NOT NULL)"
+        )
+
+    def _connect(self):
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = self._local.conn = connect_sqlite(self.path)
+            conn.isolation_level = None  # explicit transactions below
+        return conn
+
+    def _expires_at(self) -> Optional[float]:
+        return time.time() + self.ttl if self.ttl else None
+
+    def _load(self, conn, session_id: str) -> Optional[SessionAggregate]:
+        row = conn.execute(
+            "SELECT aggregate FROM speech_session_stats "
+            "WHERE session_id = ? AND (expires_at IS NULL OR expires_at > ?)",
+            (session_id, time.time())
+        ).fetchone()
+        return SessionAggregate.from_dict(json.loads(row[0])) if row else None
+
+    def create(self, session_id, user_id):
+        conn = self._connect()
+        conn.execute(
+            "INSERT OR REPLACE INTO speech_session_stats (session_id, user_id, created_at, expires_at, aggregate) "
+            "VALUES (?, ?, ?, ?, ?)",
+            (session_id, user_id, time.time(), self._expires_at(), dumps(SessionAggregate().to_dict()))
+        )
+        self._maybe_purge()
+
+    def add_sentence(self, session_id, metrics, resume_from=None, user_id=None):
+        conn = self._connect()
+        # IMMEDIATE takes the write lock up front, so concurrent sentences of
+        # the same session (e.g. on two workers) are applied one after the other
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            aggregate = self._load(conn, session_id)
+            if aggregate is not None:
+                aggregate.add(metrics)
+                conn.execute(
+                    "UPDATE speech_session_stats SET aggregate = ?, expires_at = ? WHERE session_id = ?",
+                    (dumps(aggregate.to_dict()), self._expires_at(), session_id)
+                )
+            elif resume_from is not None:
+                aggregate = SessionAggregate.from_dict(resume_from.to_dict())
+                aggregate.add(metrics)
+                # Replaces the expired row, if there still is one
+                conn.execute(
+                    "INSERT OR REPLACE INTO speech_session_stats "
+                    "(session_id, user_id, created_at, expires_at, aggregate) VALUES (?, ?, ?, ?, ?)",
+                    (session_id, user_id, time.time(), self._expires_at(), dumps(aggregate.to_dict()))
+                )
+            else:
+                conn.execute("ROLLBACK")
+                return None
+            conn.execute("COMMIT")
+        except Exception:
+            conn.execute("ROLLBACK")
+            raise
+        self._maybe_purge()
+        return aggregate
+
+    def get_aggregate(self, session_id):
+        return self._load(self._connect(), session_id)
+
+    def purge_expired(self) -> int:
+        cursor = self._connect().execute(
+            "DELETE FROM speech_session_stats WHERE expires_at IS NOT NULL AND expires_at <= ?", (time.time(),)
+        )
+        return cursor.rowcount
+
+    def _maybe_purge(self):
+        self._writes += 1
+        if self.purge_every and self._writes % self.purge_every == 0:
+            self.purge_expired()
+
+def create_session_store(name: Optional[str] = None) -> SessionStore:
+    """Build the store named by `name` (or SESSION_STORE)."""
+    name = (name or os.getenv("SESSION_STORE", "sqlite")).strip().lower()
+    ttl = float(os.getenv("SESSION_TTL_SEC", 86400))
+
+    if name == "sqlite":
+        return SQLiteSessionStore(os.getenv("SESSION_DB", "sessions.db"), ttl=ttl)
+    if name == "memory":
+        return MemorySessionStore(max_entries=int(os.getenv("SESSION_MAX_ENTRIES", 10000)), ttl=ttl)
+    raise ValueError(f"Unknown SESSION_STORE '{name}', expected one of {', '.join(SESSION_STORES)}")
+
+session_store = create_session_store()
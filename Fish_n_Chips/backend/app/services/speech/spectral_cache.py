@@ -0,0 +1,104 @@
+"""
+Per-utterance frame and spectrogram cache.
+
+RMS energy, its dB curve, MFCCs and the silence mask all start from a
+framing of the signal. SpectralCache builds each framing once and computes
+every derived quantity on first access, so the acoustic feature extractor
+and the pause detector share one cache per utterance instead of each
+re-analyzing the audio:
+
+- speech framing (25 ms frames, 10 ms hop): frame RMS, its dB curve and the
+  silence mask used by pause detection;
+- feature framing (librosa's defaults, 2048-sample frames, 512 hop): the
+  energy and MFCC features stored with every recording. They keep librosa's
+  default definition (librosa.feature.rms(y) and
+  librosa.feature.mfcc(y, sr, n_mfcc) with 128 mel bands), so rows saved
+  before and after this cache are comparable.
+
+Both framings are centered and zero padded like librosa.
+"""
+import numpy as np
+import librosa
+from functools import cached_property
+
+FRAME_SEC = 0.025
+HOP_SEC = 0.010
+
+# librosa.feature.rms / melspectrogram defaults
+FEATURE_N_FFT = 2048
+FEATURE_HOP = 512
+
+def _frames(y: np.ndarray, frame_length: int, hop_length: int) -> np.ndarray:
+    """[n_frames, frame_length] read-only view; frame k is centered on sample k * hop."""
+    pad = frame_length // 2
+    padded = np.pad(np.asarray(y, dtype=np.float32), pad)
+    if len(padded) < frame_length:
+        return np.empty((0, frame_length), dtype=np.float32)
+    windows = np.lib.stride_tricks.sliding_window_view(padded, frame_length)
+    return windows[::hop_length]
+
+class SpectralCache:
+    """
+    Args:
+        y: Mono audio.
+        sr: Its sample rate.
+        frame_sec / hop_sec: Speech framing used for pause detection.
+    """
+
+    def __init__(self, y: np.ndarray, sr: int, frame_sec: float = FRAME_SEC, hop_sec: float = HOP_SEC):
+        self.y = y
+        self.sr = sr
+        self.frame_length = int(sr * frame_sec)
+        self.hop_length = int(sr * hop_sec)
+
+    @cached_property
+    def frames(self) -> np.ndarray:
+        """Speech framing of the utterance (see _frames)."""
+        return _frames(self.y, self.frame_length, self.hop_length)
+
+    @property
+    def n_frames(self) -> int:
+        return self.frames.shape[0]
+
+    @cached_property
+    def times(self) -> np.ndarray:
+        """Center time of each speech frame in seconds."""
+        return librosa.frames_to_time(np.arange(self.n_frames), sr=self.sr, hop_length=self.hop_length)
+
+    @cached_property
+    def rms(self) -> np.ndarray:
+        """Speech-frame RMS, same as librosa.feature.rms with this framing."""
+        frames = self.frames.astype(np.float64)
+        return np.sqrt(np.mean(frames * frames, axis=1))
+
+    @cached_property
+    def rms_db(self) -> np.ndarray:
+        """RMS in dB relative to the loudest frame."""
+        return librosa.amplitude_to_db(self.rms, ref=np.max)
+
+    @cached_property
+    def feature_rms(self) -> np.ndarray:
+        """Frame RMS with librosa's default framing."""
+        return librosa.feature.rms(y=self.y, frame_length=FEATURE_N_FFT, hop_length=FEATURE_HOP)[0]
+
+    @cached_property
+    def feature_power_spectrogram(self) -> np.ndarray:
+        """[FEATURE_N_FFT // 2 + 1, n_frames] power STFT with librosa's defaults."""
+        return np.abs(librosa.stft(self.y, n_fft=FEATURE_N_FFT, hop_length=FEATURE_HOP)) ** 2
+
+    def mfcc(self, n_mfcc: int = 13) -> np.ndarray:
+        """[n_mfcc, n_frames] MFCCs, same as librosa.feature.mfcc(y=y, sr=sr, n_mfcc=n_mfcc)."""
+        mel = librosa.feature.melspectrogram(S=self.feature_power_spectrogram, sr=self.sr)
+        return librosa.feature.mfcc(S=librosa.power_to_db(mel), n_mfcc=n_mfcc)
+
+    def silence_mask(self, floor_percentile: float = 10, margin_db: float = 10):
+        """
+        Frames quieter than an adaptive threshold: `margin_db` above the noise
+        floor, taken as the `floor_percentile` of the frame energies.
+
+        Returns:
+            (is_silent, noise_floor_db, threshold_db)
+        """
+        noise_floor = float(np.percentile(self.rms_db, floor_percentile))
+        threshold = noise_floor + margin_db
+        return self.rms_db < threshold, noise_floor, threshold
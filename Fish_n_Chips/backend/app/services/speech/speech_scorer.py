@@ -2,21 +2,10 @@
 ML-based speech scoring with IMPROVED pause analysis.
 Now properly considers pause duration, variability, and hesitations.
 """
-import joblib
 import numpy as np
 from typing import Dict, Any, List
-import os
 
-# Load the trained model
-MODEL_PATH = "models/speech_ml_model.joblib"
-
-try:
-    ml_model = joblib.load(MODEL_PATH)
-    print(f"✅ Loaded IMPROVED ML model from {MODEL_PATH}")
-    print(f"   Model now emphasizes PAUSE PATTERNS!")
-except FileNotFoundError:
-    print(f"⚠️ ML model not found at {MODEL_PATH}. Please train the model first.")
-    ml_model = None
+from backend.app.services.model_registry import model_registry
 
 def calculate_pause_features(pause_analysis: Dict[str, Any]) -> Dict[str, float]:
     """
@@ -71,10 +60,14 @@ def calculate_ml_risk_score(
         Dictionary with risk score, level, probability, and detailed analysis
     """
 
-    if ml_model is None:
+    # Loaded on first use; picks up a replaced artifact automatically
+    loaded = model_registry.get("speech")
+    if loaded is None:
         return fallback_scoring(reaction_time_ms, speech_rate_wpm,
                                pause_analysis.get("avg_pause_duration", 0), word_accuracy)
 
+    ml_model = loaded.model
+
     # Extract advanced pause features
     pause_features = calculate_pause_features(pause_analysis)
 
@@ -90,9 +83,9 @@ def calculate_ml_risk_score(
         pause_features['hesitation_count']
     ]])
 
-    # Get prediction and probability
-    prediction = ml_model.predict(features)[0]
+    # Get probability; the prediction is its argmax, same as predict()
     probability = ml_model.predict_proba(features)[0]
+    prediction = ml_model.classes_[np.argmax(probability)]
 
     # Risk probability (probability of cognitive decline)
     risk_probability = probability[1]
@@ -146,6 +139,7 @@ def calculate_ml_risk_score(
             for name, imp in zip(feature_names, feature_importances)
         },
         "model_type": "RandomForest_PauseFocused",
+        "model_version": loaded.version,
         "features_used": {
             "reaction_time_ms": reaction_time_ms,
             "speech_rate_wpm": speech_rate_wpm,
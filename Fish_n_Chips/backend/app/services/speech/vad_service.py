@@ -1,22 +1,116 @@
 import webrtcvad
 import numpy as np
+from dataclasses import dataclass, field
+from typing import List, Tuple, Union
 
-def detect_speech_start(audio_bytes: bytes, sample_rate: int = 16000) -> float:
+BytesLike = Union[bytes, bytearray, memoryview]
+
+@dataclass
+class VADResult:
+    """
+    Speech activity for one utterance.
+
+    speech_onset_ms is -1.0 when no speech was found. Segments are
+    (start_sec, end_sec) pairs; non-speech segments include leading and
+    trailing silence.
     """
-    Detect the start time of speech in milliseconds using WebRTC VAD.
-    Assumes audio is 16-bit mono PCM.
+    speech_onset_ms: float
+    speech_segments: List[Tuple[float, float]] = field(default_factory=list)
+    non_speech_segments: List[Tuple[float, float]] = field(default_factory=list)
+    frame_sec: float = 0.03
+    speech_frames: np.ndarray = field(default_factory=lambda: np.zeros(0, dtype=bool))
+
+    @property
+    def has_speech(self) -> bool:
+        return self.speech_onset_ms >= 0
+
+class StreamingVAD:
     """
-    vad = webrtcvad.Vad(3) # Aggressiveness mode 3 (high)
+    WebRTC VAD over 16-bit mono PCM, fed in arbitrary chunks.
+
+    Frames are taken as memoryview slices of the input (no copies); a partial
+    frame at the end of a chunk is kept until the next one arrives.
+
+    Args:
+        sample_rate: 8000, 16000, 32000 or 48000 Hz (webrtcvad's rates).
+        frame_ms: 10, 20 or 30 ms.
+        aggressiveness: 0-3, higher rejects more non-speech.
+        min_speech_ms: Speech runs shorter than this (clicks, breaths, the
+            VAD's own start-up frames) are treated as non-speech, so they
+            neither start speech nor split pauses.
+    """
+
+    def __init__(self, sample_rate: int = 16000, frame_ms: int = 30, aggressiveness: int = 3, min_speech_ms: int = 150):
+        self.vad = webrtcvad.Vad(aggressiveness)
+        self.sample_rate = sample_rate
+        self.frame_ms = frame_ms
+        self.frame_bytes = int(sample_rate * frame_ms / 1000) * 2 # 2 bytes per sample
+        self.min_speech_frames = max(1, -(-min_speech_ms // frame_ms))
+        self._pending = b""
+        self._decisions: List[bool] = []
 
-    # Frame duration in ms (10, 20, or 30ms supported by webrtcvad)
-    frame_duration_ms = 30
-    frame_size = int(sample_rate * frame_duration_ms / 1000) * 2 # 2 bytes per sample
+    def process(self, pcm: BytesLike):
+        """Classify every complete frame in `pcm` (plus any bytes held from the last call)."""
+        view = memoryview(pcm).cast("B")
+        if self._pending:
+            # Complete the held partial frame first
+            need = self.frame_bytes - len(self._pending)
+            if len(view) < need:
+                self._pending += bytes(view)
+                return
+            self._decisions.append(self.vad.is_speech(self._pending + bytes(view[:need]), self.sample_rate))
+            view = view[need:]
+            self._pending = b""
 
-    offset = 0
-    while offset + frame_size < len(audio_bytes):
-        frame = audio_bytes[offset:offset + frame_size]
-        if vad.is_speech(frame, sample_rate):
-            return (offset / 2 / sample_rate) * 1000 # Convert bytes offset to ms
-        offset += frame_size
+        n_frames = len(view) // self.frame_bytes
+        is_speech = self.vad.is_speech
+        for offset in range(0, n_frames * self.frame_bytes, self.frame_bytes):
+            self._decisions.append(is_speech(view[offset:offset + self.frame_bytes], self.sample_rate))
 
-    return -1.0 # No speech detected
+        if len(view) > n_frames * self.frame_bytes:
+            self._pending = bytes(view[n_frames * self.frame_bytes:])
+
+    def result(self) -> VADResult:
+        """Smoothed decisions so far, as onset and segments."""
+        frame_sec = self.frame_ms / 1000
+        speech = np.array(self._decisions, dtype=bool)
+        if len(speech) == 0:
+            return VADResult(speech_onset_ms=-1.0, frame_sec=frame_sec, speech_frames=speech)
+
+        # Run-length encode the frame decisions
+        change = np.flatnonzero(np.diff(speech.astype(np.int8))) + 1
+        starts = np.concatenate(([0], change))
+        ends = np.concatenate((change, [len(speech)]))
+
+        # Drop speech runs that are too short to be speech
+        for start, end in zip(starts, ends):
+            if speech[start] and end - start < self.min_speech_frames:
+                speech[start:end] = False
+
+        change = np.flatnonzero(np.diff(speech.astype(np.int8))) + 1
+        starts = np.concatenate(([0], change))
+        ends = np.concatenate((change, [len(speech)]))
+
+        speech_segments, non_speech_segments = [], []
+        speech_frames_start = int(np.argmax(speech))
+        for start, end in zip(starts.tolist(), ends.tolist()):
+            segment = (start * self.frame_ms / 1000, end * self.frame_ms / 1000)
+            (speech_segments if speech[start] else non_speech_segments).append(segment)
+
+        onset_ms = float(speech_frames_start * self.frame_ms) if speech_segments else -1.0
+        return VADResult(
+            speech_onset_ms=onset_ms,
+            speech_segments=speech_segments,
+            non_speech_segments=non_speech_segments,
+            frame_sec=frame_sec,
+            speech_frames=speech
+        )
+
+def detect_speech_segments(pcm: BytesLike, sample_rate: int = 16000, aggressiveness: int = 3) -> VADResult:
+    """
+    Run the VAD over a whole 16-bit mono PCM buffer
+    (see utils.audio_utils.to_pcm16).
+    """
+    vad = StreamingVAD(sample_rate=sample_rate, aggressiveness=aggressiveness)
+    vad.process(pcm)
+    return vad.result()
@@ -1,46 +1,46 @@
 import os
-from openai import OpenAI
-import io
-
-# Initialize OpenAI client
-# Ensure OPENAI_API_KEY is set in environment
-api_key = os.getenv("OPENAI_API_KEY")
-if api_key:
-    client = OpenAI(api_key=api_key)
-else:
-    print("Warning: OPENAI_API_KEY not found. Whisper service will use dummy data.")
-    client = None
-
-def transcribe_with_timestamps(audio_file_path: str):
-    """
-    Transcribe audio file using OpenAI Whisper API and return text with word timestamps.
+from typing import Optional, Union
+
+import numpy as np
+
+from backend.app.services.speech.asr_backends import create_backend
+
+# Transcription engine, chosen by ASR_BACKEND (see asr_backends)
+backend = create_backend()
+
+def load_asr_model():
+    """Warm up the transcription backend at startup so the first request does not pay for it."""
+    try:
+        backend.load()
+    except Exception as e:
+        print(f"Error loading ASR backend '{backend.name}': {e}")
+
+def transcribe_with_timestamps(audio: Union[str, bytes], filename: str = "audio.wav",
+                               samples: Optional[np.ndarray] = None):
     """
-    if not client:
-        return {
-            "text": "Dummy transcription (API Key missing)",
-            "words": [
-                {"word": "Dummy", "start": 0.0, "end": 0.5},
-                {"word": "transcription", "start": 0.6, "end": 1.5}
-            ]
-        }
+    Transcribe audio and return text with word timestamps.
+
+    Args:
+        audio: Encoded audio bytes (sent from memory) or a file path.
+        filename: Name sent with in-memory bytes; its extension tells the API the format.
+        samples: The same recording already decoded to mono float32 at 16 kHz,
+            used by local backends instead of decoding again.
 
+    Returns:
+        {"text": str, "words": [{"word", "start", "end"}, ...]}
+    """
     try:
-        with open(audio_file_path, "rb") as audio_file:
-            transcript = client.audio.transcriptions.create(
-                model="whisper-1",
-                file=audio_file,
-                response_format="verbose_json",
-                timestamp_granularities=["word"]
-            )
+        if not isinstance(audio, (bytes, bytearray)):
+            filename = os.path.basename(audio)
+            with open(audio, "rb") as f:
+                audio = f.read()
 
-        return {
-            "text": transcript.text,
-            "words": transcript.words
-        }
+        return backend.transcribe(audio, filename=filename, samples=samples)
     except Exception as e:
         print(f"Whisper API error: {e}")
-        # Return dummy data for testing if API fails or key is missing
+        # Return empty data so the rest of the analysis can still run
         return {
             "text": "Error in transcription",
-            "words": []
+            "words": [],
+            "error": str(e)
         }
@@ -0,0 +1,204 @@
+"""
+Incremental feature extraction for live EEG streams.
+
+StreamingFeatureExtractor keeps a per-connection ring buffer of the last
+window and emits the same feature vector as extract_features_from_segment
+on that window every `hop` samples, without recomputing it from scratch:
+
+- mean/std/skew/kurtosis come from running power sums that are updated
+  with the samples entering and leaving the window;
+- the Welch PSD is the mean of per-segment periodograms, and segments are
+  cached by their absolute start sample, so overlapping windows reuse the
+  segments they share and a hop only computes the segments it completes;
+- the peak |x| (used by the flat-channel tolerance) is the max over cached
+  per-hop chunk maxima.
+
+Welch segments sit at fixed offsets (multiples of seg_step, 256 samples at
+256 Hz) from the window start, so a cached segment is only found again when
+another window starts on the same seg_step grid. That holds when the hop
+divides seg_step (e.g. 250 ms = 64 samples: one new segment per hop) or is
+a multiple of it. Any other hop still gives the correct features but
+recomputes every segment on every hop.
+"""
+import numpy as np
+from scipy.signal import get_window
+from typing import Dict, List
+
+from .feature_extraction import _welch_layout, _shape_moments, _bandpower_features, _assemble_features
+
+class StreamingFeatureExtractor:
+    """
+    Args:
+        n_channels: Number of EEG channels.
+        fs: Sampling rate.
+        window_sec: Window the features describe (4 s like the batch path).
+        hop_sec: Emit a feature vector every hop (e.g. 0.25 s).
+    """
+
+    def __init__(self, n_channels: int = 16, fs: int = 256, window_sec: float = 4, hop_sec: float = 1):
+        self.n_channels = n_channels
+        self.fs = fs
+        self.window = int(window_sec * fs)
+        self.hop = int(hop_sec * fs)
+        if self.window <= 0 or self.hop <= 0:
+            raise ValueError("Window and hop must be positive")
+
+        # Welch layout, same defaults as welch(nperseg=...) in the batch path
+        self.nperseg, self.freq_res, self.masks = _welch_layout(self.window, fs)
+        self.seg_step = self.nperseg - self.nperseg // 2
+        self.n_segments = (self.window - self.nperseg) // self.seg_step + 1
+        if not self.reuses_segments:
+            print(f"Warning: hop of {self.hop} samples is not aligned with the {self.seg_step}-sample "
+                  f"Welch segment step; every hop recomputes all {self.n_segments} segments.")
+
+        # Per-segment periodogram terms matching welch(): Hann window,
+        # constant detrend, one-sided density scaling
+        self._taper = get_window('hann', self.nperseg)
+        self._scale = np.full(self.nperseg // 2 + 1, 2.0 / (fs * (self._taper ** 2).sum()))
+        self._scale[0] /= 2
+        if self.nperseg % 2 == 0:
+            self._scale[-1] /= 2
+
+        # Ring buffer, channel-major; sample t lives at column t % window
+        self._ring = np.zeros((n_channels, self.window))
+        self.n_seen = 0
+
+        # Running sums of (x - shift) ** k, k = 1..4, over the current window
+        self._shift = np.zeros(n_channels)
+        self._sums = np.zeros((4, n_channels))
+        self._since_refresh = 0
+
+        # Periodograms keyed by absolute segment start sample
+        self._segments: Dict[int, np.ndarray] = {}
+        # Per-channel max |x| of each complete hop-aligned chunk, keyed by chunk index
+        self._chunk_max: Dict[int, np.ndarray] = {}
+
+    @property
+    def reuses_segments(self) -> bool:
+        """Whether consecutive windows share Welch segments (see module docstring)."""
+        return self.seg_step % self.hop == 0 or self.hop % self.seg_step == 0
+
+    def _power_sums(self, block: np.ndarray) -> np.ndarray:
+        d = block - self._shift[:, None]
+        d2 = d * d
+        return np.stack([d.sum(axis=-1), d2.sum(axis=-1), (d2 * d).sum(axis=-1), (d2 * d2).sum(axis=-1)])
+
+    def _samples(self, start: int, stop: int) -> np.ndarray:
+        """Channel-major copy of absolute samples [start, stop) from the ring."""
+        return self._ring[:, np.arange(start, stop) % self.window]
+
+    def _refresh_sums(self):
+        """
+        Recompute the running sums exactly from the buffer, re-centred on the
+        current mean. Done once per window turnover to stop rounding drift,
+        so it costs O(1) amortized per sample.
+        """
+        current = self.window_data()
+        self._shift = current.mean(axis=-1)
+        self._sums = self._power_sums(current)
+        self._since_refresh = 0
+
+    def _add(self, block: np.ndarray):
+        """Append a [n_channels, n] block that does not cross an emission point."""
+        n = block.shape[1]
+        start = self.n_seen
+        if start + n > self.window:
+            # Samples about to be overwritten leave the window
+            leave_from = max(start, self.window) - self.window
+            leaving = self._samples(leave_from, start + n - self.window)
+            self._sums -= self._power_sums(leaving)
+
+        self._ring[:, np.arange(start, start + n) % self.window] = block
+        self._sums += self._power_sums(block)
+        self.n_seen += n
+        self._since_refresh += n
+
+    def _periodogram(self, start: int) -> np.ndarray:
+        if start not in self._segments:
+            segment = self._samples(start, start + self.nperseg)
+            segment = (segment - segment.mean(axis=-1, keepdims=True)) * self._taper
+            spectrum = np.fft.rfft(segment, axis=-1)
+            self._segments[start] = (spectrum.real ** 2 + spectrum.imag ** 2) * self._scale
+        return self._segments[start]
+
+    def _max_abs(self, window_start: int) -> np.ndarray:
+        """
+        Per-channel max |x| over the window. Windows start on the hop grid,
+        so the window is whole hop-sized chunks (each reduced once) plus a
+        tail shorter than a hop.
+        """
+        first = window_start // self.hop
+        n_chunks = self.window // self.hop
+        maxima = []
+        for c in range(first, first + n_chunks):
+            if c not in self._chunk_max:
+                self._chunk_max[c] = np.abs(self._samples(c * self.hop, (c + 1) * self.hop)).max(axis=-1)
+            maxima.append(self._chunk_max[c])
+        tail_start = (first + n_chunks) * self.hop
+        if tail_start < window_start + self.window:
+            maxima.append(np.abs(self._samples(tail_start, window_start + self.window)).max(axis=-1))
+        for stale in [c for c in self._chunk_max if c < first]:
+            del self._chunk_max[stale]
+        return np.max(maxima, axis=0)
+
+    def _features(self) -> np.ndarray:
+        n = self.window
+        window_start = self.n_seen - n
+
+        if self._since_refresh >= n:
+            self._refresh_sums()
+
+        # Time domain stats from the running sums
+        s1, s2, s3, s4 = self._sums
+        mean_d = s1 / n
+        m2 = s2 - s1 * mean_d
+        m3 = s3 - 3 * s2 * mean_d + 2 * s1 * mean_d ** 2
+        m4 = s4 - 4 * s3 * mean_d + 6 * s2 * mean_d ** 2 - 3 * s1 * mean_d ** 3
+        m2 = np.maximum(m2, 0.0)
+
+        mean = self._shift + mean_d
+        std = np.sqrt(m2 / n)
+        max_abs = self._max_abs(window_start)
+        skew, kurt = _shape_moments(n, m2, m3, m4, max_abs)
+
+        # Welch PSD from cached segment periodograms
+        starts = [window_start + k * self.seg_step for k in range(self.n_segments)]
+        psd = np.mean([self._periodogram(s) for s in starts], axis=0)
+        for stale in [s for s in self._segments if s < window_start]:
+            del self._segments[stale]
+
+        bandpowers = _bandpower_features(psd, self.freq_res, self.masks)
+        return _assemble_features(mean, std, skew, kurt, bandpowers)
+
+    def window_data(self) -> np.ndarray:
+        """The current window as [n_channels, window] (oldest sample first)."""
+        start = max(0, self.n_seen - self.window)
+        return self._samples(start, start + min(self.n_seen, self.window))
+
+    def push(self, samples: np.ndarray) -> List[np.ndarray]:
+        """
+        Feed new [n_samples, n_channels] data.
+
+        Returns:
+            The feature vectors for every hop completed by these samples
+            (possibly none), oldest first.
+        """
+        block = np.asarray(samples, dtype=np.float64).T
+        emitted = []
+        position = 0
+
+        while position < block.shape[1]:
+            # Next emission: first full window, then every hop
+            if self.n_seen < self.window:
+                next_emit = self.window
+            else:
+                next_emit = self.n_seen + self.hop - (self.n_seen - self.window) % self.hop
+            take = min(block.shape[1] - position, next_emit - self.n_seen, self.window)
+
+            self._add(block[:, position:position + take])
+            position += take
+
+            if self.n_seen >= self.window and (self.n_seen - self.window) % self.hop == 0:
+                emitted.append(self._features())
+
+        return emitted
@@ -4,6 +4,9 @@ import librosa
 import soundfile as sf
 from pydub import AudioSegment
 
+# Canonical rate for the speech pipeline (what webrtcvad and Whisper expect)
+SPEECH_SAMPLE_RATE = 16000
+
 def convert_audio_format(input_bytes: bytes, output_format='wav') -> bytes:
     """
     Convert audio bytes to specified format (default wav).
@@ -43,27 +46,40 @@ def split_audio_channels(audio: np.ndarray) -> np.ndarray:
 
 def load_audio_from_bytes(audio_bytes: bytes, target_sr=16000):
     """
-    Load audio from bytes into numpy array.
+    Load audio from bytes into a mono float32 array at target_sr.
+
+    The array is returned read-only so it can be handed to several analyzers
+    without any of them modifying it for the others.
     """
     # Use soundfile or librosa
     # soundfile requires a file-like object
     try:
-        data, samplerate = sf.read(io.BytesIO(audio_bytes))
+        data, samplerate = sf.read(io.BytesIO(audio_bytes), dtype='float32')
 
         # Convert to mono if needed
         if len(data.shape) > 1:
-            data = np.mean(data, axis=1)
+            data = np.mean(data, axis=1, dtype=np.float32)
 
         # Resample if needed
         if samplerate != target_sr:
             data = librosa.resample(y=data, orig_sr=samplerate, target_sr=target_sr)
-
-        return data, target_sr
     except Exception as e:
-        # Fallback to pydub if soundfile fails (e.g. for some formats)
+        # Fallback to pydub if soundfile fails (e.g. for WebM/Opus from browsers)
         try:
             audio = AudioSegment.from_file(io.BytesIO(audio_bytes))
-            audio = audio.set_frame_rate(target_sr).set_channels(1)
-            return np.array(audio.get_array_of_samples()).astype(np.float32) / 32768.0, target_sr
+            audio = audio.set_frame_rate(target_sr).set_channels(1).set_sample_width(2)
+            data = np.array(audio.get_array_of_samples()).astype(np.float32) / 32768.0
         except Exception as e2:
             raise ValueError(f"Failed to load audio: {e} | {e2}")
+
+    data = np.ascontiguousarray(data, dtype=np.float32)
+    data.flags.writeable = False
+    return data, target_sr
+
+def to_pcm16(audio: np.ndarray) -> memoryview:
+    """
+    16-bit little-endian PCM view of a float audio buffer in [-1, 1], as
+    expected by webrtcvad. Converted once; frames are sliced from the view.
+    """
+    pcm = (np.clip(audio, -1.0, 1.0) * 32767).astype('<i2')
+    return memoryview(pcm).cast('B')
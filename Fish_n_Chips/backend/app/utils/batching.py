@@ -0,0 +1,90 @@
+"""
+Micro-batching for models that are cheaper per item when called on a batch.
+
+Callers submit one item at a time from any thread; a single background
+thread collects whatever is queued (up to max_batch items, waiting at most
+max_wait_ms for more after the first arrives) and hands the whole batch to
+one call of `process_batch`. The model behind it stays warm in that thread
+and is never entered by two batches at once.
+"""
+import queue
+import threading
+import time
+from concurrent.futures import Future
+from typing import Any, Callable, List, Optional
+
+class MicroBatcher:
+    """
+    Args:
+        process_batch: Called with a list of items; must return one result per
+            item, in order. An exception fails every item in the batch.
+        max_batch: Largest batch handed to process_batch.
+        max_wait_ms: How long to hold a partial batch open for more items.
+        name: Thread name, for logs and debuggers.
+    """
+
+    def __init__(self, process_batch: Callable[[List[Any]], List[Any]], max_batch: int = 8,
+                 max_wait_ms: float = 20, name: str = "micro-batcher"):
+        self.process_batch = process_batch
+        self.max_batch = max(1, max_batch)
+        self.max_wait = max(0.0, max_wait_ms) / 1000
+        self.name = name
+        self._queue: "queue.Queue[tuple]" = queue.Queue()
+        self._thread: Optional[threading.Thread] = None
+        self._lock = threading.Lock()
+
+    def _ensure_started(self):
+        if self._thread is None or not self._thread.is_alive():
+            with self._lock:
+                if self._thread is None or not self._thread.is_alive():
+                    self._thread = threading.Thread(target=self._loop, name=self.name, daemon=True)
+                    self._thread.start()
+
+    def submit(self, item: Any) -> Future:
+        """Queue one item; the Future resolves to its result."""
+        future = Future()
+        self._ensure_started()
+        self._queue.put((item, future))
+        return future
+
+    def __call__(self, item: Any, timeout: Optional[float] = None) -> Any:
+        """Submit one item and block until its batch has been processed."""
+        return self.submit(item).result(timeout)
+
+    def _collect(self) -> List[tuple]:
+        batch = [self._queue.get()]
+        try:
+            # Whatever is already queued joins without waiting
+            while len(batch) < self.max_batch:
+                batch.append(self._queue.get_nowait())
+        except queue.Empty:
+            pass
+
+        deadline = time.monotonic() + self.max_wait
+        while len(batch) < self.max_batch:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                break
+            try:
+                batch.append(self._queue.get(timeout=remaining))
+            except queue.Empty:
+                break
+        return batch
+
+    def _loop(self):
+        while True:
+            batch = self._collect()
+            # Skip items whose caller has gone away
+            batch = [(item, future) for item, future in batch if future.set_running_or_notify_cancel()]
+            if not batch:
+                continue
+            try:
+                results = self.process_batch([item for item, _ in batch])
+                if len(results) != len(batch):
+                    raise RuntimeError(f"{self.name}: got {len(results)} results for {len(batch)} items")
+            except Exception as e:
+                for _, future in batch:
+                    future.set_exception(e)
+                continue
+            for (_, future), result in zip(batch, results):
+                future.set_result(result)
@@ -0,0 +1,176 @@
+"""
+Small key-value caches: an in-memory LRU with TTL and a SQLite-backed tier
+that survives restarts and is shared by every process on the host.
+
+Values stored in SQLite must be JSON-serializable (numpy scalars and arrays
+are converted).
+"""
+import json
+import os
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Optional
+
+import numpy as np
+
+def _json_default(value):
+    if isinstance(value, np.generic):
+        return value.item()
+    if isinstance(value, np.ndarray):
+        return value.tolist()
+    raise TypeError(f"Object of type {type(value).__name__} is not JSON serializable")
+
+def dumps(value: Any) -> str:
+    return json.dumps(value, default=_json_default, separators=(",", ":"))
+
+def connect_sqlite(path: str) -> sqlite3.Connection:
+    """
+    Connection in WAL mode, so readers in other processes are not blocked by
+    a writer. Connections are not shared between threads.
+    """
+    conn = sqlite3.connect(path, timeout=5.0)
+    conn.execute("PRAGMA journal_mode=WAL")
+    conn.execute("PRAGMA synchronous=NORMAL")
+    return conn
+
+_MISSING = object()
+
+class LRUTTLCache:
+    """
+    Thread-safe LRU cache whose entries also expire `ttl` seconds after they
+    were written. ttl=None keeps entries until they are evicted by size.
+
+    Expired entries are dropped when read and, so that ones never read again
+    do not sit in memory until evicted, every `purge_every` writes.
+    """
+
+    def __init__(self, max_entries: int = 256, ttl: Optional[float] = 3600, purge_every: int = 100):
+        self.max_entries = max(1, max_entries)
+        self.ttl = ttl
+        self.purge_every = purge_every
+        self._writes = 0
+        self._data: "OrderedDict[str, tuple]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key: str, default: Any = None) -> Any:
+        with self._lock:
+            entry = self._data.get(key)
+            if entry is None:
+                return default
+            value, expires_at = entry
+            if expires_at is not None and expires_at <= time.monotonic():
+                del self._data[key]
+                return default
+            self._data.move_to_end(key)
+            return value
+
+    def set(self, key: str, value: Any):
+        expires_at = time.monotonic() + self.ttl if self.ttl else None
+        with self._lock:
+            self._data[key] = (value, expires_at)
+            self._data.move_to_end(key)
+            while len(self._data) > self.max_entries:
+                self._data.popitem(last=False)
+            self._writes += 1
+            if self.ttl and self.purge_every and self._writes % self.purge_every == 0:
+                self._purge_expired()
+
+    def _purge_expired(self):
+        """Drop every expired entry; the caller holds the lock."""
+        now = time.monotonic()
+        expired = [k for k, (_, exp) in self._data.items() if exp is not None and exp <= now]
+        for k in expired:
+            del self._data[k]
+
+    def __contains__(self, key: str) -> bool:
+        return self.get(key, _MISSING) is not _MISSING
+
+    def __len__(self) -> int:
+        return len(self._data)
+
+class SQLiteCache:
+    """
+    JSON values in a single SQLite table with per-entry expiry.
+
+    Each thread gets its own connection. Expired rows are ignored on read and
+    deleted every `purge_every` writes.
+    """
+
+    def __init__(self, path: str, ttl: Optional[float] = 86400, table: str = "cache", purge_every: int = 100):
+        self.path = path
+        self.ttl = ttl
+        self.table = table
+        self.purge_every = purge_every
+        self._writes = 0
+        self._local = threading.local()
+        directory = os.path.dirname(os.path.abspath(path))
+        os.makedirs(directory, exist_ok=True)
+        with self._connect() as conn:
+            conn.execute(
+                f"CREATE TABLE IF NOT EXISTS {table} ("
+                "key TEXT PRIMARY KEY, value TEXT NOT NULL, expires_at REAL)"
+            )
+
+    def _connect(self) -> sqlite3.Connection:
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = self._local.conn = connect_sqlite(self.path)
+        return conn
+
+    def get(self, key: str, default: Any = None) -> Any:
+        row = self._connect().execute(
+            f"SELECT value FROM {self.table} WHERE key = ? AND (expires_at IS NULL OR expires_at > ?)",
+            (key, time.time())
+        ).fetchone()
+        return json.loads(row[0]) if row else default
+
+    def set(self, key: str, value: Any):
+        expires_at = time.time() + self.ttl if self.ttl else None
+        conn = self._connect()
+        with conn:
+            conn.execute(
+                f"INSERT OR REPLACE INTO {self.table} (key, value, expires_at) VALUES (?, ?, ?)",
+                (key, dumps(value), expires_at)
+            )
+        self._writes += 1
+        if self.purge_every and self._writes % self.purge_every == 0:
+            self.purge_expired()
+
+    def update(self, key: str, fn) -> Any:
+        """
+        Atomically replace the value of `key` with fn(current value, or None
+        if missing or expired) and return the new value. Concurrent updates
+        from any thread or process are applied one after the other.
+        """
+        conn = self._connect()
+        # IMMEDIATE takes the write lock before the read
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            row = conn.execute(
+                f"SELECT value FROM {self.table} WHERE key = ? AND (expires_at IS NULL OR expires_at > ?)",
+                (key, time.time())
+            ).fetchone()
+            value = fn(json.loads(row[0]) if row else None)
+            expires_at = time.time() + self.ttl if self.ttl else None
+            conn.execute(
+                f"INSERT OR REPLACE INTO {self.table} (key, value, expires_at) VALUES (?, ?, ?)",
+                (key, dumps(value), expires_at)
+            )
+            conn.commit()
+        except Exception:
+            conn.rollback()
+            raise
+        self._writes += 1
+        if self.purge_every and self._writes % self.purge_every == 0:
+            self.purge_expired()
+        return value
+
+    def purge_expired(self) -> int:
+        conn = self._connect()
+        with conn:
+            cursor = conn.execute(
+                f"DELETE FROM {self.table} WHERE expires_at IS NOT NULL AND expires_at <= ?", (time.time(),)
+            )
+        return cursor.rowcount
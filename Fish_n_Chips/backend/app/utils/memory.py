@@ -0,0 +1,26 @@
+from typing import Dict, Union
+
+# /proc/<pid>/status fields, reported in MB
+_FIELDS = {
+    "VmRSS": "rss_mb",
+    "RssAnon": "rss_anon_mb",     # private heap, counted once per process
+    "RssFile": "rss_file_mb",     # file-backed pages (mmapped models, libraries), shared between processes
+}
+
+def process_memory(pid: Union[int, str] = "self") -> Dict[str, float]:
+    """
+    Resident memory of a process from /proc/<pid>/status.
+
+    Returns an empty dict where /proc is not available (non-Linux) or the
+    process is gone.
+    """
+    memory = {}
+    try:
+        with open(f"/proc/{pid}/status") as f:
+            for line in f:
+                key, _, value = line.partition(":")
+                if key in _FIELDS:
+                    memory[_FIELDS[key]] = round(int(value.split()[0]) / 1024, 1)
+    except (OSError, ValueError):
+        return {}
+    return memory
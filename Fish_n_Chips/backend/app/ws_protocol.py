@@ -0,0 +1,102 @@
+"""
+Binary frame protocol for the /ws/simulate EEG stream.
+
+Clients opt in with ``/ws/simulate?format=binary``. Each prediction is then
+sent as one binary WebSocket message: a fixed little-endian header followed
+by the raw samples, instead of a JSON document with the chunk as decimal
+text.
+
+Header layout (FRAME_HEADER, 26 bytes, little-endian):
+
+    offset  type     field
+    0       uint8    version (PROTOCOL_VERSION)
+    1       uint8    sample dtype (DTYPE_FLOAT32 or DTYPE_INT16)
+    2       uint8    risk level (index into RISK_LEVELS)
+    3       int8     status class
+    4       float64  timestamp
+    12      float32  probability
+    16      uint32   n_samples
+    20      uint16   n_channels
+    22      float32  scale (value = int16 sample / scale; 1.0 for float32)
+
+The payload is n_samples * n_channels samples in row-major [samples, channels]
+order. The stream sends each sample once: the first frame carries the first
+full window, every later frame only the hop of samples since the previous
+one (the same holds for "raw_chunk" in JSON frames). Errors are still sent as JSON text frames.
+"""
+import struct
+import numpy as np
+
+PROTOCOL_VERSION = 1
+
+FRAME_HEADER = struct.Struct("<BBBbdfIHf")
+
+DTYPE_FLOAT32 = 0
+DTYPE_INT16 = 1
+DTYPES = {"float32": DTYPE_FLOAT32, "int16": DTYPE_INT16}
+
+RISK_LEVELS = ["Low", "Medium", "High"]
+
+def decimate_for_display(chunk: np.ndarray, factor: int) -> np.ndarray:
+    """
+    Keep every `factor`-th sample. Only meant for plotting, no anti-alias filter.
+    """
+    if factor <= 1:
+        return chunk
+    return chunk[::factor]
+
+def encode_frame(timestamp: float, status_class: int, probability: float, risk_level: str,
+                 chunk: np.ndarray, dtype: str = "float32", decimate: int = 1) -> bytes:
+    """
+    Pack one prediction and its [samples, channels] chunk into a binary frame.
+
+    Args:
+        dtype: "float32" for raw samples or "int16" for samples quantized with a
+            per-frame scale (half the size, ~1e-4 relative precision).
+        decimate: Per-client display decimation factor.
+    """
+    samples = decimate_for_display(np.asarray(chunk), decimate)
+    n_samples, n_channels = samples.shape
+
+    if dtype == "int16":
+        peak = float(np.max(np.abs(samples))) if samples.size else 0.0
+        scale = 32767.0 / peak if peak > 0 else 1.0
+        payload = np.round(samples * scale).astype("<i2")
+    else:
+        scale = 1.0
+        payload = samples.astype("<f4")
+
+    header = FRAME_HEADER.pack(
+        PROTOCOL_VERSION,
+        DTYPES[dtype],
+        RISK_LEVELS.index(risk_level),
+        status_class,
+        timestamp,
+        probability,
+        n_samples,
+        n_channels,
+        scale
+    )
+    return header + payload.tobytes()
+
+def decode_frame(frame: bytes) -> dict:
+    """
+    Inverse of encode_frame, for Python clients and debugging.
+    """
+    version, dtype, risk, status_class, timestamp, probability, n_samples, n_channels, scale = \
+        FRAME_HEADER.unpack_from(frame)
+    if version != PROTOCOL_VERSION:
+        raise ValueError(f"Unsupported frame version: {version}")
+
+    sample_type = "<i2" if dtype == DTYPE_INT16 else "<f4"
+    samples = np.frombuffer(frame, dtype=sample_type, offset=FRAME_HEADER.size).reshape(n_samples, n_channels)
+    if dtype == DTYPE_INT16:
+        samples = samples / scale
+
+    return {
+        "timestamp": timestamp,
+        "status_class": status_class,
+        "probability": probability,
+        "risk_level": RISK_LEVELS[risk],
+        "raw_chunk": samples
+    }
@@ -0,0 +1,9 @@
+import os
+import sys
+import tempfile
+
+# Tests import the app as `backend.app...`, like the server run from Fish_n_Chips/
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..", "..")))
+
+# The default sqlite session store is created on import; keep it out of the checkout
+os.environ.setdefault("SESSION_DB", os.path.join(tempfile.mkdtemp(prefix="speech-tests-"), "sessions.db"))
@@ -0,0 +1,96 @@
+import sys
+import threading
+import types
+
+import numpy as np
+import pytest
+
+from backend.app.services.speech.asr_backends import FasterWhisperBackend, MAX_BATCH_ITEM_SEC
+from backend.app.utils.audio_utils import SPEECH_SAMPLE_RATE
+
+SR = SPEECH_SAMPLE_RATE
+
+def _clip(label: int, seconds: float) -> np.ndarray:
+    """Constant clip whose level encodes its label, so the fake model can tell clips apart."""
+    return np.full(int(seconds * SR), label / 100, dtype=np.float32)
+
+def _recognize(audio: np.ndarray, offset: float):
+    """Fake decode of one clip: one segment and one word at 0.1-0.2 s into the clip."""
+    label = int(round(float(np.mean(audio)) * 100))
+    word = types.SimpleNamespace(word=f" clip{label}", start=offset + 0.1, end=offset + 0.2)
+    return types.SimpleNamespace(text=f" clip{label}", start=offset, end=offset + len(audio) / SR, words=[word])
+
+class FakePipeline:
+    """BatchedInferencePipeline.transcribe with clip_timestamps as faster-whisper >= 1.2 reads them."""
+
+    def __init__(self):
+        self.calls = []
+
+    def transcribe(self, audio, clip_timestamps, **kwargs):
+        self.calls.append(len(clip_timestamps))
+        segments = []
+        for clip in clip_timestamps:
+            # Seconds -> samples, then slice, exactly like the library
+            start, end = int(clip["start"] * SR), int(clip["end"] * SR)
+            segments.append(_recognize(audio[start:end], start / SR))
+        return iter(segments), None
+
+class FakeModel:
+    def transcribe(self, samples, **kwargs):
+        return iter([_recognize(samples, 0.0)]), None
+
+def _backend(**kwargs):
+    backend = FasterWhisperBackend(**kwargs)
+    backend._model = FakeModel()
+    backend._pipeline = FakePipeline()
+    return backend
+
+def test_batch_results_map_back_to_their_inputs():
+    backend = _backend()
+    batch = [_clip(label, seconds) for label, seconds in [(11, 1.3), (22, 0.7), (33, 2.05), (44, 1.0)]]
+
+    results = backend._transcribe_batch(batch)
+
+    assert backend._pipeline.calls == [4]
+    assert [r["text"] for r in results] == ["clip11", "clip22", "clip33", "clip44"]
+    for result in results:
+        # Word times are relative to the start of each utterance
+        assert len(result["words"]) == 1
+        word = result["words"][0]
+        assert abs(word["start"] - 0.1) < 1e-6 and abs(word["end"] - 0.2) < 1e-6
+
+def test_long_and_single_utterances_skip_the_batched_pipeline():
+    backend = _backend()
+    batch = [_clip(5, MAX_BATCH_ITEM_SEC + 1), _clip(6, 1.0)]
+
+    results = backend._transcribe_batch(batch)
+
+    assert backend._pipeline.calls == []
+    assert [r["text"] for r in results] == ["clip5", "clip6"]
+
+def test_concurrent_requests_get_their_own_transcription():
+    backend = _backend(max_wait_ms=50)
+    labels = list(range(10, 18))
+    results = {}
+
+    def request(label):
+        results[label] = backend.transcribe(b"", samples=_clip(label, 0.5 + label / 100))
+
+    threads = [threading.Thread(target=request, args=(label,)) for label in labels]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert {label: r["text"] for label, r in results.items()} == {label: f"clip{label}" for label in labels}
+    # They were decoded together, not one by one
+    assert max(backend._pipeline.calls, default=0) > 1
+
+def test_load_rejects_faster_whisper_without_clip_seconds(monkeypatch):
+    old = types.ModuleType("faster_whisper")
+    old.__version__ = "1.1.0"
+    old.WhisperModel = old.BatchedInferencePipeline = object
+    monkeypatch.setitem(sys.modules, "faster_whisper", old)
+
+    with pytest.raises(RuntimeError, match="too old"):
+        FasterWhisperBackend().load()
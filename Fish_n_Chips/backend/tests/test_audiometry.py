@@ -0,0 +1,87 @@
+import threading
+
+import pytest
+
+from backend.app.services.speech.audiometry_service import (
+    AudiometryEngine, AudiometrySession, Staircase, FINAL_STEP_DB, INITIAL_STEP_DB, MAX_LEVEL_DB,
+    MAX_TRIALS, REVERSALS_TO_STOP, START_LEVEL_DB, db_to_volume
+)
+
+def run_listener(staircase: Staircase, true_threshold_db: float):
+    """Answer like a listener who hears every tone at or above their threshold."""
+    while not staircase.done:
+        staircase.respond(staircase.level_db, staircase.level_db >= true_threshold_db)
+    return staircase
+
+def test_two_down_one_up():
+    s = Staircase(1000)
+    s.respond(START_LEVEL_DB, True)
+    assert s.level_db == START_LEVEL_DB  # one heard tone is not enough
+    s.respond(START_LEVEL_DB, True)
+    assert s.level_db == START_LEVEL_DB - INITIAL_STEP_DB
+    s.respond(s.level_db, False)
+    assert s.level_db == START_LEVEL_DB
+    assert s.reversal_levels == [START_LEVEL_DB - INITIAL_STEP_DB]
+
+def test_step_shrinks_after_two_reversals():
+    s = Staircase(1000)
+    for heard in (True, True, False, True, True):
+        s.respond(s.level_db, heard)
+    assert len(s.reversal_levels) == 2
+    assert s.step_db == FINAL_STEP_DB
+
+@pytest.mark.parametrize("true_threshold_db", [12, 25, 47, 80])
+def test_converges_near_listener_threshold(true_threshold_db):
+    s = run_listener(Staircase(1000), true_threshold_db)
+    assert len(s.reversal_levels) == REVERSALS_TO_STOP
+    assert abs(s.threshold_db - true_threshold_db) <= FINAL_STEP_DB
+
+def test_deaf_listener_stops_at_the_loudest_level():
+    s = run_listener(Staircase(1000), MAX_LEVEL_DB + 50)
+    assert s.threshold_db == MAX_LEVEL_DB
+    assert s.trials < MAX_TRIALS
+
+def test_finished_staircase_ignores_more_answers():
+    s = run_listener(Staircase(1000), 40)
+    trials, threshold = s.trials, s.threshold_db
+    s.respond(10, True)
+    assert (s.trials, s.threshold_db) == (trials, threshold)
+    assert s.status()["continue_test"] is False and s.status()["next_volume"] is None
+
+def test_session_round_trip_and_pure_tone_average():
+    session = AudiometrySession([500, 1000, 2000, 4000, 8000])
+    for frequency, threshold in zip([500, 1000, 2000, 4000, 8000], [20, 30, 40, 50, 90]):
+        run_listener(session.staircase(frequency), threshold)
+
+    restored = AudiometrySession.from_dict(session.to_dict())
+    assert restored.done
+    assert restored.thresholds() == session.thresholds()
+    # 8 kHz is not a PTA frequency
+    pta = [session.thresholds()[f] for f in (500, 1000, 2000, 4000)]
+    assert restored.hearing_threshold_db() == round(sum(pta) / 4, 1)
+
+@pytest.fixture(params=["memory", "sqlite"])
+def engine(request, tmp_path):
+    return AudiometryEngine(db_path=str(tmp_path / "sessions.db") if request.param == "sqlite" else None)
+
+def test_engine_sessions_are_independent(engine):
+    status_a, _ = engine.respond("a", 1000, db_to_volume(30), False)
+    status_b, _ = engine.respond("b", 1000, db_to_volume(30), True)
+    assert status_a["next_volume"] == db_to_volume(30 + INITIAL_STEP_DB)
+    assert status_b["next_volume"] == db_to_volume(30)
+
+def test_engine_sweep_defaults_and_concurrent_answers(engine):
+    statuses, _ = engine.sweep("s", [])
+    assert [s["frequency_hz"] for s in statuses] == [500, 1000, 2000, 4000]
+
+    # Answers posted concurrently for one session are all applied
+    threads = [
+        threading.Thread(target=engine.respond, args=("s", 1000, db_to_volume(30), True))
+        for _ in range(8)
+    ]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    _, session = engine.sweep("s", [])
+    assert session.staircase(1000).trials == 8
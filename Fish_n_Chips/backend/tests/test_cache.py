@@ -0,0 +1,54 @@
+import threading
+import time
+
+import numpy as np
+
+from backend.app.services.speech.analysis_cache import AnalysisCache
+from backend.app.utils.cache import LRUTTLCache, SQLiteCache
+
+def test_lru_evicts_least_recently_used():
+    cache = LRUTTLCache(max_entries=2, ttl=None)
+    cache.set("a", 1)
+    cache.set("b", 2)
+    cache.get("a")
+    cache.set("c", 3)
+    assert "b" not in cache
+    assert cache.get("a") == 1 and cache.get("c") == 3
+
+def test_lru_purges_expired_entries_on_writes():
+    cache = LRUTTLCache(max_entries=100, ttl=0.01, purge_every=5)
+    for i in range(4):
+        cache.set(f"old{i}", i)
+    time.sleep(0.02)
+    # Never read again, but dropped by the 5th write
+    cache.set("new", 0)
+    assert len(cache) == 1
+
+def test_sqlite_cache_round_trip_and_expiry(tmp_path):
+    cache = SQLiteCache(str(tmp_path / "cache.db"), ttl=60)
+    cache.set("k", {"x": np.float64(1.5), "y": np.arange(3)})
+    assert cache.get("k") == {"x": 1.5, "y": [0, 1, 2]}
+    assert cache.update("k", lambda v: {**v, "x": v["x"] + 1})["x"] == 2.5
+
+    expired = SQLiteCache(str(tmp_path / "cache.db"), ttl=-1, table="expired", purge_every=0)
+    expired.set("k", 1)
+    assert expired.get("k") is None
+    assert expired.purge_expired() == 1
+
+def test_analysis_cache_counts_hits_and_misses_across_threads():
+    cache = AnalysisCache(max_entries=8)
+    key = AnalysisCache.key(np.zeros(16, dtype=np.float32), 16000)
+    cache.set(key, {"transcription": "hi"})
+
+    def lookups():
+        for _ in range(500):
+            cache.get(key)
+            cache.get("missing")
+
+    threads = [threading.Thread(target=lookups) for _ in range(8)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    assert cache.stats()["hits"] == 4000
+    assert cache.stats()["misses"] == 4000
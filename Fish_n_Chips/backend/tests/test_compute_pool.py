@@ -0,0 +1,51 @@
+import asyncio
+import os
+import time
+
+import pytest
+from fastapi import HTTPException
+
+from backend.app.services.compute_pool import ComputePool
+
+@pytest.fixture(scope="module")
+def pool():
+    with pytest.MonkeyPatch.context() as mp:
+        # Workers would otherwise load every model on startup
+        mp.setenv("MODEL_PRELOAD", "")
+        pool = ComputePool(max_workers=2, max_pending=2, timeout=30)
+        pool.start()
+        yield pool
+        pool.shutdown()
+
+def _wait_for(condition, timeout=30):
+    deadline = time.monotonic() + timeout
+    while not condition():
+        assert time.monotonic() < deadline
+        time.sleep(0.05)
+
+def test_runs_jobs_and_reports_worker_pids(pool):
+    pid = asyncio.run(pool.run(os.getpid))
+    _wait_for(lambda: len(pool.worker_pids()) == 2)
+    assert pid in pool.worker_pids()
+    assert os.getpid() not in pool.worker_pids()
+
+def test_timed_out_job_keeps_its_slot_until_it_finishes(pool):
+    with pytest.raises(HTTPException) as err:
+        asyncio.run(pool.run(time.sleep, 1.0, timeout=0.1))
+    assert err.value.status_code == 504
+
+    # Still running in its worker
+    assert pool.pending == 1
+    _wait_for(lambda: pool.pending == 0)
+
+def test_rejects_when_full(pool):
+    async def scenario():
+        running = [asyncio.ensure_future(pool.run(time.sleep, 0.5)) for _ in range(2)]
+        await asyncio.sleep(0)
+        with pytest.raises(HTTPException) as err:
+            await pool.run(time.sleep, 0)
+        await asyncio.gather(*running)
+        return err.value.status_code
+
+    assert asyncio.run(scenario()) == 503
+    _wait_for(lambda: pool.pending == 0)
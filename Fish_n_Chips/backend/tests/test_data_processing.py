@@ -0,0 +1,92 @@
+import numpy as np
+import pytest
+from fastapi import HTTPException
+
+from backend.app.data_processing import iter_csv_chunks, iter_edf_chunks, parse_csv, parse_edf
+from backend.app.feature_extraction import iter_chunked_window_batches, iter_window_batches
+from backend.app.montage import REQUIRED_CHANNELS
+from backend.app.resampling import resample
+
+def make_edf(signals: np.ndarray, sfreq: int, labels, record_sec: int = 1) -> bytes:
+    """EDF bytes for [n_samples, n_signals] int16-range signals in uV."""
+    per_record = sfreq * record_sec
+    n_records = signals.shape[0] // per_record
+    n_signals = signals.shape[1]
+
+    def fields(values, size):
+        return "".join(str(v)[:size].ljust(size) for v in values)
+
+    header = "0".ljust(8) + "".ljust(80) + "".ljust(80) + "01.01.26" + "00.00.00"
+    header += str(256 * (n_signals + 1)).ljust(8) + "".ljust(44)
+    header += str(n_records).ljust(8) + str(record_sec).ljust(8) + str(n_signals).ljust(4)
+    header += fields(labels, 16) + fields([""] * n_signals, 80) + fields(["uV"] * n_signals, 8)
+    header += fields([-32768] * n_signals, 8) + fields([32767] * n_signals, 8)
+    header += fields([-32768] * n_signals, 8) + fields([32767] * n_signals, 8)
+    header += fields([""] * n_signals, 80) + fields([per_record] * n_signals, 8) + fields([""] * n_signals, 32)
+
+    digital = signals[:n_records * per_record].astype("<i2")
+    records = digital.reshape(n_records, per_record, n_signals).transpose(0, 2, 1)
+    return header.encode("latin-1") + records.tobytes()
+
+def _recording(sfreq, seconds, extra_channels=()):
+    labels = [f"EEG {ch}-REF" for ch in REQUIRED_CHANNELS][::-1] + list(extra_channels)
+    digital = np.random.default_rng(0).integers(-2000, 2000, (sfreq * seconds, len(labels)))
+    return digital, labels
+
+def _expected_volts(digital, labels):
+    columns = [labels.index(f"EEG {ch}-REF") for ch in REQUIRED_CHANNELS]
+    return digital[:, columns] * 1e-6
+
+def test_parse_edf_picks_channels_in_training_order():
+    digital, labels = _recording(256, 8, extra_channels=["ECG"])
+    data = parse_edf(make_edf(digital, 256, labels))
+    np.testing.assert_allclose(data, _expected_volts(digital, labels), rtol=1e-12, atol=1e-15)
+
+@pytest.mark.parametrize("sfreq", [512, 500])
+def test_parse_edf_resamples_like_resample(sfreq):
+    digital, labels = _recording(sfreq, 70)
+    content = make_edf(digital, sfreq, labels)
+    expected = resample(_expected_volts(digital, labels), sfreq, 256)
+
+    data = parse_edf(content)
+    np.testing.assert_allclose(data, expected, rtol=1e-12, atol=1e-15)
+
+    # The streamed chunks are the same samples
+    np.testing.assert_allclose(np.concatenate(list(iter_edf_chunks(content))), expected, rtol=1e-12, atol=1e-15)
+
+def test_chunked_windows_match_whole_recording():
+    digital, labels = _recording(500, 90)
+    content = make_edf(digital, 500, labels)
+    whole = list(iter_window_batches(parse_edf(content), 4, 2, 256, 16))
+    chunked = list(iter_chunked_window_batches(iter_edf_chunks(content), 4, 2, 256, 16))
+
+    # Batches may be cut differently at chunk edges; the windows are the same
+    np.testing.assert_array_equal(np.concatenate([s for s, _ in whole]), np.concatenate([s for s, _ in chunked]))
+    np.testing.assert_allclose(
+        np.concatenate([w for _, w in whole]), np.concatenate([w for _, w in chunked]), rtol=1e-12, atol=1e-15
+    )
+
+def test_parse_edf_missing_channel_is_400():
+    digital, labels = _recording(256, 2)
+    with pytest.raises(HTTPException) as err:
+        parse_edf(make_edf(digital[:, 1:], 256, labels[1:]))
+    assert err.value.status_code == 400
+
+def _csv(data, columns):
+    lines = [",".join(columns)] + [",".join(repr(float(v)) for v in row) for row in data]
+    return ("\n".join(lines) + "\n").encode()
+
+def test_parse_csv_selects_channel_columns():
+    data = np.random.default_rng(3).standard_normal((300, 16))
+    columns = list(REQUIRED_CHANNELS)[::-1]
+    content = _csv(np.column_stack([data[:, ::-1], np.arange(300)]), columns + ["time"])
+
+    np.testing.assert_allclose(parse_csv(content), data, rtol=1e-15)
+    # pandas' C parser may be off by a few ulp (no float_precision="round_trip")
+    np.testing.assert_allclose(np.concatenate(list(iter_csv_chunks(content, chunk_rows=64))), data, rtol=1e-12)
+
+def test_parse_csv_missing_channel_is_400():
+    content = _csv(np.zeros((4, 15)), list(REQUIRED_CHANNELS)[1:])
+    with pytest.raises(HTTPException) as err:
+        parse_csv(content)
+    assert err.value.status_code == 400
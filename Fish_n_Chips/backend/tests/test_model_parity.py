@@ -0,0 +1,84 @@
+"""
+The compiled forests must score exactly like sklearn. Runs on a small
+fitted forest, and on the served artifacts in models/ when they are present
+(re-run after retraining a model).
+"""
+import os
+import warnings
+
+import joblib
+import numpy as np
+import pytest
+from sklearn.ensemble import RandomForestClassifier
+
+from backend.app.services.model_registry import MODEL_DIR
+from backend.app.services.model_serving import (
+    CompiledForest, PARITY_ATOL, SKLEARN_BATCH_ROWS, check_parity, compile_forest
+)
+
+ARTIFACTS = ["eeg_best_model.joblib", "speech_ml_model.joblib"]
+# Real feature rows, when the EEG notebooks saved them
+EEG_FEATURES = os.path.join(MODEL_DIR, "X_features.joblib")
+
+@pytest.fixture(scope="module")
+def forest():
+    rng = np.random.default_rng(0)
+    X = rng.normal(size=(400, 8))
+    y = (X[:, 0] + X[:, 1] * X[:, 2] > 0).astype(int)
+    return RandomForestClassifier(n_estimators=20, max_depth=8, random_state=0).fit(X, y), X
+
+def _sklearn_proba(model, X):
+    with warnings.catch_warnings():
+        warnings.simplefilter("ignore", UserWarning)
+        return model.predict_proba(X)
+
+def test_compiled_forest_matches_sklearn(forest):
+    model, X = forest
+    compiled = CompiledForest(model)
+    assert check_parity(model, compiled) <= PARITY_ATOL
+    assert check_parity(model, compiled, X) <= PARITY_ATOL
+
+def test_bundle_round_trip(forest, tmp_path):
+    model, X = forest
+    CompiledForest(model).save_bundle(str(tmp_path / "bundle"))
+    loaded = CompiledForest.load_bundle(str(tmp_path / "bundle"))
+    assert check_parity(model, loaded, X) <= PARITY_ATOL
+
+def test_large_batches_go_to_sklearn(forest):
+    model, X = forest
+    compiled = compile_forest(model)
+    assert isinstance(compiled, CompiledForest)
+
+    calls = []
+    compiled.set_sklearn_loader(lambda: calls.append(1) or model)
+    small = compiled.predict_proba(X[:SKLEARN_BATCH_ROWS - 1])
+    assert calls == []
+    large = compiled.predict_proba(X[:SKLEARN_BATCH_ROWS])
+    compiled.predict_proba(X[:SKLEARN_BATCH_ROWS])
+    # Loaded once, on the first large batch
+    assert calls == [1]
+
+    np.testing.assert_allclose(small, _sklearn_proba(model, X[:SKLEARN_BATCH_ROWS - 1]), atol=PARITY_ATOL)
+    np.testing.assert_array_equal(large, _sklearn_proba(model, X[:SKLEARN_BATCH_ROWS].astype(np.float32)))
+
+def test_large_batches_without_sklearn_use_the_walk(forest):
+    model, X = forest
+    compiled = CompiledForest(model)
+    compiled.set_sklearn_loader(lambda: None)
+    np.testing.assert_allclose(compiled.predict_proba(X), _sklearn_proba(model, X), atol=PARITY_ATOL)
+
+@pytest.mark.parametrize("artifact", ARTIFACTS)
+def test_served_artifacts_match_sklearn(artifact):
+    path = os.path.join(MODEL_DIR, artifact)
+    if not os.path.exists(path):
+        pytest.skip(f"{path} not found")
+
+    with warnings.catch_warnings():
+        # Artifacts may have been pickled by another sklearn version
+        warnings.simplefilter("ignore")
+        model = joblib.load(path)
+    compiled = CompiledForest(model)
+
+    assert check_parity(model, compiled) <= PARITY_ATOL
+    if artifact.startswith("eeg") and os.path.exists(EEG_FEATURES):
+        assert check_parity(model, compiled, np.asarray(joblib.load(EEG_FEATURES))) <= PARITY_ATOL
@@ -0,0 +1,10 @@
+import os
+
+from backend.app.services.model_registry import DEFAULT_MODEL_DIR
+
+FISH_N_CHIPS = os.path.abspath(os.path.join(os.path.dirname(__file__), "..", ".."))
+
+def test_default_model_dir_is_next_to_backend(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    assert os.path.isabs(DEFAULT_MODEL_DIR)
+    assert DEFAULT_MODEL_DIR == os.path.join(FISH_N_CHIPS, "models")
@@ -0,0 +1,42 @@
+import numpy as np
+import pytest
+from scipy.signal import resample_poly
+
+from backend.app.resampling import StreamingResampler, get_kernel, resample, resampled_length
+
+RATES = [512, 500, 250, 200, 1000, 173]
+
+@pytest.mark.parametrize("source_rate", RATES)
+def test_resample_matches_resample_poly(source_rate):
+    data = np.random.default_rng(0).standard_normal((source_rate * 5, 3))
+    up, down, _, _ = get_kernel(source_rate, 256)
+    expected = resample_poly(data, up, down, axis=0)
+
+    out = resample(data, source_rate, 256)
+    np.testing.assert_allclose(out, expected, rtol=1e-12, atol=1e-12)
+    assert out.shape[0] == resampled_length(data.shape[0], source_rate, 256)
+
+@pytest.mark.parametrize("source_rate", RATES)
+@pytest.mark.parametrize("chunk_size", [1, 7, 100, 2500, None])
+def test_streaming_matches_whole_recording(source_rate, chunk_size):
+    data = np.random.default_rng(1).standard_normal((source_rate * 10 + 37, 4))
+    chunk_size = chunk_size or data.shape[0]
+
+    resampler = StreamingResampler(source_rate, 256)
+    chunks = [resampler.process(data[i:i + chunk_size]) for i in range(0, data.shape[0], chunk_size)]
+    chunks.append(resampler.flush())
+
+    np.testing.assert_array_equal(np.concatenate(chunks), resample(data, source_rate, 256))
+
+def test_streaming_buffer_stays_bounded():
+    data = np.random.default_rng(2).standard_normal((512 * 60, 2))
+    resampler = StreamingResampler(512, 256)
+    for i in range(0, data.shape[0], 512):
+        resampler.process(data[i:i + 512])
+        # Chunk plus filter history, never the whole recording
+        assert resampler._buffer.shape[0] < 512 + len(resampler.filter)
+
+def test_same_rate_is_identity():
+    data = np.ones((10, 2))
+    assert resample(data, 256, 256) is data
+    assert resampled_length(10, 256, 256) == 10
@@ -0,0 +1,81 @@
+import threading
+from types import SimpleNamespace
+
+import numpy as np
+import pytest
+
+from backend.app.services.speech.session_aggregates import METRIC_COLUMNS, RunningStat, SessionAggregate
+from backend.app.services.speech.session_store import MemorySessionStore, SQLiteSessionStore
+
+def sentence(rng):
+    return {name: float(rng.normal(50, 20)) for name in METRIC_COLUMNS}
+
+def test_running_stat_matches_numpy():
+    values = np.random.default_rng(0).normal(1e6, 3.0, 500)
+    stat = RunningStat()
+    for value in values:
+        stat.add(value)
+    assert stat.mean == pytest.approx(values.mean(), rel=1e-12)
+    assert stat.std == pytest.approx(values.std(ddof=1), rel=1e-9)
+
+def test_fewer_than_two_values_have_zero_std():
+    stat = RunningStat()
+    assert stat.std == 0.0
+    stat.add(5.0)
+    assert (stat.mean, stat.std) == (5.0, 0.0)
+
+def test_resume_from_saved_columns_continues_the_statistics():
+    rng = np.random.default_rng(1)
+    sentences = [sentence(rng) for _ in range(12)]
+
+    full = SessionAggregate()
+    for metrics in sentences:
+        full.add(metrics)
+
+    # Session dropped out of the store after 7 sentences; resume from the DB row
+    partial = SessionAggregate()
+    for metrics in sentences[:7]:
+        partial.add(metrics)
+    resumed = SessionAggregate.from_db(SimpleNamespace(**partial.column_values()))
+    for metrics in sentences[7:]:
+        resumed.add(metrics)
+
+    assert resumed.count == full.count
+    for name, (mean_column, std_column) in METRIC_COLUMNS.items():
+        assert resumed.column_values()[mean_column] == pytest.approx(full.column_values()[mean_column], rel=1e-12)
+        if std_column:
+            expected = np.std([m[name] for m in sentences], ddof=1)
+            assert resumed.column_values()[std_column] == pytest.approx(expected, rel=1e-9)
+
+def test_empty_row_resumes_empty():
+    row = SimpleNamespace(sentence_count=None, **{c: None for cols in METRIC_COLUMNS.values() for c in cols if c})
+    assert SessionAggregate.from_db(row).count == 0
+
+def test_dict_round_trip():
+    aggregate = SessionAggregate()
+    aggregate.add(sentence(np.random.default_rng(2)))
+    assert SessionAggregate.from_dict(aggregate.to_dict()) == aggregate
+
+@pytest.mark.parametrize("kind", ["memory", "sqlite"])
+def test_concurrent_resume_counts_every_sentence_once(kind, tmp_path):
+    # Two sentences were saved with the test; the store has since expired the session
+    saved = SessionAggregate()
+    for value in (1.0, 2.0):
+        saved.add({"overall_risk": value})
+    if kind == "sqlite":
+        stores = [SQLiteSessionStore(str(tmp_path / "sessions.db")) for _ in range(2)]  # e.g. two workers
+    else:
+        stores = [MemorySessionStore()] * 2
+
+    threads = [
+        threading.Thread(target=stores[i % 2].add_sentence, args=("s1", {"overall_risk": 3.0}, saved, "user"))
+        for i in range(10)
+    ]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+
+    aggregate = stores[0].get_aggregate("s1")
+    assert aggregate.count == 12
+    assert aggregate.mean("overall_risk") == pytest.approx((1 + 2 + 3 * 10) / 12)
@@ -0,0 +1,50 @@
+import pytest
+
+from backend.app.services.speech.session_store import (
+    MemorySessionStore, SQLiteSessionStore, create_session_store
+)
+
+def metrics(value: float):
+    return {"overall_risk": value, "reaction_time_ms": 10 * value}
+
+@pytest.fixture(params=["memory", "sqlite"])
+def store(request, tmp_path):
+    if request.param == "sqlite":
+        return SQLiteSessionStore(str(tmp_path / "sessions.db"))
+    return MemorySessionStore()
+
+def test_sentences_update_the_aggregate(store):
+    store.create("s1", "user")
+    for value in (1, 2, 3):
+        aggregate = store.add_sentence("s1", metrics(value))
+    assert aggregate.count == 3
+    assert store.get_aggregate("s1").mean("overall_risk") == pytest.approx(2.0)
+    assert store.get_aggregate("s1").mean("reaction_time_ms") == pytest.approx(20.0)
+
+def test_unknown_session(store):
+    assert store.get_aggregate("missing") is None
+    assert store.add_sentence("missing", metrics(1)) is None
+
+def test_sessions_expire(tmp_path):
+    for store in (MemorySessionStore(ttl=-1), SQLiteSessionStore(str(tmp_path / "expired.db"), ttl=-1)):
+        store.create("s1", "user")
+        assert store.get_aggregate("s1") is None
+
+def test_sqlite_store_is_shared_between_instances(tmp_path):
+    path = str(tmp_path / "sessions.db")
+    SQLiteSessionStore(path).create("s1", "user")
+    SQLiteSessionStore(path).add_sentence("s1", metrics(4))
+    assert SQLiteSessionStore(path).get_aggregate("s1").count == 1
+
+def test_sqlite_purges_expired_rows(tmp_path):
+    store = SQLiteSessionStore(str(tmp_path / "sessions.db"), ttl=-1, purge_every=0)
+    for i in range(3):
+        store.create(f"s{i}", "user")
+    assert store.purge_expired() == 3
+
+def test_create_session_store(monkeypatch, tmp_path):
+    monkeypatch.setenv("SESSION_DB", str(tmp_path / "sessions.db"))
+    assert create_session_store().name == "sqlite"
+    assert create_session_store("memory").name == "memory"
+    with pytest.raises(ValueError):
+        create_session_store("redis")
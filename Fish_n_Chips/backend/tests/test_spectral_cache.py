@@ -0,0 +1,35 @@
+import numpy as np
+import librosa
+import pytest
+
+from backend.app.services.speech.feature_extractor import extract_acoustic_features
+from backend.app.services.speech.spectral_cache import SpectralCache
+
+SR = 16000
+
+def _tone(n_samples: int, seed: int = 0) -> np.ndarray:
+    rng = np.random.default_rng(seed)
+    t = np.arange(n_samples) / SR
+    return (0.3 * np.sin(2 * np.pi * 200 * t) + 0.05 * rng.standard_normal(n_samples)).astype(np.float32)
+
+@pytest.mark.parametrize("n_samples", [4096, SR * 2 + 123])
+def test_mfcc_matches_librosa_defaults(n_samples):
+    y = _tone(n_samples)
+    np.testing.assert_array_equal(SpectralCache(y, SR).mfcc(n_mfcc=13), librosa.feature.mfcc(y=y, sr=SR, n_mfcc=13))
+
+def test_feature_energy_matches_librosa_defaults():
+    y = _tone(SR)
+    np.testing.assert_array_equal(SpectralCache(y, SR).feature_rms, librosa.feature.rms(y=y)[0])
+
+def test_speech_rms_matches_librosa_framing():
+    y = _tone(SR)
+    cache = SpectralCache(y, SR)
+    expected = librosa.feature.rms(y=y, frame_length=cache.frame_length, hop_length=cache.hop_length)[0]
+    np.testing.assert_allclose(cache.rms, expected, rtol=1e-5)
+
+def test_acoustic_features_keep_baseline_definition():
+    y = _tone(SR * 2)
+    features = extract_acoustic_features(y, SR, pitch_engine="yin")
+    np.testing.assert_array_equal(features["mfcc_features"],
+                                  np.mean(librosa.feature.mfcc(y=y, sr=SR, n_mfcc=13), axis=1).tolist())
+    assert features["energy_mean"] == float(np.mean(librosa.feature.rms(y=y)))
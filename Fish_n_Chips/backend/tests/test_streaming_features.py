@@ -0,0 +1,54 @@
+import numpy as np
+import pytest
+
+from backend.app.feature_extraction import extract_features_batch, extract_features_from_segment
+from backend.app.streaming_features import StreamingFeatureExtractor
+
+FS = 256
+
+def recording(seconds: float, seed: int = 0, offset: float = 0.0):
+    rng = np.random.default_rng(seed)
+    t = np.arange(int(seconds * FS)) / FS
+    alpha = np.sin(2 * np.pi * 10 * t)[:, None] * rng.uniform(0.5, 2, 16)
+    return rng.standard_normal((t.size, 16)) + alpha + offset
+
+def stream(engine, data, chunk):
+    features = []
+    for i in range(0, data.shape[0], chunk):
+        features.extend(engine.push(data[i:i + chunk]))
+    return features
+
+def expected_windows(data, window, hop):
+    starts = range(0, data.shape[0] - window + 1, hop)
+    return np.stack([data[s:s + window] for s in starts])
+
+@pytest.mark.parametrize("hop_sec", [0.25, 1, 0.3])
+@pytest.mark.parametrize("chunk", [1, 37, 64, 2000])
+def test_streaming_matches_batch_features(hop_sec, chunk):
+    data = recording(20)
+    engine = StreamingFeatureExtractor(fs=FS, window_sec=4, hop_sec=hop_sec)
+    streamed = np.array(stream(engine, data, chunk))
+    batch = extract_features_batch(expected_windows(data, engine.window, engine.hop), FS)
+
+    assert streamed.shape == batch.shape
+    np.testing.assert_allclose(streamed, batch, rtol=1e-10, atol=1e-10)
+
+def test_running_sums_do_not_drift_on_offset_signals():
+    # A large DC offset is where naive power sums lose precision
+    data = recording(60, seed=1, offset=1e4)
+    engine = StreamingFeatureExtractor(fs=FS, window_sec=4, hop_sec=0.25)
+    streamed = stream(engine, data, 64)
+    last = extract_features_from_segment(data[-engine.window:], FS)
+    np.testing.assert_allclose(streamed[-1], last, rtol=1e-8, atol=1e-8)
+
+def test_flat_channel_matches_batch():
+    data = recording(8, seed=2)
+    data[:, 3] = 5.0
+    engine = StreamingFeatureExtractor(fs=FS, window_sec=4, hop_sec=1)
+    streamed = np.array(stream(engine, data, 100))
+    batch = extract_features_batch(expected_windows(data, engine.window, engine.hop), FS)
+    np.testing.assert_allclose(streamed, batch, rtol=1e-10, atol=1e-10)
+
+def test_segments_are_reused_for_aligned_hops():
+    assert StreamingFeatureExtractor(fs=FS, hop_sec=0.25).reuses_segments
+    assert not StreamingFeatureExtractor(fs=FS, hop_sec=0.3).reuses_segments
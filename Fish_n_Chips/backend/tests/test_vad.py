@@ -0,0 +1,80 @@
+import numpy as np
+import pytest
+
+from backend.app.services.speech import vad_service
+from backend.app.services.speech.pause_analyzer import detect_pauses_from_vad
+from backend.app.services.speech.vad_service import StreamingVAD, detect_speech_segments
+
+SR = 16000
+FRAME = 480  # 30 ms at 16 kHz
+
+class EnergyVad:
+    """Deterministic stand-in for webrtcvad.Vad: a frame is speech if it is loud."""
+
+    def __init__(self, aggressiveness):
+        self.frames = []
+
+    def is_speech(self, frame, sample_rate):
+        samples = np.frombuffer(bytes(frame), dtype="<i2")
+        assert len(samples) == FRAME
+        self.frames.append(bytes(frame))
+        return bool(np.abs(samples).max() > 1000)
+
+@pytest.fixture
+def energy_vad(monkeypatch):
+    monkeypatch.setattr(vad_service.webrtcvad, "Vad", EnergyVad)
+
+def pcm(frame_pattern: str) -> bytes:
+    """One 30 ms frame per character: '#' loud, '.' silent."""
+    loud = np.full(FRAME, 5000, dtype="<i2")
+    quiet = np.zeros(FRAME, dtype="<i2")
+    return np.concatenate([loud if c == "#" else quiet for c in frame_pattern]).tobytes()
+
+def test_onset_and_segments(energy_vad):
+    result = detect_speech_segments(pcm("...." + "#" * 10 + "......" + "#" * 8 + ".."))
+    assert result.speech_onset_ms == 120.0
+    assert result.speech_segments == [(0.12, 0.42), (0.6, 0.84)]
+    assert result.non_speech_segments == [(0.0, 0.12), (0.42, 0.6), (0.84, 0.9)]
+
+def test_short_bursts_are_not_speech(energy_vad):
+    # 2 frames = 60 ms < min_speech_ms: a click neither starts speech nor splits the pause
+    result = detect_speech_segments(pcm("..##......" + "#" * 10 + "...." + "#" + "...." + "#" * 10))
+    assert result.speech_onset_ms == 300.0
+    assert len(result.speech_segments) == 2
+
+def test_no_speech(energy_vad):
+    result = detect_speech_segments(pcm("." * 20))
+    assert not result.has_speech
+    assert result.speech_segments == []
+    assert detect_speech_segments(b"").speech_onset_ms == -1.0
+
+@pytest.mark.parametrize("chunk_bytes", [1, 7, 479, 960, 10000])
+def test_chunked_input_gives_the_same_frames(energy_vad, chunk_bytes):
+    audio = pcm("...#####.....##########...") + b"\x01\x00" * 100  # trailing partial frame
+    whole = StreamingVAD()
+    whole.process(audio)
+
+    chunked = StreamingVAD()
+    for i in range(0, len(audio), chunk_bytes):
+        chunked.process(memoryview(audio)[i:i + chunk_bytes])
+
+    assert chunked.vad.frames == whole.vad.frames
+    assert chunked.result().speech_segments == whole.result().speech_segments
+
+def test_pauses_are_gaps_between_speech(energy_vad):
+    result = detect_speech_segments(pcm("..." + "#" * 10 + "." * 20 + "#" * 10 + "..." + "#" * 10 + "....."))
+    pauses = detect_pauses_from_vad(result, min_silence_duration=0.3)
+    # The 600 ms gap counts; the 90 ms gap and the leading/trailing silence do not
+    assert pauses["pause_count"] == 1
+    assert pauses["pause_locations"][0]["duration"] == pytest.approx(0.6)
+
+def test_real_vad_chunked_matches_whole():
+    rng = np.random.default_rng(0)
+    t = np.arange(SR * 2) / SR
+    voiced = sum(np.sin(2 * np.pi * f * t) for f in (150, 300, 450, 900, 1800)) * 3000
+    audio = np.where((t > 0.5) & (t < 1.5), voiced, rng.normal(0, 30, t.size)).astype("<i2").tobytes()
+
+    vad = StreamingVAD()
+    for i in range(0, len(audio), 1234):
+        vad.process(audio[i:i + 1234])
+    assert vad.result().speech_segments == detect_speech_segments(audio).speech_segments
@@ -0,0 +1,131 @@
+"""
+Accuracy vs. speed of the pitch engines used by extract_acoustic_features.
+
+Usage (from Fish_n_Chips/):
+    python benchmark_pitch.py recordings/*.wav      # recorded sentences, pyin as reference
+    python benchmark_pitch.py                       # synthetic sentences with known F0
+
+Each file is decoded exactly like /api/speech/analyze does (mono float32,
+16 kHz). For every engine the script reports the median run time and the
+pitch_mean / pitch_std features; frame-level agreement is measured against
+the reference (pyin for recordings, the true contour for synthetic input):
+
+    GPE      gross pitch error: share of frames voiced in both whose F0 is
+             off by more than 20%
+    voicing  share of frames where both agree on voiced vs. unvoiced
+
+Pick the engine per deployment with PITCH_ENGINE=pyin|yin.
+"""
+import os
+import sys
+import time
+import numpy as np
+
+from backend.app.utils.audio_utils import load_audio_from_bytes, SPEECH_SAMPLE_RATE
+from backend.app.services.speech.feature_extractor import estimate_pitch, PITCH_ENGINES
+
+REPEATS = 3
+GPE_TOLERANCE = 0.2
+
+def synthetic_sentence(seed: int, sr: int = SPEECH_SAMPLE_RATE):
+    """
+    Harmonic 'speech' with a gliding F0, silent pauses and a little noise.
+
+    Returns:
+        (audio, true_f0) where true_f0(t) gives the F0 in Hz (NaN in pauses).
+    """
+    rng = np.random.default_rng(seed)
+    base = rng.uniform(90, 250)
+    segments, contour = [], []
+    for _ in range(rng.integers(3, 6)):
+        n_voiced = int(sr * rng.uniform(0.4, 1.2))
+        f0 = base * (1 + 0.15 * np.sin(np.linspace(0, rng.uniform(1, 4), n_voiced)))
+        phase = 2 * np.pi * np.cumsum(f0) / sr
+        voiced = sum(np.sin(k * phase) / k for k in range(1, 8)) * 0.3
+        n_pause = int(sr * rng.uniform(0.2, 0.9))
+        segments += [voiced, np.zeros(n_pause)]
+        contour += [f0, np.full(n_pause, np.nan)]
+
+    audio = np.concatenate(segments)
+    audio = (audio + rng.normal(scale=1e-3, size=len(audio))).astype(np.float32)
+    contour = np.concatenate(contour)
+    return audio, lambda t: contour[np.clip((t * sr).astype(int), 0, len(contour) - 1)]
+
+def load_recordings(paths):
+    files = []
+    for path in paths:
+        if os.path.isdir(path):
+            files += [os.path.join(path, f) for f in sorted(os.listdir(path))]
+        else:
+            files.append(path)
+
+    for path in files:
+        with open(path, "rb") as f:
+            try:
+                audio, sr = load_audio_from_bytes(f.read(), target_sr=SPEECH_SAMPLE_RATE)
+            except ValueError as e:
+                print(f"Skipping {path}: {e}")
+                continue
+        yield os.path.basename(path), audio, None
+
+def frame_times(f0: np.ndarray, n_samples: int) -> np.ndarray:
+    # Frames are evenly spaced over the signal (centered framing)
+    return np.linspace(0, n_samples / SPEECH_SAMPLE_RATE, len(f0))
+
+def compare(f0, times, ref_f0, ref_times):
+    """GPE and voicing agreement of f0 against a reference contour."""
+    ref = np.interp(times, ref_times, np.nan_to_num(ref_f0, nan=0.0), left=0.0, right=0.0)
+    voiced, ref_voiced = ~np.isnan(f0), ref > 0
+    both = voiced & ref_voiced
+    gpe = float(np.mean(np.abs(f0[both] - ref[both]) > GPE_TOLERANCE * ref[both])) if both.any() else float("nan")
+    return gpe, float(np.mean(voiced == ref_voiced))
+
+def nanmean(values) -> float:
+    values = np.asarray(values, dtype=float)
+    return float(np.nanmean(values)) if not np.all(np.isnan(values)) else float("nan")
+
+def main():
+    if len(sys.argv) > 1:
+        utterances = list(load_recordings(sys.argv[1:]))
+    else:
+        print("No recordings given, using synthetic sentences with known F0\n")
+        utterances = [(f"synthetic_{i}", *synthetic_sentence(i)) for i in range(8)]
+
+    totals = {engine: {"time": [], "gpe": [], "voicing": []} for engine in PITCH_ENGINES}
+    print(f"{'utterance':<24}{'engine':<8}{'time ms':>9}{'mean Hz':>9}{'std Hz':>8}{'GPE':>7}{'voicing':>9}")
+
+    for name, audio, truth in utterances:
+        contours = {}
+        for engine in PITCH_ENGINES:
+            runs = []
+            for _ in range(REPEATS):
+                start = time.perf_counter()
+                f0 = estimate_pitch(audio, SPEECH_SAMPLE_RATE, engine)
+                runs.append(time.perf_counter() - start)
+            contours[engine] = (f0, frame_times(f0, len(audio)), float(np.median(runs)))
+
+        for engine, (f0, times, elapsed) in contours.items():
+            if truth is not None:
+                ref_times = np.arange(len(audio)) / SPEECH_SAMPLE_RATE
+                gpe, voicing = compare(f0, times, truth(ref_times), ref_times)
+            elif engine != "pyin":
+                gpe, voicing = compare(f0, times, *contours["pyin"][:2])
+            else:
+                gpe, voicing = float("nan"), float("nan")
+
+            voiced = f0[~np.isnan(f0)]
+            mean = float(np.mean(voiced)) if len(voiced) else 0.0
+            std = float(np.std(voiced)) if len(voiced) else 0.0
+            print(f"{name[:23]:<24}{engine:<8}{elapsed * 1000:>9.1f}{mean:>9.1f}{std:>8.1f}{gpe:>7.3f}{voicing:>9.3f}")
+
+            totals[engine]["time"].append(elapsed)
+            totals[engine]["gpe"].append(gpe)
+            totals[engine]["voicing"].append(voicing)
+
+    print("\nSummary")
+    for engine, t in totals.items():
+        print(f"  {engine:<6} median {np.median(t['time']) * 1000:7.1f} ms/utterance, "
+              f"GPE {nanmean(t['gpe']):.3f}, voicing agreement {nanmean(t['voicing']):.3f}")
+
+if __name__ == "__main__":
+    main()